@@ -8,7 +8,7 @@ import os
 # Add parent dir to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data.db_config import get_db_connection
+from data.db_config import db_connection
 
 def get_options_data(symbol, from_time=None, to_time=None, expiration=None, option_right=None, strike=None):
     """
@@ -25,8 +25,6 @@ def get_options_data(symbol, from_time=None, to_time=None, expiration=None, opti
     Returns:
         pandas.DataFrame: DataFrame containing options data
     """
-    connection = get_db_connection()
-
     query_parts = ["SELECT * FROM options_prices WHERE symbol = %s"]
     params = [symbol]
     
@@ -53,7 +51,7 @@ def get_options_data(symbol, from_time=None, to_time=None, expiration=None, opti
     query = " AND ".join(query_parts) + " ORDER BY timestamp"
     
     try:
-        with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+        with db_connection() as connection, connection.cursor(cursor_factory=RealDictCursor) as cursor:
             cursor.execute(query, params)
             rows = cursor.fetchall()
             
@@ -73,9 +71,6 @@ def get_options_data(symbol, from_time=None, to_time=None, expiration=None, opti
     except Exception as e:
         print(f"Error retrieving options data: {e}")
         return pd.DataFrame()
-    
-    finally:
-        connection.close()
 
 
 def get_option_chain(symbol, expiration=None, timestamp=None):
@@ -90,10 +85,8 @@ def get_option_chain(symbol, expiration=None, timestamp=None):
     Returns:
         tuple: (calls_df, puts_df) containing DataFrames for calls and puts
     """
-    connection = get_db_connection()
-    
     try:
-        with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+        with db_connection() as connection, connection.cursor(cursor_factory=RealDictCursor) as cursor:
             # If no timestamp is provided, get the latest data for each option
             if not timestamp and not expiration:
                 query = """
@@ -198,9 +191,6 @@ def get_option_chain(symbol, expiration=None, timestamp=None):
     except Exception as e:
         print(f"Error retrieving option chain: {e}")
         return pd.DataFrame(), pd.DataFrame()
-    
-    finally:
-        connection.close()
 
 
 def get_available_expirations(symbol):
@@ -213,10 +203,8 @@ def get_available_expirations(symbol):
     Returns:
         list: List of expiration dates as strings
     """
-    connection = get_db_connection()
-    
     try:
-        with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+        with db_connection() as connection, connection.cursor(cursor_factory=RealDictCursor) as cursor:
             query = """
             SELECT DISTINCT expiration 
             FROM options_prices 
@@ -231,9 +219,6 @@ def get_available_expirations(symbol):
     except Exception as e:
         print(f"Error retrieving available expirations: {e}")
         return []
-    
-    finally:
-        connection.close()
 
 
 if __name__ == "__main__":
@@ -14,7 +14,7 @@ from datetime import datetime, timedelta
 
 # Add parent dir to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from data.TimescaleDBSticksDao import get_sticks
+from data.TimescaleDBSticksDao import get_sticks_many
 from data.db_config import get_db_connection
 
 def get_hot_stocks():
@@ -26,17 +26,12 @@ def get_hot_stocks():
     conn.close()
     return symbols
 
-def get_stick_metrics(symbol):
+def get_stick_metrics(df):
     """
-    Get metrics from local stick data.
+    Get metrics from a symbol's daily sticks.
     Returns: {last_stick_datetime, close_price, dollar_volume, avg_volume_30d}
     """
     try:
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=60) 
-        
-        df = get_sticks(symbol, 1440, start_date, end_date)
-        
         if df.empty:
             return None
             
@@ -103,36 +98,39 @@ def main():
     print(f"Found {len(symbols)} symbols in hot_stocks.")
     
     chunk_size = 100
-    current_chunk = []
     
     print("Processing local stick data and updating DB...")
     
-    for i, symbol in enumerate(symbols):
-        stick_data = get_stick_metrics(symbol)
-        
-        record = {
-            'symbol': symbol,
-            'status': 'Active' if stick_data else 'Inactive',
-        }
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=60)
+    
+    for chunk_start in range(0, len(symbols), chunk_size):
+        chunk_symbols = symbols[chunk_start:chunk_start + chunk_size]
+        sticks = get_sticks_many(chunk_symbols, 1440, start_date, end_date)
         
-        if stick_data:
-            record.update(stick_data)
-        else:
-            record['last_stick_datetime'] = None
-            record['dollar_volume'] = 0
-            record['avg_volume_30d'] = 0
-            record['close_price'] = 0
+        current_chunk = []
+        for symbol in chunk_symbols:
+            stick_data = get_stick_metrics(sticks[symbol])
             
-        current_chunk.append(record)
-        
-        if len(current_chunk) >= chunk_size:
-            upsert_metadata(current_chunk)
-            current_chunk = []
-            if (i+1) % 500 == 0:
-                print(f"  Processed {i+1}/{len(symbols)}...")
+            record = {
+                'symbol': symbol,
+                'status': 'Active' if stick_data else 'Inactive',
+            }
             
-    if current_chunk:
+            if stick_data:
+                record.update(stick_data)
+            else:
+                record['last_stick_datetime'] = None
+                record['dollar_volume'] = 0
+                record['avg_volume_30d'] = 0
+                record['close_price'] = 0
+                
+            current_chunk.append(record)
+        
         upsert_metadata(current_chunk)
+        processed = chunk_start + len(chunk_symbols)
+        if processed % 500 == 0:
+            print(f"  Processed {processed}/{len(symbols)}...")
         
     print("Done!")
 
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from psycopg2.extras import RealDictCursor
 import pandas as pd
 from typing import Optional, List, Dict, Any
-from data.db_config import get_db_connection
+from data.db_config import db_connection
 
 # Category mappings for common asset types
 CATEGORY_MAPPINGS = {
@@ -122,8 +122,7 @@ def get_cot_data(
     
     params = assets + [cutoff_date.strftime('%Y-%m-%d')]
     
-    connection = get_db_connection()
-    try:
+    with db_connection() as connection:
         with connection.cursor(cursor_factory=RealDictCursor) as cursor:
             cursor.execute(query, params)
             results = cursor.fetchall()
@@ -155,22 +154,16 @@ def get_cot_data(
                     'other_rept_long_pct', 'other_rept_short_pct', 'other_rept_net', 'ingest_ts'
                 ]
                 return pd.DataFrame(columns=columns)
-                
-    finally:
-        connection.close()
 
 def get_available_assets() -> List[str]:
     """Get list of all available assets in the database."""
     query = "SELECT DISTINCT asset FROM cot_data_all ORDER BY asset"
     
-    connection = get_db_connection()
-    try:
+    with db_connection() as connection:
         with connection.cursor() as cursor:
             cursor.execute(query)
             results = cursor.fetchall()
             return [row[0] for row in results]
-    finally:
-        connection.close()
 
 def get_date_range() -> Dict[str, Any]:
     """Get the date range of available data."""
@@ -182,8 +175,7 @@ def get_date_range() -> Dict[str, Any]:
         FROM cot_data_all
     """
     
-    connection = get_db_connection()
-    try:
+    with db_connection() as connection:
         with connection.cursor(cursor_factory=RealDictCursor) as cursor:
             cursor.execute(query)
             result = cursor.fetchone()
@@ -193,5 +185,3 @@ def get_date_range() -> Dict[str, Any]:
                 "latest_date": result['latest_date'].isoformat() if result['latest_date'] else None,
                 "total_records": result['total_records']
             }
-    finally:
-        connection.close()
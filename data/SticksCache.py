@@ -0,0 +1,42 @@
+import os
+from typing import Optional
+
+import pandas as pd
+
+from data.Symbols import basePath
+
+# Decoded sticks are stored as one Parquet file per (symbol, interval) under this directory
+CACHE_DIR = os.getenv("STICK_CACHE_DIR", os.path.join(basePath, "sticks"))
+
+
+def _cache_path(symbol: str, interval) -> str:
+    file_name = symbol.replace(os.sep, "_") + ".parquet"
+    return os.path.join(CACHE_DIR, str(interval), file_name)
+
+
+def load_sticks(symbol: str, interval) -> Optional[pd.DataFrame]:
+    """Return the cached sticks for (symbol, interval), or None when nothing usable is cached."""
+    path = _cache_path(symbol, interval)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable stick cache {path}: {e}")
+        return None
+
+
+def save_sticks(symbol: str, interval, sticks_df: pd.DataFrame):
+    """Replace the cached sticks for (symbol, interval). The write is atomic so concurrent readers never see a partial file."""
+    path = _cache_path(symbol, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    sticks_df.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def invalidate(symbol: str, interval):
+    """Drop the cached sticks for (symbol, interval) so the next read refetches the full history."""
+    path = _cache_path(symbol, interval)
+    if os.path.exists(path):
+        os.remove(path)
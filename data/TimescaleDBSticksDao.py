@@ -1,16 +1,37 @@
 import psycopg2
 from datetime import datetime, timezone
+from itertools import groupby
+from operator import itemgetter
 from psycopg2.extras import RealDictCursor
 import msgpack
+import numpy as np
 import pandas as pd
 import pytz
 
-from data.db_config import get_db_connection, get_migration_db_connection
-
-def get_sticks(symbol, interval, from_time: datetime = datetime.min, to_time: datetime = datetime.max, limit: int = None):
-    connection = get_db_connection()
-
-    with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+from data import SticksCache
+from data.db_config import db_connection, migration_db_connection
+
+# msgpack field name -> DataFrame column name, in output column order
+STICK_COLUMNS = {
+    'askOpen': 'ask_open',
+    'askHigh': 'ask_high',
+    'askLow': 'ask_low',
+    'askClose': 'ask_close',
+    'bidOpen': 'bid_open',
+    'bidHigh': 'bid_high',
+    'bidLow': 'bid_low',
+    'bidClose': 'bid_close',
+    'volume': 'volume',
+}
+
+
+def get_sticks(symbol, interval, from_time: datetime = datetime.min, to_time: datetime = datetime.max, limit: int = None,
+               use_cache: bool = False):
+    if use_cache and not limit:
+        sticks_df = _get_sticks_many_cached([symbol], interval)[symbol]
+        return _slice_window(sticks_df, from_time, to_time)
+
+    with db_connection() as connection, connection.cursor(cursor_factory=RealDictCursor) as cursor:
         if from_time != datetime.min and to_time != datetime.max:
             query = """
             SELECT compressed_sticks FROM stick WHERE symbol = %s AND interval = %s AND
@@ -30,89 +51,180 @@ def get_sticks(symbol, interval, from_time: datetime = datetime.min, to_time: da
             cursor.execute(query, (symbol, interval))
 
         rows = cursor.fetchall()
-    connection.close()
-
-    decoded_sticks_list = [msgpack.unpackb(row['compressed_sticks'], raw=False) for row in rows]
-    flat_sticks_list = [stick for dsl in decoded_sticks_list for stick in _explode_sticks_msg(symbol, interval, dsl)]
-
-    stick_dicts = [
-        {
-            "stick_datetime": stick['stickDatetime'],
-            "ask_open": stick['askOpen'],
-            "ask_high": stick['askHigh'],
-            "ask_low": stick['askLow'],
-            "ask_close": stick['askClose'],
-            "bid_open": stick['bidOpen'],
-            "bid_high": stick['bidHigh'],
-            "bid_low": stick['bidLow'],
-            "bid_close": stick['bidClose'],
-            "volume": stick['volume'],
-            "epoch_utc_ms": stick['epochUtcMs'],
-        }
-        for stick in flat_sticks_list
-    ]
-
-    sticks_df = pd.DataFrame(stick_dicts).set_index("stick_datetime").sort_index()
-
-    if from_time is not None and to_time is not None:
-        from_time_tzaware = from_time.replace(tzinfo=pytz.UTC)
-        to_time_tzaware = to_time.replace(tzinfo=pytz.UTC)
-        sticks_df = sticks_df.loc[(sticks_df['volume'] != 0) &
-                                  (sticks_df.index >= from_time_tzaware) & (sticks_df.index <= to_time_tzaware)]
-    else:
-        sticks_df = sticks_df.loc[(sticks_df['volume'] != 0)]
 
-    return sticks_df
+    return _decode_sticks((row['compressed_sticks'] for row in rows), _to_epoch(from_time), _to_epoch(to_time))
 
 
-def get_all_symbols():
-    connection = get_migration_db_connection()
+def get_sticks_many(symbols, interval, from_time: datetime = datetime.min, to_time: datetime = datetime.max,
+                    long_format: bool = False, use_cache: bool = False):
+    """
+    Fetch sticks for many symbols with a single query.
+
+    Rows are streamed through a server-side cursor ordered by symbol, so each symbol's
+    chunks are decoded as soon as they arrive. With use_cache, sticks are read through
+    the on-disk SticksCache and only chunks newer than each symbol's cached bars are queried.
+
+    Returns:
+        dict of symbol -> DataFrame (empty for symbols without data), or, when long_format
+        is True, a single DataFrame with an extra 'symbol' column.
+    """
+    symbols = list(symbols)
+    if use_cache:
+        cached = _get_sticks_many_cached(symbols, interval)
+        sticks = {symbol: _slice_window(sticks_df, from_time, to_time) for symbol, sticks_df in cached.items()}
+    else:
+        bounded = from_time != datetime.min and to_time != datetime.max
+        with db_connection() as connection, connection.cursor(name='get_sticks_many') as cursor:
+            _query_sticks_many(cursor, symbols, interval,
+                               from_time if bounded else None, to_time if bounded else None)
+            from_epoch, to_epoch = _to_epoch(from_time), _to_epoch(to_time)
+            sticks = {
+                symbol: _decode_sticks((row[1] for row in rows), from_epoch, to_epoch)
+                for symbol, rows in groupby(cursor, key=itemgetter(0))
+            }
+
+    for symbol in symbols:
+        if symbol not in sticks:
+            sticks[symbol] = _empty_sticks_frame()
+
+    if long_format:
+        frames = [sticks[symbol].assign(symbol=symbol) for symbol in symbols if not sticks[symbol].empty]
+        return pd.concat(frames) if frames else _empty_sticks_frame().assign(symbol=[])
+    return sticks
+
 
-    with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+def get_all_symbols():
+    with migration_db_connection() as connection, connection.cursor(cursor_factory=RealDictCursor) as cursor:
         query = """
         SELECT DISTINCT symbol FROM stick
         """
         cursor.execute(query)
         rows = cursor.fetchall()
-    connection.close()
 
     symbols = [row['symbol'] for row in rows]
     return symbols
 
 
-def _undiff_list(input_list):
-    return [sum(input_list[:i + 1]) for i in range(len(input_list))]
-
-
-def _explode_sticks_msg(symbol, interval, sticks_msg):
-    epochs = _undiff_list(sticks_msg['epoch'])
-    ask_opens = _undiff_list(sticks_msg['askOpen'])
-    ask_highs = _undiff_list(sticks_msg['askHigh'])
-    ask_lows = _undiff_list(sticks_msg['askLow'])
-    ask_closes = _undiff_list(sticks_msg['askClose'])
-    bid_opens = _undiff_list(sticks_msg['bidOpen'])
-    bid_highs = _undiff_list(sticks_msg['bidHigh'])
-    bid_lows = _undiff_list(sticks_msg['bidLow'])
-    bid_closes = _undiff_list(sticks_msg['bidClose'])
-    volumes = _undiff_list(sticks_msg['volume'])
-
-    sticks = []
-    for i in range(len(epochs)):
-        stick_datetime = datetime.fromtimestamp(epochs[i], timezone.utc)
-        stick = {
-            'stickDatetime': stick_datetime,
-            'askOpen': ask_opens[i],
-            'askHigh': ask_highs[i],
-            'askLow': ask_lows[i],
-            'askClose': ask_closes[i],
-            'bidOpen': bid_opens[i],
-            'bidHigh': bid_highs[i],
-            'bidLow': bid_lows[i],
-            'bidClose': bid_closes[i],
-            'volume': volumes[i],
-            'interval': interval,
-            'epochUtcMs': epochs[i] * 1000
-        }
-        sticks.append(stick)
-
+def _query_sticks_many(cursor, symbols, interval, from_time: datetime = None, to_time: datetime = None):
+    """Execute the chunk query for symbols on a (server-side) cursor. A None bound leaves that side open."""
+    cursor.itersize = 500
+    query = "SELECT symbol, compressed_sticks FROM stick WHERE symbol = ANY(%s) AND interval = %s"
+    params = [symbols, interval]
+    if to_time is not None:
+        query += " AND start_date <= %s"
+        params.append(to_time)
+    if from_time is not None:
+        query += " AND end_date >= %s"
+        params.append(from_time)
+    query += " ORDER BY symbol, start_date DESC"
+    cursor.execute(query, params)
+
+
+def _get_sticks_many_cached(symbols, interval) -> dict:
+    """
+    Read-through SticksCache lookup returning each symbol's full stick history.
+
+    Symbols without a cache file are filled with their full history. Cached symbols only
+    fetch chunks ending at or after their last cached bar; that bar is refetched as well
+    since it may still have been in progress when it was cached.
+    """
+    cached = {symbol: SticksCache.load_sticks(symbol, interval) for symbol in symbols}
+    high_water = {
+        symbol: int(sticks_df['epoch_utc_ms'].iloc[-1] // 1000)
+        for symbol, sticks_df in cached.items() if sticks_df is not None and not sticks_df.empty
+    }
+    missing = [symbol for symbol in symbols if symbol not in high_water]
+
+    fetched = {}
+    with db_connection() as connection:
+        if missing:
+            with connection.cursor(name='sticks_cache_fill') as cursor:
+                _query_sticks_many(cursor, missing, interval)
+                for symbol, rows in groupby(cursor, key=itemgetter(0)):
+                    fetched[symbol] = _decode_sticks(row[1] for row in rows)
+        if high_water:
+            since = datetime.fromtimestamp(min(high_water.values()), timezone.utc)
+            with connection.cursor(name='sticks_cache_refresh') as cursor:
+                _query_sticks_many(cursor, list(high_water), interval, from_time=since)
+                for symbol, rows in groupby(cursor, key=itemgetter(0)):
+                    fetched[symbol] = _decode_sticks((row[1] for row in rows), high_water[symbol])
+
+    sticks = {}
+    for symbol in symbols:
+        cached_df, new_df = cached[symbol], fetched.get(symbol)
+        if new_df is None or new_df.empty:
+            sticks[symbol] = cached_df if symbol in high_water else _empty_sticks_frame()
+            continue
+        if symbol in high_water:
+            kept = cached_df.loc[cached_df['epoch_utc_ms'] < high_water[symbol] * 1000]
+            new_df = pd.concat([kept, new_df])
+        SticksCache.save_sticks(symbol, interval, new_df)
+        sticks[symbol] = new_df
     return sticks
+
+
+def _slice_window(sticks_df: pd.DataFrame, from_time: datetime, to_time: datetime) -> pd.DataFrame:
+    epochs_ms = sticks_df['epoch_utc_ms'].to_numpy()
+    from_epoch, to_epoch = _to_epoch(from_time), _to_epoch(to_time)
+    lo = 0 if from_epoch is None else np.searchsorted(epochs_ms, from_epoch * 1000, side='left')
+    hi = len(epochs_ms) if to_epoch is None else np.searchsorted(epochs_ms, to_epoch * 1000, side='right')
+    return sticks_df.iloc[lo:hi]
+
+
+def _to_epoch(dt: datetime):
+    if dt is None:
+        return None
+    return dt.replace(tzinfo=pytz.UTC).timestamp()
+
+
+def _decode_sticks(compressed_blobs, from_epoch: float = None, to_epoch: float = None) -> pd.DataFrame:
+    """
+    Decode compressed_sticks blobs into a single DataFrame indexed by stick_datetime.
+
+    Each blob is a msgpack map of delta-encoded columns. The epoch column is undiffed first
+    and binary-searched for the [from_epoch, to_epoch] window, so the price columns are only
+    summed up to the last bar in range and bars outside the window or with zero volume are
+    dropped before any DataFrame is built.
+    """
+    epoch_chunks = []
+    column_chunks = {field: [] for field in STICK_COLUMNS}
+
+    for blob in compressed_blobs:
+        sticks_msg = msgpack.unpackb(blob, raw=False)
+        epochs = np.cumsum(sticks_msg['epoch'], dtype=np.int64)
+
+        lo = 0 if from_epoch is None else int(np.searchsorted(epochs, from_epoch, side='left'))
+        hi = len(epochs) if to_epoch is None else int(np.searchsorted(epochs, to_epoch, side='right'))
+        if lo >= hi:
+            continue
+
+        volumes = np.cumsum(sticks_msg['volume'][:hi])[lo:]
+        traded = volumes != 0
+        if not traded.any():
+            continue
+        keep = slice(None) if traded.all() else traded
+
+        epoch_chunks.append(epochs[lo:hi][keep])
+        column_chunks['volume'].append(volumes[keep])
+        for field in STICK_COLUMNS:
+            if field != 'volume':
+                column_chunks[field].append(np.cumsum(sticks_msg[field][:hi])[lo:][keep])
+
+    if not epoch_chunks:
+        return _empty_sticks_frame()
+
+    epochs = np.concatenate(epoch_chunks)
+    order = np.argsort(epochs, kind='stable')
+    epochs = epochs[order]
+
+    data = {column: np.concatenate(column_chunks[field])[order] for field, column in STICK_COLUMNS.items()}
+    data['epoch_utc_ms'] = epochs * 1000
+
+    index = pd.DatetimeIndex(pd.to_datetime(epochs, unit='s', utc=True), name='stick_datetime')
+    return pd.DataFrame(data, index=index)
+
+
+def _empty_sticks_frame() -> pd.DataFrame:
+    index = pd.DatetimeIndex([], tz=timezone.utc, name='stick_datetime')
+    columns = list(STICK_COLUMNS.values()) + ['epoch_utc_ms']
+    return pd.DataFrame(columns=columns, index=index)
@@ -1,13 +1,27 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-def get_db_connection():
-    """Create and return a database connection using env vars."""
-    return psycopg2.connect(
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# Connections idle for longer than this are pinged before being handed out
+POOL_HEALTH_CHECK_SECONDS = float(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", "30"))
+
+# Optional process-wide cap on concurrent checkouts, see limit_db_concurrency
+_checkout_limit = None
+
+
+def _db_params():
+    return dict(
         host=os.getenv("DB_HOST", "localhost"),
         port=os.getenv("DB_PORT", "5430"),
         database=os.getenv("DB_NAME", "happy-machine"),
@@ -15,9 +29,9 @@ def get_db_connection():
         password=os.getenv("DB_PASSWORD", "nipa")
     )
 
-def get_migration_db_connection():
-    """Create and return a connection to the migration/secondary DB."""
-    return psycopg2.connect(
+
+def _migration_db_params():
+    return dict(
         host=os.getenv("DB_MIGRATION_HOST", "localhost"),
         port=os.getenv("DB_MIGRATION_PORT", "5436"),
         database=os.getenv("DB_MIGRATION_NAME", "postgres"),
@@ -25,12 +39,137 @@ def get_migration_db_connection():
         password=os.getenv("DB_MIGRATION_PASSWORD", "password")
     )
 
-def get_source_db_connection():
-    """Create and return a connection to the source DB for migration."""
-    return psycopg2.connect(
+
+def _source_db_params():
+    return dict(
         host=os.getenv("DB_SOURCE_HOST", "localhost"),
         port=os.getenv("DB_SOURCE_PORT", "5432"),
         database=os.getenv("DB_SOURCE_NAME", "postgres"),
         user=os.getenv("DB_SOURCE_USER", "postgres"),
         password=os.getenv("DB_SOURCE_PASSWORD", "password")
     )
+
+
+def get_db_connection():
+    """Create and return a database connection using env vars."""
+    return psycopg2.connect(**_db_params())
+
+def get_migration_db_connection():
+    """Create and return a connection to the migration/secondary DB."""
+    return psycopg2.connect(**_migration_db_params())
+
+def get_source_db_connection():
+    """Create and return a connection to the source DB for migration."""
+    return psycopg2.connect(**_source_db_params())
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of connections to one database.
+
+    Callers block while max_size connections are checked out. Connections that were idle
+    longer than POOL_HEALTH_CHECK_SECONDS are pinged and replaced if they are broken, and
+    the pool is rebuilt in a forked child instead of sharing the parent's sockets.
+    """
+
+    def __init__(self, params: dict, min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE):
+        self.params = params
+        self.min_size = min_size
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pool = None
+        self._slots = None
+        self._last_used = {}
+
+    def _ensure_pool(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # After a fork the inherited sockets belong to the parent: drop them without closing
+                self._pool = ThreadedConnectionPool(self.min_size, self.max_size, **self.params)
+                self._slots = threading.BoundedSemaphore(self.max_size)
+                self._last_used = {}
+                self._pid = os.getpid()
+            return self._pool
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed or conn.info.transaction_status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < POOL_HEALTH_CHECK_SECONDS:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @contextmanager
+    def connection(self):
+        limit = _checkout_limit
+        if limit is not None:
+            limit.acquire()
+        try:
+            pool = self._ensure_pool()
+            slots = self._slots
+            with slots:
+                conn = pool.getconn()
+                try:
+                    if not self._is_healthy(conn):
+                        pool.putconn(conn, close=True)
+                        conn = pool.getconn()
+                    yield conn
+                finally:
+                    if pool is self._pool:
+                        self._last_used[id(conn)] = time.monotonic()
+                        # putconn rolls back any open transaction and discards broken connections
+                        pool.putconn(conn, close=bool(conn.closed))
+                    else:
+                        # The pool was closed while this connection was checked out
+                        conn.close()
+        finally:
+            if limit is not None:
+                limit.release()
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+            self._pid = None
+
+
+_db_pool = ConnectionPool(_db_params())
+_migration_db_pool = ConnectionPool(_migration_db_params())
+_source_db_pool = ConnectionPool(_source_db_params())
+
+
+def db_connection():
+    """Context manager yielding a pooled connection to the main DB."""
+    return _db_pool.connection()
+
+def migration_db_connection():
+    """Context manager yielding a pooled connection to the migration/secondary DB."""
+    return _migration_db_pool.connection()
+
+def source_db_connection():
+    """Context manager yielding a pooled connection to the source DB for migration."""
+    return _source_db_pool.connection()
+
+def limit_db_concurrency(semaphore):
+    """
+    Make every pooled checkout in this process also hold semaphore, a threading or
+    multiprocessing semaphore shared by scan workers. Pass None to remove the limit.
+    Returns the previous limit so callers can restore it.
+    """
+    global _checkout_limit
+    previous = _checkout_limit
+    _checkout_limit = semaphore
+    return previous
+
+def close_pools():
+    """Close every pooled connection owned by this process."""
+    for pool in (_db_pool, _migration_db_pool, _source_db_pool):
+        pool.close()
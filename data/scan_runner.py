@@ -0,0 +1,163 @@
+"""
+Parallel per-symbol scan runner.
+
+Runs a per-symbol function (fetch -> compute) over a symbol list on a process or thread pool,
+caps how many workers hold a DB connection at once, reports progress and captures per-symbol
+errors instead of aborting the scan; failed symbols and their tracebacks are printed when the
+scan finishes. Results come back in the order of the input symbols so callers can aggregate
+them exactly as their serial loops did.
+"""
+
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from data import db_config
+
+DEFAULT_DB_CONCURRENCY = int(os.getenv("SCAN_DB_CONCURRENCY", "8"))
+
+
+@dataclass
+class ScanResult:
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def values(self) -> List[Any]:
+        """Results of the symbols that completed, in input order."""
+        return list(self.results.values())
+
+    def report_errors(self, label: str = "Scan"):
+        """Print how many symbols failed, which ones, and each traceback."""
+        if not self.errors:
+            return
+        print(f"{label}: {len(self.errors)} symbols failed and are excluded from the results: "
+              f"{', '.join(map(str, self.errors))}")
+        for symbol, error in self.errors.items():
+            print(f"--- {symbol} ---\n{error}")
+
+
+def _init_worker(db_slots):
+    db_config.limit_db_concurrency(db_slots)
+
+
+def _run_one(fn: Callable, symbol: str):
+    try:
+        return symbol, fn(symbol), None
+    except Exception:
+        return symbol, None, traceback.format_exc()
+
+
+def scan_serial(symbols, fn: Callable[[str], Any]) -> ScanResult:
+    """
+    Run fn(symbol) for every symbol in the calling process, capturing per-symbol errors like
+    run_scan. Batch functions of run_batch_scan return this to keep one failing symbol from
+    failing the whole batch.
+    """
+    results = {}
+    errors = {}
+    for symbol in symbols:
+        _, result, error = _run_one(fn, symbol)
+        if error is None:
+            results[symbol] = result
+        else:
+            errors[symbol] = error
+    return ScanResult(results=results, errors=errors)
+
+
+def run_scan(symbols: List[str], fn: Callable[[str], Any], max_workers: Optional[int] = None,
+             use_processes: bool = True, db_concurrency: int = DEFAULT_DB_CONCURRENCY,
+             progress_every: int = 50, label: str = "Processing", report_errors: bool = True) -> ScanResult:
+    """
+    Run fn(symbol) for every symbol in parallel.
+
+    Args:
+        symbols: Symbols to scan
+        fn: Per-symbol function. Must be a module-level function when use_processes is True
+        max_workers: Pool size (default: os.cpu_count())
+        use_processes: Use a process pool for CPU-bound work, or a thread pool when False
+        db_concurrency: Maximum number of workers holding a pooled DB connection at once
+        progress_every: Print progress every N completed symbols (0 disables it)
+        label: Prefix of the progress lines
+        report_errors: Print the failed symbols and their tracebacks once the scan is done
+
+    Returns:
+        ScanResult with results ordered like symbols and a traceback per failed symbol
+    """
+    symbols = list(symbols)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if use_processes:
+        db_slots = multiprocessing.get_context().BoundedSemaphore(db_concurrency)
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(db_slots,))
+        previous_limit = None
+    else:
+        db_slots = threading.BoundedSemaphore(db_concurrency)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        previous_limit = db_config.limit_db_concurrency(db_slots)
+
+    completed = {}
+    errors = {}
+    try:
+        with executor:
+            futures = {executor.submit(_run_one, fn, symbol): symbol for symbol in symbols}
+            for done, future in enumerate(as_completed(futures), start=1):
+                symbol = futures[future]
+                try:
+                    _, result, error = future.result()
+                except Exception:
+                    # The worker died (BrokenProcessPool) or its result could not be pickled
+                    result, error = None, traceback.format_exc()
+                if error is None:
+                    completed[symbol] = result
+                else:
+                    errors[symbol] = error
+                if progress_every and (done % progress_every == 0 or done == len(symbols)):
+                    print(f"{label} {done}/{len(symbols)} ({len(errors)} errors)")
+    finally:
+        if not use_processes:
+            db_config.limit_db_concurrency(previous_limit)
+
+    results = {symbol: completed[symbol] for symbol in symbols if symbol in completed}
+    errors = {symbol: errors[symbol] for symbol in symbols if symbol in errors}
+    scan = ScanResult(results=results, errors=errors)
+    if report_errors:
+        scan.report_errors(label)
+    return scan
+
+
+def run_batch_scan(symbols: List[str], fn: Callable[[Tuple[str, ...]], Dict[str, Any]], batch_size: int,
+                   label: str = "Processing", report_errors: bool = True, **kwargs) -> ScanResult:
+    """
+    Like run_scan, but fn receives a whole batch of symbols (e.g. to fetch them with one
+    get_sticks_many query) and returns {symbol: result}, or a ScanResult (see scan_serial) to
+    report per-symbol errors. A failing batch records its traceback for each of its symbols.
+    Other keyword arguments go to run_scan; progress is per batch.
+    """
+    symbols = list(symbols)
+    batches = [tuple(symbols[i:i + batch_size]) for i in range(0, len(symbols), batch_size)]
+    batch_scan = run_scan(batches, fn, label=f"{label} batches", report_errors=False, **kwargs)
+
+    results = {}
+    errors = {}
+    for batch in batches:
+        if batch in batch_scan.errors:
+            errors.update({symbol: batch_scan.errors[batch] for symbol in batch})
+            continue
+        try:
+            batch_results = batch_scan.results[batch]
+            if isinstance(batch_results, ScanResult):
+                errors.update(batch_results.errors)
+                batch_results = batch_results.results
+            results.update({symbol: batch_results[symbol] for symbol in batch if symbol in batch_results})
+        except Exception:
+            errors.update({symbol: traceback.format_exc() for symbol in batch if symbol not in results})
+
+    errors = {symbol: errors[symbol] for symbol in symbols if symbol in errors}
+    scan = ScanResult(results=results, errors=errors)
+    if report_errors:
+        scan.report_errors(label)
+    return scan
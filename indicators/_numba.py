@@ -0,0 +1,8 @@
+try:
+    from numba import njit
+except ImportError:
+    # Numba not available: kernels run as plain Python loops over NumPy arrays
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
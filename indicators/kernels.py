@@ -0,0 +1,121 @@
+"""
+Array indicator kernels: true range, ATR (Wilder), Supertrend, RSI, ADX and EMA.
+
+Inputs are 1-D price arrays (or Series, which are read without copying) and outputs are float64
+NumPy arrays aligned with the input. Exponential and rolling smoothing uses pandas' compiled
+window routines, and the Supertrend final band recursion runs in a loop kernel that Numba compiles
+when it is installed, so no per-bar Python code runs in the common path.
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicators._numba import njit
+
+
+def _as_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _ewm(values: np.ndarray, alpha: float, adjust: bool = False) -> np.ndarray:
+    return pd.Series(values, copy=False).ewm(alpha=alpha, adjust=adjust).mean().to_numpy()
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    return pd.Series(values, copy=False).rolling(window=window).mean().to_numpy()
+
+
+def ema(values, span: int) -> np.ndarray:
+    """Exponential moving average (adjust=False), as used for the ema18/ema50/ema200 columns."""
+    return pd.Series(_as_array(values), copy=False).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """True range; the first bar has no previous close, so it is just high - low."""
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    tr = high - low
+    if len(tr) > 1:
+        prev_close = close[:-1]
+        tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)))
+    return tr
+
+
+def atr_wilder(high, low, close, period: int = 14) -> np.ndarray:
+    """Average true range with Wilder smoothing (EWM, alpha = 1/period)."""
+    return _ewm(true_range(high, low, close), 1 / period)
+
+
+@njit(cache=True)
+def _supertrend_kernel(close, basic_upper, basic_lower, supertrend):
+    m = len(close)
+    if m == 0:
+        return
+    final_upper = basic_upper[0]
+    final_lower = basic_lower[0]
+    supertrend[0] = final_upper
+
+    for i in range(1, m):
+        prev_upper = final_upper
+        prev_lower = final_lower
+
+        if basic_upper[i] < prev_upper or close[i - 1] > prev_upper:
+            final_upper = basic_upper[i]
+        if basic_lower[i] > prev_lower or close[i - 1] < prev_lower:
+            final_lower = basic_lower[i]
+
+        if supertrend[i - 1] == prev_upper:
+            supertrend[i] = final_upper if close[i] <= final_upper else final_lower
+        else:
+            supertrend[i] = final_lower if close[i] >= final_lower else final_upper
+
+
+def supertrend(high, low, close, period: int = 10, multiplier: float = 3):
+    """
+    Supertrend on Wilder ATR bands around (high + low) / 2.
+
+    Returns:
+        (supertrend, direction): direction is 1 when close is above the line (bullish), -1 otherwise
+    """
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    atr = atr_wilder(high, low, close, period)
+    hl2 = (high + low) / 2
+    basic_upper = hl2 + multiplier * atr
+    basic_lower = hl2 - multiplier * atr
+
+    line = np.zeros(len(close))
+    _supertrend_kernel(close, basic_upper, basic_lower, line)
+    return line, np.where(close > line, 1, -1)
+
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    """Relative Strength Index from simple rolling means of gains and losses."""
+    delta = np.diff(_as_array(close), prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = _rolling_mean(gain, period) / _rolling_mean(loss, period)
+        return 100 - (100 / (1 + rs))
+
+
+def adx(high, low, close, period: int = 14):
+    """
+    Average Directional Index.
+
+    Returns:
+        (adx, atr): atr here is the simple rolling mean of true range used to scale the DIs
+    """
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    plus_dm = np.diff(high, prepend=np.nan)
+    minus_dm = np.diff(low, prepend=np.nan)
+    plus_dm[plus_dm < 0] = 0
+    minus_dm[minus_dm > 0] = 0
+
+    atr = _rolling_mean(true_range(high, low, close), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * (_ewm(plus_dm, 1 / period, adjust=True) / atr)
+        minus_di = 100 * (_ewm(np.abs(minus_dm), 1 / period, adjust=True) / atr)
+        dx = (np.abs(plus_di - minus_di) / np.abs(plus_di + minus_di)) * 100
+
+    prev_dx = np.concatenate(([np.nan], dx[:-1])) if len(dx) else dx
+    adx_raw = ((prev_dx * (period - 1)) + dx) / period
+    return _ewm(adx_raw, 1 / period, adjust=True), atr
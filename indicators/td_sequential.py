@@ -0,0 +1,221 @@
+"""
+TD Sequential (神奇九转) engine shared by the TD reports and research scripts.
+
+Every function works on 1-D arrays (one symbol) or 2-D arrays (symbols x bars, NaN padded),
+always along the last axis. Setup counts, perfection and TDST levels are vectorized with NumPy;
+the countdown is path dependent and runs in a loop kernel that Numba compiles when it is installed.
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicators._numba import njit
+
+SETUP_LENGTH = 9
+COUNTDOWN_LENGTH = 13
+MIN_BARS = 13  # 4 bars for the comparison + 9 for the setup
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    """Shift right along the last axis, filling with NaN."""
+    shifted = np.full(values.shape, np.nan)
+    shifted[..., periods:] = values[..., :-periods]
+    return shifted
+
+
+def _run_lengths(flags: np.ndarray) -> np.ndarray:
+    """Length of the current run of True values at each position along the last axis."""
+    totals = np.cumsum(flags, axis=-1)
+    at_breaks = np.where(flags, 0, totals)
+    return totals - np.maximum.accumulate(at_breaks, axis=-1)
+
+
+def _ffill(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Carry values[mask] forward along the last axis, NaN before the first masked position."""
+    positions = np.where(mask, np.arange(values.shape[-1]), -1)
+    positions = np.maximum.accumulate(positions, axis=-1)
+    filled = np.take_along_axis(values, np.maximum(positions, 0), axis=-1)
+    return np.where(positions >= 0, filled, np.nan)
+
+
+def td_setup_counts(close, reset_after_9: bool = True):
+    """
+    TD Setup counts.
+
+    A buy setup counts consecutive bars closing below the close 4 bars earlier, a sell setup
+    bars closing above it; an equal (or NaN) comparison resets both. With reset_after_9 the
+    count restarts at 1 after reaching 9, otherwise it keeps growing with the run.
+
+    Returns:
+        (buy_setup, sell_setup) integer arrays shaped like close
+    """
+    close = np.asarray(close, dtype=np.float64)
+    compare = _shift(close, 4)
+    buy = _run_lengths(close < compare)
+    sell = _run_lengths(close > compare)
+    if reset_after_9:
+        buy = np.where(buy > 0, (buy - 1) % SETUP_LENGTH + 1, 0)
+        sell = np.where(sell > 0, (sell - 1) % SETUP_LENGTH + 1, 0)
+    return buy, sell
+
+
+def td_perfection(buy_setup, sell_setup, high, low):
+    """
+    Perfected setups: on a completed buy setup the low of bar 8 or 9 is at or below the lows of
+    bars 6 and 7; on a completed sell setup the high of bar 8 or 9 is at or above the highs of 6 and 7.
+
+    Returns:
+        (buy_perfected, sell_perfected) boolean arrays, True only on setup 9 bars
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+
+    low_6_7 = np.fmin(_shift(low, 3), _shift(low, 2))
+    buy_perfected = (np.asarray(buy_setup) == SETUP_LENGTH) & ((low <= low_6_7) | (_shift(low, 1) <= low_6_7))
+
+    high_6_7 = np.fmax(_shift(high, 3), _shift(high, 2))
+    sell_perfected = (np.asarray(sell_setup) == SETUP_LENGTH) & ((high >= high_6_7) | (_shift(high, 1) >= high_6_7))
+
+    return buy_perfected, sell_perfected
+
+
+def tdst_levels(buy_setup, sell_setup, high, low):
+    """
+    TDST levels: the highest high of the latest completed buy setup (resistance) and the lowest
+    low of the latest completed sell setup (support), carried forward until the next setup.
+
+    Returns:
+        (tdst_resistance, tdst_support) float arrays, NaN until the first completed setup
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = high.shape[-1]
+
+    setup_high = np.full(high.shape, np.nan)
+    setup_low = np.full(low.shape, np.nan)
+    if n >= SETUP_LENGTH:
+        windows = np.lib.stride_tricks.sliding_window_view
+        setup_high[..., SETUP_LENGTH - 1:] = windows(high, SETUP_LENGTH, axis=-1).max(axis=-1)
+        setup_low[..., SETUP_LENGTH - 1:] = windows(low, SETUP_LENGTH, axis=-1).min(axis=-1)
+
+    resistance = _ffill(setup_high, np.asarray(buy_setup) == SETUP_LENGTH)
+    support = _ffill(setup_low, np.asarray(sell_setup) == SETUP_LENGTH)
+    return resistance, support
+
+
+@njit(cache=True)
+def _countdown_kernel(close, high, low, buy_setup, sell_setup, buy_out, sell_out):
+    rows, n = close.shape
+    for r in range(rows):
+        buy_active = False
+        sell_active = False
+        buy_count = 0
+        sell_count = 0
+        for i in range(n):
+            if buy_setup[r, i] == 9:
+                if not buy_active:
+                    buy_active = True
+                    buy_count = 0
+                sell_active = False
+                sell_count = 0
+            elif sell_setup[r, i] == 9:
+                if not sell_active:
+                    sell_active = True
+                    sell_count = 0
+                buy_active = False
+                buy_count = 0
+
+            if i < 2:
+                continue
+            if buy_active and close[r, i] <= low[r, i - 2]:
+                buy_count += 1
+                buy_out[r, i] = buy_count
+                if buy_count == 13:
+                    buy_active = False
+                    buy_count = 0
+            if sell_active and close[r, i] >= high[r, i - 2]:
+                sell_count += 1
+                sell_out[r, i] = sell_count
+                if sell_count == 13:
+                    sell_active = False
+                    sell_count = 0
+
+
+def td_countdown(close, high, low, buy_setup, sell_setup):
+    """
+    TD Countdown. Starts on a completed setup (including the setup 9 bar itself) and counts,
+    not necessarily consecutively, buy bars closing at or below the low 2 bars earlier and sell
+    bars closing at or above the high 2 bars earlier, until 13. An opposite completed setup cancels it.
+
+    Returns:
+        (buy_countdown, sell_countdown) integer arrays, non-zero only on qualifying bars
+    """
+    close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+    high = np.atleast_2d(np.asarray(high, dtype=np.float64))
+    low = np.atleast_2d(np.asarray(low, dtype=np.float64))
+    buy_setup_2d = np.atleast_2d(np.asarray(buy_setup, dtype=np.int64))
+    sell_setup_2d = np.atleast_2d(np.asarray(sell_setup, dtype=np.int64))
+
+    buy_out = np.zeros(close.shape, dtype=np.int64)
+    sell_out = np.zeros(close.shape, dtype=np.int64)
+    _countdown_kernel(close, high, low, buy_setup_2d, sell_setup_2d, buy_out, sell_out)
+
+    shape = np.shape(buy_setup)
+    return buy_out.reshape(shape), sell_out.reshape(shape)
+
+
+def td_sequential_arrays(close, high, low, reset_after_9: bool = True) -> dict:
+    """Compute every TD Sequential series for 1-D or 2-D (symbols x bars) price arrays."""
+    buy_setup, sell_setup = td_setup_counts(close, reset_after_9)
+    buy_perfected, sell_perfected = td_perfection(buy_setup, sell_setup, high, low)
+    tdst_resistance, tdst_support = tdst_levels(buy_setup, sell_setup, high, low)
+    buy_countdown, sell_countdown = td_countdown(close, high, low, buy_setup, sell_setup)
+    return {
+        'td_buy_setup': buy_setup,
+        'td_sell_setup': sell_setup,
+        'td_buy_perfected': buy_perfected,
+        'td_sell_perfected': sell_perfected,
+        'td_buy_countdown': buy_countdown,
+        'td_sell_countdown': sell_countdown,
+        'tdst_resistance': tdst_resistance,
+        'tdst_support': tdst_support,
+    }
+
+
+def add_mid_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """Add open/high/low/close columns as the average of the bid and ask prices."""
+    df['open'] = (df['bid_open'] + df['ask_open']) / 2
+    df['high'] = (df['bid_high'] + df['ask_high']) / 2
+    df['low'] = (df['bid_low'] + df['ask_low']) / 2
+    df['close'] = (df['bid_close'] + df['ask_close']) / 2
+    return df
+
+
+def calculate_td_sequential(df: pd.DataFrame, reset_after_9: bool = True, full: bool = False) -> pd.DataFrame:
+    """
+    Calculate TD Sequential counts for a DataFrame of sticks.
+
+    Args:
+        df: DataFrame with bid/ask OHLC columns, indexed by datetime
+        reset_after_9: Restart setup counts at 1 after a completed setup
+        full: Also add perfection, countdown and TDST columns
+
+    Returns:
+        Copy of df with mid price columns and td_buy_setup/td_sell_setup (plus the full
+        series when requested), or df unchanged if it has fewer than 13 bars
+    """
+    if df.empty or len(df) < MIN_BARS:
+        return df
+
+    df = add_mid_prices(df.copy())
+    close = df['close'].to_numpy()
+
+    if full:
+        series = td_sequential_arrays(close, df['high'].to_numpy(), df['low'].to_numpy(), reset_after_9)
+    else:
+        buy_setup, sell_setup = td_setup_counts(close, reset_after_9)
+        series = {'td_buy_setup': buy_setup, 'td_sell_setup': sell_setup}
+
+    for column, values in series.items():
+        df[column] = values
+    return df
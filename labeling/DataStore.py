@@ -1,35 +1,184 @@
+import io
+import os
 import pickle
+import sqlite3
+from contextlib import closing
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+LEGACY_PICKLE = 'trendy-ema.p'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    interval REAL NOT NULL,
+    is_pattern INTEGER,
+    is_up INTEGER,
+    ema_n INTEGER,
+    start_time TEXT,
+    end_time TEXT,
+    n_sticks INTEGER NOT NULL,
+    sticks BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+)
+"""
+_MIGRATED_KEY = 'legacy_pickle_migrated'
+_METADATA_COLUMNS = ['id', 'symbol', 'interval', 'is_pattern', 'is_up', 'ema_n', 'start_time', 'end_time', 'n_sticks']
+
+
+def _to_bool(value):
+    return None if value is None else bool(value)
+
+
+def _encode_sticks(sticks: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    sticks.to_parquet(buffer)
+    return buffer.getvalue()
+
+
+def _decode_sticks(blob: bytes, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    return pd.read_parquet(io.BytesIO(blob), columns=columns)
 
 
 class DataStore:
-    def __init__(self, file_path='trendy-ema.p'):
+    """
+    Append-only store of labeled stick samples in a SQLite table.
+
+    Each label is a single INSERT of its metadata plus the sticks DataFrame serialized as a Parquet
+    blob, so labeling cost does not grow with the number of samples. Nothing is loaded on
+    construction; samples are read lazily (iter_samples) or as columnar arrays for training
+    (read_metadata, read_sticks_array). An empty database imports the legacy pickle file next to
+    it, if there is one, until an import has completed (recorded in the meta table), so a failed
+    import is retried on the next open.
+    """
+
+    def __init__(self, file_path='trendy-ema.db', legacy_path: Optional[str] = None):
         self.file_path = file_path
-        try:
-            with open(self.file_path, 'rb') as f:
-                self.data = pickle.load(f)
-        except (FileNotFoundError, EOFError):
-            self.data = []
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+        if legacy_path is None:
+            legacy_path = os.path.join(os.path.dirname(self.file_path), LEGACY_PICKLE)
+        if os.path.exists(legacy_path) and self.get_meta(_MIGRATED_KEY) is None:
+            # A database filled before the meta table existed was already migrated
+            if len(self) == 0:
+                migrated = migrate_pickle(legacy_path, self)
+                print(f"Migrated {migrated} samples from {legacy_path} to {self.file_path}")
+            self.set_meta(_MIGRATED_KEY, legacy_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.file_path, timeout=30)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_meta(self, key: str, value: str):
+        with closing(self._connect()) as connection, connection:
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
 
     def store_data(self, symbol, interval, is_pattern, is_up, ema_n, sticks):
-        # Append new data
-        self.data.append({
-            'symbol': symbol,
-            'interval': interval,
-            'is_pattern': is_pattern,
-            'is_up': is_up,
-            'ema_n': ema_n,
-            'sticks': sticks,
-        })
-
-        # Write data back to file
-        with open(self.file_path, 'wb') as f:
-            pickle.dump(self.data, f)
+        self.store_many([(symbol, interval, is_pattern, is_up, ema_n, sticks)])
+
+    def store_many(self, samples):
+        """Append (symbol, interval, is_pattern, is_up, ema_n, sticks) tuples in one transaction."""
+        rows = [(
+            symbol,
+            float(interval),
+            _to_bool(is_pattern),
+            _to_bool(is_up),
+            None if ema_n is None else int(ema_n),
+            str(sticks.index[0]) if len(sticks) else None,
+            str(sticks.index[-1]) if len(sticks) else None,
+            len(sticks),
+            _encode_sticks(sticks),
+        ) for symbol, interval, is_pattern, is_up, ema_n, sticks in samples]
+
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                "INSERT INTO samples (symbol, interval, is_pattern, is_up, ema_n, start_time, end_time, n_sticks, sticks) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def __len__(self):
+        with closing(self._connect()) as connection:
+            return connection.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+
+    def read_metadata(self) -> pd.DataFrame:
+        """Labels of every sample without their sticks."""
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(f"SELECT {', '.join(_METADATA_COLUMNS)} FROM samples ORDER BY id", connection)
+
+    def iter_samples(self, columns: Optional[List[str]] = None, batch_size: int = 256) -> Iterator[dict]:
+        """Yield samples one at a time, decoding only the requested stick columns."""
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(f"SELECT {', '.join(_METADATA_COLUMNS)}, sticks FROM samples ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    sample = dict(zip(_METADATA_COLUMNS, row[:-1]))
+                    sample['is_pattern'] = _to_bool(sample['is_pattern'])
+                    sample['is_up'] = _to_bool(sample['is_up'])
+                    sample['sticks'] = _decode_sticks(row[-1], columns)
+                    yield sample
+
+    def read_sticks_array(self, columns: List[str], n_sticks: int = 100, dtype=np.float32):
+        """
+        Stick columns of all samples with exactly n_sticks bars as one array for training.
+
+        Returns:
+            (metadata, values): metadata DataFrame aligned with values of shape (samples, n_sticks, len(columns))
+        """
+        metadata = []
+        values = []
+        for sample in self.iter_samples(columns):
+            if sample['n_sticks'] != n_sticks:
+                continue
+            values.append(sample.pop('sticks')[columns].to_numpy(dtype=dtype))
+            metadata.append(sample)
+        array = np.stack(values) if values else np.empty((0, n_sticks, len(columns)), dtype=dtype)
+        return pd.DataFrame(metadata, columns=_METADATA_COLUMNS), array
 
     def read_data(self):
-        # Read data from file
-        with open(self.file_path, 'rb') as f:
-            return pickle.load(f)
+        """All samples as a list of dicts (symbol, interval, is_pattern, is_up, ema_n, sticks), like the old pickle."""
+        return [
+            {key: sample[key] for key in ('symbol', 'interval', 'is_pattern', 'is_up', 'ema_n', 'sticks')}
+            for sample in self.iter_samples()
+        ]
+
+
+def migrate_pickle(pickle_path: str, data_store: DataStore) -> int:
+    """Import the samples of a legacy pickle DataStore file; returns how many were imported."""
+    with open(pickle_path, 'rb') as f:
+        try:
+            data = pickle.load(f)
+        except EOFError:
+            return 0
+
+    data_store.store_many([
+        (item['symbol'], item['interval'], item.get('is_pattern'), item.get('is_up'), item.get('ema_n'), item['sticks'])
+        for item in data
+    ])
+    return len(data)
+
+
+if __name__ == '__main__':
+    # One-time migration: python -m labeling.DataStore labeling/trendy-ema.p labeling/trendy-ema.db
+    import sys
+
+    source, target = sys.argv[1], sys.argv[2]
+    store = DataStore(target, legacy_path='')
+    print(f"Migrated {migrate_pickle(source, store)} samples from {source} to {target}")
 
 # from labeling.DataStore import *
-# datastore = DataStore('labeling/trendy-ema.p')
-# data = datastore.read_data()
+# datastore = DataStore('labeling/trendy-ema.db')
+# metadata, sticks = datastore.read_sticks_array(['ask_open', 'ask_high', 'ask_low', 'ask_close'])
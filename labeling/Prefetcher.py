@@ -0,0 +1,123 @@
+import atexit
+import os
+import pickle
+import queue
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+from labeling.DataStore import DataStore
+
+T = TypeVar('T')
+
+
+class Prefetcher(Generic[T]):
+    """
+    Keeps up to depth results of produce() ready in a background thread.
+
+    get() hands out a prefetched result and the worker immediately starts on the next one, so
+    the caller only waits on produce() when it drains the queue faster than it is refilled.
+    Failed produce() calls are logged and retried after retry_delay seconds.
+    """
+
+    def __init__(self, produce: Callable[[], T], depth: int = 5, retry_delay: float = 1.0):
+        self.produce = produce
+        self.retry_delay = retry_delay
+        self._ready: 'queue.Queue[T]' = queue.Queue(maxsize=depth)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _run(self):
+        while True:
+            try:
+                item = self.produce()
+            except Exception as e:
+                print(f"prefetch failed: {e}")
+                time.sleep(self.retry_delay)
+                continue
+            self._ready.put(item)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='prefetcher', daemon=True)
+                self._thread.start()
+
+    def get(self) -> T:
+        self.start()
+        try:
+            return self._ready.get_nowait()
+        except queue.Empty:
+            return self.produce()
+
+
+class LabelWriter:
+    """
+    Write-behind queue in front of a DataStore.
+
+    store_data() only enqueues the sample; a background thread appends queued samples in
+    batches of up to batch_size with DataStore.store_many. Samples of a failed write are kept,
+    retried with the next batch and saved meanwhile to fallback_path in the legacy pickle format
+    (importable with migrate_pickle). flush() blocks until everything queued so far is handled,
+    reports samples that are still unwritten, and runs at interpreter exit.
+    """
+
+    def __init__(self, data_store: DataStore, batch_size: int = 64, fallback_path: Optional[str] = None):
+        self.data_store = data_store
+        self.batch_size = batch_size
+        self.fallback_path = fallback_path or f"{os.path.splitext(data_store.file_path)[0]}-unwritten.p"
+        self._unwritten = []
+        self._pending = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='label-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def store_data(self, symbol, interval, is_pattern, is_up, ema_n, sticks):
+        self._pending.put((symbol, interval, is_pattern, is_up, ema_n, sticks))
+
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+    def _write(self, batch):
+        samples = self._unwritten + batch
+        had_unwritten = bool(self._unwritten)
+        try:
+            self.data_store.store_many(samples)
+            self._unwritten = []
+        except Exception as e:
+            print(f"failed to store {len(samples)} labels, keeping them in {self.fallback_path}: {e}")
+            self._unwritten = samples
+        if self._unwritten or had_unwritten:
+            self._save_unwritten()
+
+    def _save_unwritten(self):
+        try:
+            if not self._unwritten:
+                os.remove(self.fallback_path)
+                return
+            with open(self.fallback_path, 'wb') as f:
+                pickle.dump([
+                    {'symbol': symbol, 'interval': interval, 'is_pattern': is_pattern, 'is_up': is_up,
+                     'ema_n': ema_n, 'sticks': sticks}
+                    for symbol, interval, is_pattern, is_up, ema_n, sticks in self._unwritten
+                ], f)
+        except OSError as e:
+            print(f"failed to update {self.fallback_path}: {e}")
+
+    def flush(self) -> int:
+        """Wait for the queued samples; returns how many could not be stored."""
+        self._pending.join()
+        if self._unwritten:
+            print(f"{len(self._unwritten)} labels are not stored yet; they are saved in {self.fallback_path}")
+        return len(self._unwritten)
@@ -1,70 +1,86 @@
 import random
 
 import pandas as pd
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from pandas import Timestamp
 
-from data.SticksEnrichment import add_ema
 from data.Symbols import healthy_shares
-from data.TimescaleDBSticksDao import get_sticks
 from labeling.DataStore import DataStore
+from labeling.Prefetcher import LabelWriter, Prefetcher
+from labeling.WindowCache import StickArrays, WindowCache
+from plot.chart_data import (MSGPACK_MIMETYPE, OHLCV_FIELDS, Chart, chart_from_arrays, chart_from_frame,
+                             encode_msgpack, to_columns, to_records)
 
 app = Flask(__name__)
 CORS(app)
 data_store = DataStore()
+label_writer = LabelWriter(data_store)
+window_cache = WindowCache()
 
-default_sticks = None
 min_sticks = 150
+label_sticks_n = 100
+prefetch_depth = 5
+
+# Chart field -> stick column
+CANDLESTICK_FIELDS = {**OHLCV_FIELDS, "ema18": 'ema18', "ema50": 'ema50', "ema200": 'ema200'}
+
+
+def arrays_to_chart(sticks: StickArrays) -> Chart:
+    return chart_from_arrays(sticks.epochs_ms, sticks.column, CANDLESTICK_FIELDS)
 
 
 def df_to_dict(df: pd.DataFrame):
-    return [{
-        "time": idx.strftime('%Y-%m-%d %H:%M:%S'),  # Assumes index is a datetime
-        "open": row['ask_open'],
-        "high": row['ask_high'],
-        "low": row['ask_low'],
-        "close": row['ask_close'],
-        "volume": row['volume'],
-        "ema18": row['ema18'],
-        "ema50": row['ema50'],
-        "ema200": row['ema200'],
-    } for idx, row in df.iterrows()]
+    # Assumes index is a datetime
+    return to_records(chart_from_frame(df, CANDLESTICK_FIELDS))
+
+
+def chart_response(chart: Chart, **meta):
+    """
+    The chart in the format the client asked for: ?format=msgpack (or Accept: application/msgpack)
+    for binary columns, ?format=columns for JSON columns with epoch-second times, otherwise the
+    original list of per-bar objects under "candlesticks".
+    """
+    response_format = request.args.get('format')
+    if response_format == 'msgpack' or (response_format is None and
+                                        request.accept_mimetypes.best == MSGPACK_MIMETYPE):
+        return Response(encode_msgpack(chart, **meta), mimetype=MSGPACK_MIMETYPE)
+    if response_format == 'columns':
+        return jsonify({**meta, "columns": to_columns(chart)})
+    return jsonify({**meta, "candlesticks": to_records(chart)})
+
+
+def random_window(symbol, interval) -> StickArrays:
+    sticks = window_cache.get(symbol, interval)
+    n = random.randint(0, len(sticks) - min_sticks)
+    return sticks.window(n, min_sticks)
 
 
 @app.route('/api/candlestick', methods=['GET'])
 def get_candlestick_data():
-    global default_sticks
     symbol = "CS.D.EURUSD.TODAY.IP"
-    if not default_sticks:
-        default_sticks = get_sticks(symbol, 15)
-        default_sticks = add_ema(default_sticks)
-    sticks = default_sticks
-    n = random.randint(0, len(sticks) - min_sticks)
-    sticks_to_plot = sticks[n:n + min_sticks]
+    sticks_to_plot = random_window(symbol, 15)
 
-    return jsonify({
-        "symbol": symbol,
-        "candlesticks": df_to_dict(sticks_to_plot)
-    })
+    return chart_response(arrays_to_chart(sticks_to_plot), symbol=symbol)
 
 
-@app.route('/api/random/candlestick', methods=['GET'])
-def get_random_candlestick_data():
+def random_chart():
     symbols = healthy_shares()
     symbol = random.choice(symbols)
     interval = random.choice([15, 30, 60, 1440])
-    sticks = get_sticks(symbol, interval)
-    sticks = add_ema(sticks)
+    sticks_to_plot = random_window(symbol, interval)
 
-    n = random.randint(0, len(sticks) - min_sticks)
-    sticks_to_plot = sticks[n:n + min_sticks]
+    return symbol, interval, arrays_to_chart(sticks_to_plot)
 
-    return jsonify({
-        "symbol": symbol,
-        "interval": interval,
-        "candlesticks": df_to_dict(sticks_to_plot)
-    })
+
+# Charts for the next clicks are fetched while the user labels the current one
+random_charts = Prefetcher(random_chart, depth=prefetch_depth)
+
+
+@app.route('/api/random/candlestick', methods=['GET'])
+def get_random_candlestick_data():
+    symbol, interval, chart = random_charts.get()
+    return chart_response(chart, symbol=symbol, interval=interval)
 
 
 @app.route('/api/ml/label', methods=['POST'])
@@ -76,15 +92,14 @@ def add_label():
     is_pattern = data.get('is_pattern')
     interval = float(data.get('interval'))
     timestamp = Timestamp(datetime_str, tz='UTC')
-    sticks = get_sticks(symbol, interval, to_time=timestamp)  # get up to todate
-    sticks = add_ema(sticks)
-    label_sticks = sticks.iloc[-100:]
+    # The chart being labeled was served from the window cache, so this is normally a slice, not a query
+    label_sticks = window_cache.window_until(symbol, interval, timestamp.value // 10 ** 6, label_sticks_n).to_frame()
 
     ema_period = data.get('ema')
-    is_up = sticks.ema200[-1] > sticks.ema200[-100]
+    is_up = label_sticks.ema200.iloc[-1] > label_sticks.ema200.iloc[-label_sticks_n]
 
     print(f"adding label {label_sticks.index[0]} {ema_period}")
-    data_store.store_data(symbol, interval, is_pattern, is_up, ema_period, label_sticks)
+    label_writer.store_data(symbol, interval, is_pattern, is_up, ema_period, label_sticks)
 
     return jsonify({
             'symbol': symbol,
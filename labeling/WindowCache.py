@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data.SticksEnrichment import add_ema
+from data.TimescaleDBSticksDao import get_sticks
+
+STICK_ARRAY_COLUMNS = ['ask_open', 'ask_high', 'ask_low', 'ask_close',
+                       'bid_open', 'bid_high', 'bid_low', 'bid_close',
+                       'volume', 'ema18', 'ema50', 'ema200']
+
+
+@dataclass
+class StickArrays:
+    """EMA-enriched sticks of one (symbol, interval) as an epoch vector and a float64 (bars x columns) matrix."""
+    epochs_ms: np.ndarray
+    values: np.ndarray
+    columns: List[str] = field(default_factory=lambda: list(STICK_ARRAY_COLUMNS))
+    loaded_at: float = 0.0
+
+    def __post_init__(self):
+        self._columns = {column: i for i, column in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.epochs_ms)
+
+    @property
+    def nbytes(self) -> int:
+        return self.epochs_ms.nbytes + self.values.nbytes
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self._columns[name]]
+
+    def window(self, start: int, length: int) -> 'StickArrays':
+        """Bars [start, start + length) as views on the cached arrays."""
+        return StickArrays(self.epochs_ms[start:start + length], self.values[start:start + length],
+                           self.columns, self.loaded_at)
+
+    def until(self, epoch_ms: int, length: int) -> 'StickArrays':
+        """The last length bars at or before epoch_ms."""
+        end = int(np.searchsorted(self.epochs_ms, epoch_ms, side='right'))
+        start = max(end - length, 0)
+        return self.window(start, end - start)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The sticks as get_sticks + add_ema return them (integer volume, epoch_utc_ms before the EMAs)."""
+        index = pd.DatetimeIndex(pd.to_datetime(self.epochs_ms // 1000, unit='s', utc=True), name='stick_datetime')
+        frame = pd.DataFrame(self.values, index=index, columns=self.columns)
+        if 'volume' in self._columns:
+            frame['volume'] = frame['volume'].astype(np.int64)
+            frame.insert(self._columns['volume'] + 1, 'epoch_utc_ms', self.epochs_ms)
+        return frame
+
+
+def load_stick_arrays(symbol, interval) -> StickArrays:
+    """Full stick history of symbol with EMA18/50/200 added, as arrays."""
+    sticks = add_ema(get_sticks(symbol, interval))
+    return StickArrays(
+        epochs_ms=(sticks.index.as_unit('ms').asi8 if len(sticks) else np.array([], dtype=np.int64)),
+        # Column-major, so every column of a window is a contiguous view
+        values=np.asfortranarray(sticks.reindex(columns=STICK_ARRAY_COLUMNS).to_numpy(dtype=np.float64)),
+        loaded_at=time.monotonic(),
+    )
+
+
+class WindowCache:
+    """
+    In-process LRU cache of EMA-enriched stick arrays per (symbol, interval).
+
+    Entries expire ttl_seconds after they were loaded, and the least recently used ones are
+    evicted once the cached arrays exceed max_bytes. Chart windows are served as slices of the
+    cached arrays, so only the first request for a (symbol, interval) hits the database.
+    Concurrent misses for the same key load it once.
+    """
+
+    def __init__(self, ttl_seconds: float = 900, max_bytes: int = 512 * 1024 ** 2,
+                 loader: Callable[[str, float], StickArrays] = load_stick_arrays):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries: 'OrderedDict[Tuple[str, float], StickArrays]' = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, float], threading.Lock] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._nbytes -= entry.nbytes
+
+    def _insert(self, key, entry: StickArrays):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._nbytes += entry.nbytes
+            # Never evict the entry just loaded, even if it alone exceeds the cap
+            while self._nbytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+
+    def get(self, symbol, interval) -> StickArrays:
+        key = (symbol, float(interval))
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._lookup(key)
+            if entry is None:
+                entry = self.loader(symbol, interval)
+                self._insert(key, entry)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return entry
+
+    def window(self, symbol, interval, start: int, length: int) -> StickArrays:
+        return self.get(symbol, interval).window(start, length)
+
+    def window_until(self, symbol, interval, epoch_ms: int, length: int) -> StickArrays:
+        """The last length bars at or before epoch_ms; reloads an entry that ends before epoch_ms."""
+        sticks = self.get(symbol, interval)
+        if len(sticks) == 0 or sticks.epochs_ms[-1] < epoch_ms:
+            self.invalidate(symbol, interval)
+            sticks = self.get(symbol, interval)
+        return sticks.until(epoch_ms, length)
+
+    def invalidate(self, symbol=None, interval=None):
+        """Drop one (symbol, interval) entry, or everything when called without arguments."""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+                self._nbytes = 0
+            elif (symbol, float(interval)) in self._entries:
+                self._remove((symbol, float(interval)))
@@ -7,14 +7,13 @@ import psycopg2
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data.db_config import get_db_connection
+from data.db_config import db_connection
 
 def get_iv_history(symbol: str) -> pd.DataFrame:
     """
     Retrieves the historical daily average IV for a symbol, 
     considering only near-the-money options (within 5% of underlying).
     """
-    conn = get_db_connection()
     try:
         query = """
             SELECT 
@@ -29,13 +28,12 @@ def get_iv_history(symbol: str) -> pd.DataFrame:
             ORDER BY date
         """
         # using pandas read_sql for convenience
-        df = pd.read_sql(query, conn, params=(symbol,))
+        with db_connection() as conn:
+            df = pd.read_sql(query, conn, params=(symbol,))
         return df
     except Exception as e:
         print(f"Error fetching IV history: {e}")
         return pd.DataFrame()
-    finally:
-        conn.close()
 
 def get_iv_rank(symbol: str):
     """
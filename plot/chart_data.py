@@ -0,0 +1,114 @@
+"""
+Column-oriented chart payloads shared by the labeling API and the chart plotter.
+
+A Chart is an int64 epoch-seconds vector plus one float array per field (open, high, low,
+close, volume and any indicators). Every encoding works a whole column at a time:
+
+- to_columns(): JSON-ready {"time": [...], "open": [...], ...}
+- to_records(): the legacy one-object-per-bar JSON list, built from the columns
+- encode_msgpack(): each column packed as raw little-endian bytes, which decode_msgpack()
+  maps back onto NumPy arrays without copying
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import msgpack
+import numpy as np
+import pandas as pd
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+# Chart field -> stick column
+OHLCV_FIELDS = {
+    'open': 'ask_open',
+    'high': 'ask_high',
+    'low': 'ask_low',
+    'close': 'ask_close',
+    'volume': 'volume',
+}
+
+
+@dataclass
+class Chart:
+    times: np.ndarray  # int64 epoch seconds
+    fields: Dict[str, np.ndarray]
+
+    def __len__(self):
+        return len(self.times)
+
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(pd.to_datetime(self.times, unit='s', utc=True), name='stick_datetime')
+
+
+def epoch_seconds(index) -> np.ndarray:
+    return pd.DatetimeIndex(index).as_unit('s').asi8
+
+
+def chart_from_frame(sticks: pd.DataFrame, fields: Dict[str, str] = OHLCV_FIELDS) -> Chart:
+    """Chart of the given stick columns; float64 columns are used without copying."""
+    return Chart(epoch_seconds(sticks.index),
+                 {name: sticks[column].to_numpy(dtype=np.float64) for name, column in fields.items()})
+
+
+def chart_from_arrays(epochs_ms: np.ndarray, column, fields: Dict[str, str] = OHLCV_FIELDS) -> Chart:
+    """Chart from an epoch_ms vector and a column(name) -> ndarray accessor (e.g. StickArrays.column)."""
+    return Chart(epochs_ms // 1000, {name: column(source) for name, source in fields.items()})
+
+
+def format_times(times: np.ndarray) -> list:
+    """Epoch seconds as 'YYYY-MM-DD HH:MM:SS' strings (UTC)."""
+    return np.char.replace(np.datetime_as_string(times.astype('datetime64[s]')), 'T', ' ').tolist()
+
+
+def to_columns(chart: Chart, time_format: str = 'epoch') -> dict:
+    """
+    JSON-ready columns. time_format is 'epoch' (integer seconds) or 'string'
+    ('YYYY-MM-DD HH:MM:SS').
+    """
+    columns = {'time': format_times(chart.times) if time_format == 'string' else chart.times.tolist()}
+    columns.update({name: values.tolist() for name, values in chart.fields.items()})
+    return columns
+
+
+def to_records(chart: Chart) -> list:
+    """One {"time", <field>...} dict per bar, with string times."""
+    columns = to_columns(chart, time_format='string')
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def _column_bytes(values: np.ndarray, dtype) -> memoryview:
+    array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    return memoryview(array).cast('B')
+
+
+def encode_msgpack(chart: Chart, dtype=np.float64, **meta) -> bytes:
+    """
+    Binary chart payload: meta entries plus 'time' and every field as raw little-endian
+    column bytes. dtype=np.float32 halves the size of the price columns.
+    """
+    dtype = np.dtype(dtype).newbyteorder('<')
+    return msgpack.packb({
+        **meta,
+        'length': len(chart),
+        'dtype': dtype.str,
+        'time': _column_bytes(chart.times, np.int64),
+        'fields': {name: _column_bytes(values, dtype) for name, values in chart.fields.items()},
+    })
+
+
+def decode_msgpack(payload: bytes) -> Tuple[dict, Chart]:
+    """Inverse of encode_msgpack: (meta, chart) with the columns as read-only views on payload."""
+    message = msgpack.unpackb(payload, raw=False)
+    dtype = np.dtype(message.pop('dtype'))
+    message.pop('length')
+    times = np.frombuffer(message.pop('time'), dtype='<i8')
+    fields = {name: np.frombuffer(data, dtype=dtype) for name, data in message.pop('fields').items()}
+    return message, Chart(times, fields)
+
+
+def ohlcv_frame(chart: Chart) -> pd.DataFrame:
+    """mplfinance Open/High/Low/Close/Volume frame over the chart's arrays."""
+    return pd.DataFrame({name.capitalize(): chart.fields[name] for name in OHLCV_FIELDS},
+                        index=chart.index(), copy=False)
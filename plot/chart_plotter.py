@@ -6,21 +6,44 @@ from datetime import datetime
 from typing import Optional
 import io
 from data.TimescaleDBSticksDao import get_sticks
+from indicators import kernels
+from plot.chart_data import Chart, chart_from_frame, ohlcv_frame
+
+EMA_WINDOWS = (20, 50, 150, 200)
 
 
 def calculate_ema(data: pd.Series, window: int) -> pd.Series:
     """Calculate Exponential Moving Average"""
-    return data.ewm(span=window, adjust=False).mean()
+    return pd.Series(kernels.ema(data.values, window), index=data.index)
 
 
 def calculate_rsi(data: pd.Series, window: int = 14) -> pd.Series:
     """Calculate Relative Strength Index"""
-    delta = data.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return pd.Series(kernels.rsi(data.values, window), index=data.index)
+
+
+def get_chart(symbol: str, from_time: datetime, to_time: datetime,
+              timeframe: int, show_ema: bool = True, show_rsi: bool = True) -> Chart:
+    """
+    Chart data behind plot_chart: ask OHLCV plus 'ema20', 'ema50', 'ema150', 'ema200' and 'rsi'
+    fields as requested. Encode it with plot.chart_data (to_columns, encode_msgpack) to serve
+    the same chart as data instead of an image.
+    """
+    # Fetch data using TimescaleDBSticksDao
+    df = get_sticks(symbol, timeframe, from_time, to_time)
+
+    if df.empty:
+        raise ValueError(f"No data found for {symbol} in the specified time range")
+
+    # Use ask prices for the main chart
+    chart = chart_from_frame(df)
+    close = chart.fields['close']
+    if show_ema:
+        for window in EMA_WINDOWS:
+            chart.fields[f'ema{window}'] = kernels.ema(close, window)
+    if show_rsi:
+        chart.fields['rsi'] = kernels.rsi(close, 14)
+    return chart
 
 
 def plot_chart(symbol: str, from_time: datetime, to_time: datetime, 
@@ -40,31 +63,18 @@ def plot_chart(symbol: str, from_time: datetime, to_time: datetime,
         bytes: PNG image data that can be used by MCP tools
     """
     
-    # Fetch data using TimescaleDBSticksDao
-    df = get_sticks(symbol, timeframe, from_time, to_time)
-    
-    if df.empty:
-        raise ValueError(f"No data found for {symbol} in the specified time range")
+    chart = get_chart(symbol, from_time, to_time, timeframe, show_ema, show_rsi)
+
+    # Prepare OHLCV data for mplfinance, as views on the chart columns
+    ohlcv_data = ohlcv_frame(chart)
     
-    # Prepare OHLCV data for mplfinance
-    # Use ask prices for the main chart
-    ohlcv_data = pd.DataFrame({
-        'Open': df['ask_open'],
-        'High': df['ask_high'], 
-        'Low': df['ask_low'],
-        'Close': df['ask_close'],
-        'Volume': df['volume']
-    }, index=df.index)
-    
-    # Calculate indicators
+    # Indicator series
     additional_plots = []
     
     if show_ema:
-        # Calculate EMAs
-        ema_20 = calculate_ema(ohlcv_data['Close'], 20)
-        ema_50 = calculate_ema(ohlcv_data['Close'], 50)
-        ema_150 = calculate_ema(ohlcv_data['Close'], 150)
-        ema_200 = calculate_ema(ohlcv_data['Close'], 200)
+        ema_20, ema_50, ema_150, ema_200 = (
+            pd.Series(chart.fields[f'ema{window}'], index=ohlcv_data.index) for window in EMA_WINDOWS
+        )
         
         # Add EMA lines to additional plots
         additional_plots.extend([
@@ -75,8 +85,7 @@ def plot_chart(symbol: str, from_time: datetime, to_time: datetime,
         ])
     
     if show_rsi:
-        # Calculate RSI
-        rsi = calculate_rsi(ohlcv_data['Close'])
+        rsi = pd.Series(chart.fields['rsi'], index=ohlcv_data.index)
         
         # Add RSI as subplot
         additional_plots.append(
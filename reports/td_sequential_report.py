@@ -26,6 +26,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from data.TimescaleDBSticksDao import get_sticks
 from data.db_config import get_db_connection
+from data.scan_runner import run_scan
+from indicators.td_sequential import calculate_td_sequential
 
 
 def get_hot_stock_symbols() -> List[str]:
@@ -41,64 +43,6 @@ def get_hot_stock_symbols() -> List[str]:
     return [row['symbol'] for row in rows]
 
 
-def calculate_td_sequential(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Calculate TD Sequential (神奇九转) counts for a DataFrame of price data.
-
-    Args:
-        df: DataFrame with 'bid_close' and 'ask_close' columns, indexed by datetime
-
-    Returns:
-        DataFrame with additional columns for TD Sequential counts and signals
-    """
-    if df.empty or len(df) < 13:  # Need at least 13 bars (4 for comparison + 9 for setup)
-        return df
-
-    df = df.copy()
-
-    # Use mid price (average of bid and ask close) for comparison
-    df['close'] = (df['bid_close'] + df['ask_close']) / 2
-
-    # TD Sequential Setup counts - initialize as float to avoid dtype issues
-    td_buy_setup = [0] * len(df)
-    td_sell_setup = [0] * len(df)
-
-    # Calculate setup counts
-    buy_count = 0
-    sell_count = 0
-
-    for i in range(4, len(df)):
-        current_close = df['close'].iloc[i]
-        compare_close = df['close'].iloc[i - 4]
-
-        # Bullish setup: close < close 4 bars ago
-        if current_close < compare_close:
-            buy_count += 1
-            sell_count = 0  # Reset sell count
-        # Bearish setup: close > close 4 bars ago
-        elif current_close > compare_close:
-            sell_count += 1
-            buy_count = 0  # Reset buy count
-        else:
-            # Equal - reset both counts
-            buy_count = 0
-            sell_count = 0
-
-        # Cap counts at 9 (and reset after completing a setup)
-        if buy_count > 9:
-            buy_count = 1  # Start new count
-        if sell_count > 9:
-            sell_count = 1  # Start new count
-
-        td_buy_setup[i] = buy_count
-        td_sell_setup[i] = sell_count
-
-    df['td_buy_setup'] = td_buy_setup
-    df['td_sell_setup'] = td_sell_setup
-
-    return df
-
-
 def find_td_signals(symbol: str) -> List[Dict]:
     """
     Find TD Sequential signals for a given symbol on the last trading day only.
@@ -113,56 +57,50 @@ def find_td_signals(symbol: str) -> List[Dict]:
 
     signals = []
 
-    try:
-        # Get daily sticks - need at least 13 bars for TD Sequential calculation
-        end_date = datetime.now(pytz.UTC)
-        start_date = end_date - timedelta(days=30)  # Get enough data for calculation
-
-        df = get_sticks(symbol, 1440, start_date, end_date)
-
-        if df.empty:
-            return signals
-
-        # Calculate TD Sequential
-        df = calculate_td_sequential(df)
-
-        if len(df) == 0:
-            return signals
-
-        # Only check the last stick (last trading day)
-        last_idx = df.index[-1]
-        last_row = df.iloc[-1]
-
-        # Bullish signal (buy setup completed)
-        if 'td_buy_setup' in last_row and last_row['td_buy_setup'] == 9:
-            signals.append({
-                'symbol': symbol,
-                'date': last_idx.strftime('%Y-%m-%d'),
-                'signal_type': 'BULLISH',
-                'signal_name': 'TD Buy Setup 9',
-                'close_price': last_row.get('close', 0),
-                'bid_close': last_row.get('bid_close', 0),
-                'ask_close': last_row.get('ask_close', 0),
-                'volume': last_row.get('volume', 0)
-            })
-
-        # Bearish signal (sell setup completed)
-        if 'td_sell_setup' in last_row and last_row['td_sell_setup'] == 9:
-            signals.append({
-                'symbol': symbol,
-                'date': last_idx.strftime('%Y-%m-%d'),
-                'signal_type': 'BEARISH',
-                'signal_name': 'TD Sell Setup 9',
-                'close_price': last_row.get('close', 0),
-                'bid_close': last_row.get('bid_close', 0),
-                'ask_close': last_row.get('ask_close', 0),
-                'volume': last_row.get('volume', 0)
-            })
-
-    except Exception as e:
-        # Silently skip symbols without data
-        if "stick_datetime" not in str(e):
-            print(f"Error processing {symbol}: {e}")
+    # Get daily sticks - need at least 13 bars for TD Sequential calculation
+    end_date = datetime.now(pytz.UTC)
+    start_date = end_date - timedelta(days=30)  # Get enough data for calculation
+
+    df = get_sticks(symbol, 1440, start_date, end_date)
+
+    if df.empty:
+        return signals
+
+    # Calculate TD Sequential
+    df = calculate_td_sequential(df)
+
+    if len(df) == 0:
+        return signals
+
+    # Only check the last stick (last trading day)
+    last_idx = df.index[-1]
+    last_row = df.iloc[-1]
+
+    # Bullish signal (buy setup completed)
+    if 'td_buy_setup' in last_row and last_row['td_buy_setup'] == 9:
+        signals.append({
+            'symbol': symbol,
+            'date': last_idx.strftime('%Y-%m-%d'),
+            'signal_type': 'BULLISH',
+            'signal_name': 'TD Buy Setup 9',
+            'close_price': last_row.get('close', 0),
+            'bid_close': last_row.get('bid_close', 0),
+            'ask_close': last_row.get('ask_close', 0),
+            'volume': last_row.get('volume', 0)
+        })
+
+    # Bearish signal (sell setup completed)
+    if 'td_sell_setup' in last_row and last_row['td_sell_setup'] == 9:
+        signals.append({
+            'symbol': symbol,
+            'date': last_idx.strftime('%Y-%m-%d'),
+            'signal_type': 'BEARISH',
+            'signal_name': 'TD Sell Setup 9',
+            'close_price': last_row.get('close', 0),
+            'bid_close': last_row.get('bid_close', 0),
+            'ask_close': last_row.get('ask_close', 0),
+            'volume': last_row.get('volume', 0)
+        })
 
     return signals
 
@@ -181,11 +119,8 @@ def generate_report() -> pd.DataFrame:
 
     all_signals = []
 
-    for i, symbol in enumerate(symbols):
-        if i % 50 == 0:
-            print(f"Processing {i+1}/{len(symbols)}: {symbol}")
-
-        signals = find_td_signals(symbol)
+    scan = run_scan(symbols, find_td_signals, progress_every=50)
+    for signals in scan.values():
         all_signals.extend(signals)
 
     print(f"\nFound {len(all_signals)} total signals")
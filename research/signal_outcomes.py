@@ -0,0 +1,58 @@
+"""
+Vectorized outcome evaluator for signal probability studies.
+
+Entry is the open of the bar after the signal, exit the close `horizon` bars after entry.
+- Bullish: win if exit close > entry open * (1 - buffer)
+- Bearish: win if exit close < entry open * (1 + buffer)
+All signals are evaluated for a whole grid of horizons and buffers in one pass with NumPy fancy indexing.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def evaluate_signals(opens, closes, signal_indices, horizons, buffers, bullish: bool):
+    """
+    Evaluate signals over a grid of horizons and buffers.
+
+    Args:
+        opens, closes: 1-D price arrays of one symbol
+        signal_indices: Bar indices where the signal fired
+        horizons: Exit horizons in bars after entry, shape (H,)
+        buffers: Win buffers as fractions of the entry price, shape (B,)
+        bullish: Evaluate as a long (True) or short (False) signal
+
+    Returns:
+        (signals, wins): signals has shape (H,) and counts the signals whose exit bar exists
+        for each horizon; wins has shape (H, B)
+    """
+    opens = np.asarray(opens, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    horizons = np.asarray(horizons, dtype=np.int64)
+    buffers = np.asarray(buffers, dtype=np.float64)
+    n = len(closes)
+
+    entry_idx = np.asarray(signal_indices, dtype=np.int64) + 1
+    exit_idx = entry_idx[:, None] + horizons[None, :]                      # (S, H)
+    valid = exit_idx < n
+
+    entry_open = opens[np.minimum(entry_idx, n - 1)][:, None, None]       # (S, 1, 1)
+    exit_close = closes[np.minimum(exit_idx, n - 1)][:, :, None]          # (S, H, 1)
+    if bullish:
+        won = exit_close > entry_open * (1 - buffers)
+    else:
+        won = exit_close < entry_open * (1 + buffers)
+
+    signals = valid.sum(axis=0)
+    wins = (won & valid[:, :, None]).sum(axis=0)
+    return signals, wins
+
+
+def win_rate_frame(signals, wins, horizons, buffers) -> pd.DataFrame:
+    """Win rate in percent as a horizon x buffer DataFrame (NaN where there were no signals)."""
+    signals = np.asarray(signals, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(signals[:, None] > 0, np.asarray(wins) / signals[:, None] * 100, np.nan)
+    return pd.DataFrame(rates,
+                        index=pd.Index(horizons, name='horizon'),
+                        columns=pd.Index(buffers, name='buffer'))
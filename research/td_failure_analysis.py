@@ -10,6 +10,8 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from data.TimescaleDBSticksDao import get_sticks
 from data.db_config import get_db_connection
+from data.scan_runner import run_scan
+from indicators.td_sequential import calculate_td_sequential
 
 def get_liquid_symbols(limit=50):
     """Get top liquid symbols to test"""
@@ -25,136 +27,102 @@ def get_liquid_symbols(limit=50):
     connection.close()
     return [row['symbol'] for row in rows]
 
-def calculate_td_sequential(df):
-    """Calculate TD Setup 9"""
-    close = df['close'].values
-    buy_setup = np.zeros(len(df), dtype=int)
-    sell_setup = np.zeros(len(df), dtype=int)
-    
-    b_count = 0
-    s_count = 0
-    
-    for i in range(4, len(df)):
-        if close[i] < close[i-4]:
-            b_count += 1
-            s_count = 0
-        elif close[i] > close[i-4]:
-            s_count += 1
-            b_count = 0
-        else:
-            b_count = 0
-            s_count = 0
-            
-        if b_count == 9:
-            buy_setup[i] = 9
-            b_count = 0 # Reset for simplicity in this specific test
-        if s_count == 9:
-            sell_setup[i] = 9
-            s_count = 0
-            
-    df['td_buy'] = buy_setup
-    df['td_sell'] = sell_setup
-    return df
+def analyze_symbol_failures(symbol):
+    """Find failed Setup 9 moves for one symbol"""
+    results = []
+
+    # Get 2 years of daily data
+    df = get_sticks(symbol, 1440, limit=700)
+    if df.empty or len(df) < 50:
+        return results
+
+    # Adds mid close/high/low and the setup counts
+    df = calculate_td_sequential(df)
+
+    # --- Analyze BUY SETUP 9 Failures (Bull Put Spread Risk) ---
+    # Failure = Price closes BELOW the Low of the 9th bar within next 5 days
+    buy_signals = df[df['td_buy_setup'] == 9]
+
+    for date, row in buy_signals.iterrows():
+        idx = df.index.get_loc(date)
+        if idx + 10 >= len(df): continue
+
+        # The "Support" of the Setup 9 candle
+        setup_low = row['low']
+
+        # Check next 5 days for failure
+        failed = False
+        failure_idx = -1
+        failure_price = 0
+
+        for i in range(1, 6):
+            current_bar = df.iloc[idx + i]
+            if current_bar['close'] < setup_low:
+                failed = True
+                failure_idx = idx + i
+                failure_price = current_bar['close']
+                break
+
+        if failed:
+            # Measure the "Waterfall" after failure
+            # Look at the NEXT 5 days after the failure occurred
+            post_fail_low = failure_price
+            for k in range(1, 6):
+                if failure_idx + k < len(df):
+                    post_fail_low = min(post_fail_low, df.iloc[failure_idx + k]['low'])
+
+            drop_pct = (post_fail_low - failure_price) / failure_price
+            results.append({
+                'type': 'BUY_FAIL',
+                'symbol': symbol,
+                'fail_date': df.index[failure_idx],
+                'move_pct': drop_pct * 100 # This will be negative
+            })
+
+    # --- Analyze SELL SETUP 9 Failures (Bear Call Spread Risk) ---
+    # Failure = Price closes ABOVE the High of the 9th bar
+    sell_signals = df[df['td_sell_setup'] == 9]
+
+    for date, row in sell_signals.iterrows():
+        idx = df.index.get_loc(date)
+        if idx + 10 >= len(df): continue
+
+        setup_high = row['high']
+
+        failed = False
+        failure_idx = -1
+        failure_price = 0
+
+        for i in range(1, 6):
+            current_bar = df.iloc[idx + i]
+            if current_bar['close'] > setup_high:
+                failed = True
+                failure_idx = idx + i
+                failure_price = current_bar['close']
+                break
+
+        if failed:
+            post_fail_high = failure_price
+            for k in range(1, 6):
+                if failure_idx + k < len(df):
+                    post_fail_high = max(post_fail_high, df.iloc[failure_idx + k]['high'])
+
+            rise_pct = (post_fail_high - failure_price) / failure_price
+            results.append({
+                'type': 'SELL_FAIL',
+                'symbol': symbol,
+                'fail_date': df.index[failure_idx],
+                'move_pct': rise_pct * 100 # This will be positive
+            })
+
+    return results
 
 def analyze_failures():
     symbols = get_liquid_symbols(50)
     print(f"Analyzing 'Failed 9' moves for {len(symbols)} symbols...")
     
-    results = []
-    
-    for symbol in symbols:
-        try:
-            # Get 2 years of daily data
-            df = get_sticks(symbol, 1440, limit=700)
-            if df.empty or len(df) < 50:
-                continue
-                
-            # Calculate close (mid)
-            df['close'] = (df['bid_close'] + df['ask_close']) / 2
-            df['high'] = (df['bid_high'] + df['ask_high']) / 2
-            df['low'] = (df['bid_low'] + df['ask_low']) / 2
-            
-            df = calculate_td_sequential(df)
-            
-            # --- Analyze BUY SETUP 9 Failures (Bull Put Spread Risk) ---
-            # Failure = Price closes BELOW the Low of the 9th bar within next 5 days
-            buy_signals = df[df['td_buy'] == 9]
-            
-            for date, row in buy_signals.iterrows():
-                idx = df.index.get_loc(date)
-                if idx + 10 >= len(df): continue
-                
-                # The "Support" of the Setup 9 candle
-                setup_low = row['low']
-                
-                # Check next 5 days for failure
-                failed = False
-                failure_idx = -1
-                failure_price = 0
-                
-                for i in range(1, 6):
-                    current_bar = df.iloc[idx + i]
-                    if current_bar['close'] < setup_low:
-                        failed = True
-                        failure_idx = idx + i
-                        failure_price = current_bar['close']
-                        break
-                
-                if failed:
-                    # Measure the "Waterfall" after failure
-                    # Look at the NEXT 5 days after the failure occurred
-                    post_fail_low = failure_price
-                    for k in range(1, 6):
-                        if failure_idx + k < len(df):
-                            post_fail_low = min(post_fail_low, df.iloc[failure_idx + k]['low'])
-                    
-                    drop_pct = (post_fail_low - failure_price) / failure_price
-                    results.append({
-                        'type': 'BUY_FAIL',
-                        'symbol': symbol,
-                        'fail_date': df.index[failure_idx],
-                        'move_pct': drop_pct * 100 # This will be negative
-                    })
-
-            # --- Analyze SELL SETUP 9 Failures (Bear Call Spread Risk) ---
-            # Failure = Price closes ABOVE the High of the 9th bar
-            sell_signals = df[df['td_sell'] == 9]
-            
-            for date, row in sell_signals.iterrows():
-                idx = df.index.get_loc(date)
-                if idx + 10 >= len(df): continue
-                
-                setup_high = row['high']
-                
-                failed = False
-                failure_idx = -1
-                failure_price = 0
-                
-                for i in range(1, 6):
-                    current_bar = df.iloc[idx + i]
-                    if current_bar['close'] > setup_high:
-                        failed = True
-                        failure_idx = idx + i
-                        failure_price = current_bar['close']
-                        break
-                        
-                if failed:
-                    post_fail_high = failure_price
-                    for k in range(1, 6):
-                        if failure_idx + k < len(df):
-                            post_fail_high = max(post_fail_high, df.iloc[failure_idx + k]['high'])
-                            
-                    rise_pct = (post_fail_high - failure_price) / failure_price
-                    results.append({
-                        'type': 'SELL_FAIL',
-                        'symbol': symbol,
-                        'fail_date': df.index[failure_idx],
-                        'move_pct': rise_pct * 100 # This will be positive
-                    })
-                    
-        except Exception as e:
-            # print(f"Skipping {symbol}: {e}")
-            pass
+    scan = run_scan(symbols, analyze_symbol_failures, progress_every=10)
+    results = [failure for failures in scan.values() for failure in failures]
 
     # --- Summary ---
     res_df = pd.DataFrame(results)
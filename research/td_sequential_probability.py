@@ -19,12 +19,20 @@ import pytz
 # Add the parent directory to the path so we can import from data module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data.TimescaleDBSticksDao import get_sticks
+from data.TimescaleDBSticksDao import get_sticks, get_sticks_many
 from data.db_config import get_db_connection
+from data.scan_runner import ScanResult, run_batch_scan, scan_serial
+from indicators.td_sequential import calculate_td_sequential
+from research.signal_outcomes import evaluate_signals, win_rate_frame
 
 # Configuration Constants
 TIME_HORIZON = 5  # T+n days
 BUFFER_PCT = 0.03  # 1% buffer for option premium
+FETCH_BATCH_SIZE = 100  # Symbols per get_sticks_many query
+DAYS_BACK = 365 * 3
+
+HORIZONS = [1, 3, 5, 10, 20]  # Exit horizons swept in one pass (must include TIME_HORIZON)
+BUFFERS = [0.0, 0.01, 0.02, 0.03, 0.05]  # Buffers swept in one pass (must include BUFFER_PCT)
 
 
 def get_filtered_symbols() -> list[str]:
@@ -45,125 +53,67 @@ def get_filtered_symbols() -> list[str]:
     return [row['symbol'] for row in rows]
 
 
-def calculate_td_sequential(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Calculate TD Sequential (神奇九转) counts for a DataFrame of price data.
-    """
-    if df.empty or len(df) < 13:
-        return df
-
-    df = df.copy()
-    # Use mid price (average of bid and ask close) for comparison, or just use bid/ask/close logic from report
-    # The report uses (bid_close + ask_close) / 2
-    df['close'] = (df['bid_close'] + df['ask_close']) / 2
-    # We also need 'open' for the entry price. Let's use average open.
-    df['open'] = (df['bid_open'] + df['ask_open']) / 2
-
-    # TD Sequential Setup counts
-    td_buy_setup = np.zeros(len(df), dtype=int)
-    td_sell_setup = np.zeros(len(df), dtype=int)
-
-    buy_count = 0
-    sell_count = 0
-    
-    # We need to access values quickly. Iterating numpy arrays or rows is slow, but for daily data it is fine.
-    # Optimizing by iterating over index
-    closes = df['close'].values
-    
-    for i in range(4, len(df)):
-        current_close = closes[i]
-        compare_close = closes[i - 4]
-
-        if current_close < compare_close:
-            buy_count += 1
-            sell_count = 0
-        elif current_close > compare_close:
-            sell_count += 1
-            buy_count = 0
-        else:
-            buy_count = 0
-            sell_count = 0
-
-        if buy_count > 9:
-            buy_count = 1
-        if sell_count > 9:
-            sell_count = 1
-
-        td_buy_setup[i] = buy_count
-        td_sell_setup[i] = sell_count
-
-    df['td_buy_setup'] = td_buy_setup
-    df['td_sell_setup'] = td_sell_setup
-
-    return df
-
-
-def analyze_symbol(symbol: str, days_back: int = 365*3) -> dict:
+def analyze_symbol(symbol: str, days_back: int = DAYS_BACK, df: pd.DataFrame = None) -> dict:
     """
     Analyze a single symbol for TD signals and their outcomes.
+    If df is given (e.g. from get_sticks_many), it is used instead of fetching the symbol's sticks.
     """
     stats = {
         'symbol': symbol,
         'bullish_signals': 0,
         'bullish_wins': 0,
         'bearish_signals': 0,
-        'bearish_wins': 0
+        'bearish_wins': 0,
+        'bullish_grid_signals': np.zeros(len(HORIZONS), dtype=int),
+        'bullish_grid_wins': np.zeros((len(HORIZONS), len(BUFFERS)), dtype=int),
+        'bearish_grid_signals': np.zeros(len(HORIZONS), dtype=int),
+        'bearish_grid_wins': np.zeros((len(HORIZONS), len(BUFFERS)), dtype=int)
     }
 
-    try:
+    if df is None:
         end_date = datetime.now(pytz.UTC)
         start_date = end_date - timedelta(days=days_back)
 
         # 1440 minutes = 1 day
         df = get_sticks(symbol, 1440, start_date, end_date)
 
-        if df.empty:
-            return stats
+    if df.empty:
+        return stats
 
-        df = calculate_td_sequential(df)
+    df = calculate_td_sequential(df)
 
-        if 'td_buy_setup' not in df.columns:
-            return stats
+    if 'td_buy_setup' not in df.columns:
+        return stats
 
-        # Find signals
-        # Signal is when count == 9
-        
-        # Bullish Analysis
-        bullish_indices = np.where(df['td_buy_setup'] == 9)[0]
-        for idx in bullish_indices:
-            # Entry is next open (idx + 1)
-            # Exit is T+n (idx + 1 + TIME_HORIZON)
-            entry_idx = idx + 1
-            exit_idx = idx + 1 + TIME_HORIZON
-            
-            if exit_idx < len(df):
-                entry_open = df.iloc[entry_idx]['open']
-                exit_close = df.iloc[exit_idx]['close']
-                
-                stats['bullish_signals'] += 1
-                if exit_close > entry_open * (1 - BUFFER_PCT):
-                    stats['bullish_wins'] += 1
-
-        # Bearish Analysis
-        bearish_indices = np.where(df['td_sell_setup'] == 9)[0]
-        for idx in bearish_indices:
-            entry_idx = idx + 1
-            exit_idx = idx + 1 + TIME_HORIZON
-            
-            if exit_idx < len(df):
-                entry_open = df.iloc[entry_idx]['open']
-                exit_close = df.iloc[exit_idx]['close']
-                
-                stats['bearish_signals'] += 1
-                if exit_close < entry_open * (1 + BUFFER_PCT):
-                    stats['bearish_wins'] += 1
-
-    except Exception as e:
-        print(f"Error processing {symbol}: {e}")
+    # Signal is when count == 9
+    # Entry is next open (idx + 1), exit is the close at T+n (idx + 1 + horizon)
+    opens = df['open'].to_numpy()
+    closes = df['close'].to_numpy()
+    bullish_indices = np.flatnonzero(df['td_buy_setup'].to_numpy() == 9)
+    bearish_indices = np.flatnonzero(df['td_sell_setup'].to_numpy() == 9)
+
+    bull_signals, bull_wins = evaluate_signals(opens, closes, bullish_indices, HORIZONS, BUFFERS, bullish=True)
+    bear_signals, bear_wins = evaluate_signals(opens, closes, bearish_indices, HORIZONS, BUFFERS, bullish=False)
+    stats['bullish_grid_signals'], stats['bullish_grid_wins'] = bull_signals, bull_wins
+    stats['bearish_grid_signals'], stats['bearish_grid_wins'] = bear_signals, bear_wins
+
+    h, b = HORIZONS.index(TIME_HORIZON), BUFFERS.index(BUFFER_PCT)
+    stats['bullish_signals'] = int(bull_signals[h])
+    stats['bullish_wins'] = int(bull_wins[h, b])
+    stats['bearish_signals'] = int(bear_signals[h])
+    stats['bearish_wins'] = int(bear_wins[h, b])
 
     return stats
 
 
+def analyze_batch(symbols: tuple, days_back: int = DAYS_BACK) -> ScanResult:
+    """Fetch a batch of symbols with one get_sticks_many query and analyze each of them."""
+    end_date = datetime.now(pytz.UTC)
+    start_date = end_date - timedelta(days=days_back)
+    sticks = get_sticks_many(symbols, 1440, start_date, end_date)
+    return scan_serial(symbols, lambda symbol: analyze_symbol(symbol, df=sticks[symbol]))
+
+
 def main():
     print("Fetching symbols from stock_metadata table (Active & Dollar Volume > 100M)...")
     symbols = get_filtered_symbols()
@@ -173,22 +123,25 @@ def main():
         'bullish_signals': 0,
         'bullish_wins': 0,
         'bearish_signals': 0,
-        'bearish_wins': 0
+        'bearish_wins': 0,
+        'bullish_grid_signals': np.zeros(len(HORIZONS), dtype=int),
+        'bullish_grid_wins': np.zeros((len(HORIZONS), len(BUFFERS)), dtype=int),
+        'bearish_grid_signals': np.zeros(len(HORIZONS), dtype=int),
+        'bearish_grid_wins': np.zeros((len(HORIZONS), len(BUFFERS)), dtype=int)
     }
     
     symbol_results = []
 
-    for i, symbol in enumerate(symbols):
-        if i % 10 == 0:
-            print(f"Processing {i}/{len(symbols)}: {symbol}...")
-            
-        stats = analyze_symbol(symbol)
-        
+    scan = run_batch_scan(symbols, analyze_batch, FETCH_BATCH_SIZE, progress_every=1)
+
+    for stats in scan.values():
         total_stats['bullish_signals'] += stats['bullish_signals']
         total_stats['bullish_wins'] += stats['bullish_wins']
         total_stats['bearish_signals'] += stats['bearish_signals']
         total_stats['bearish_wins'] += stats['bearish_wins']
-        
+        for key in ('bullish_grid_signals', 'bullish_grid_wins', 'bearish_grid_signals', 'bearish_grid_wins'):
+            total_stats[key] += stats[key]
+
         if stats['bullish_signals'] > 0 or stats['bearish_signals'] > 0:
             symbol_results.append(stats)
 
@@ -219,6 +172,12 @@ def main():
     print(f"  Successful Outcomes: {bear_wins}")
     print(f"  Success Rate: {bear_rate:.2f}%")
     
+    # Win rates for every horizon (rows, bars after entry) and buffer (columns)
+    print("\nBullish Success Rate (%) by Horizon x Buffer:")
+    print(win_rate_frame(total_stats['bullish_grid_signals'], total_stats['bullish_grid_wins'], HORIZONS, BUFFERS).round(2).to_string())
+    print("\nBearish Success Rate (%) by Horizon x Buffer:")
+    print(win_rate_frame(total_stats['bearish_grid_signals'], total_stats['bearish_grid_wins'], HORIZONS, BUFFERS).round(2).to_string())
+    
     print("\n" + "="*60)
     
     # Top Performers (min 5 signals)
@@ -21,11 +21,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from data.TimescaleDBSticksDao import get_sticks
 from data.db_config import get_db_connection
+from data.scan_runner import run_scan
+from indicators.td_sequential import calculate_td_sequential
+from research.signal_outcomes import evaluate_signals, win_rate_frame
 
 # Configuration Constants
 TIME_HORIZON = 5  # T+n bars (5 * 15m = 75 minutes)
 BUFFER_PCT = 0.001  # 0.1% buffer for option premium (kept same as daily, might be high for 15m but following "same selection")
 
+HORIZONS = [1, 2, 5, 10, 26]  # Exit horizons swept in one pass (must include TIME_HORIZON)
+BUFFERS = [0.0, 0.001, 0.002, 0.005]  # Buffers swept in one pass (must include BUFFER_PCT)
+
 
 def get_filtered_symbols() -> list[str]:
     """Get active symbols with dollar_volume > 100M from stock_metadata"""
@@ -45,56 +51,6 @@ def get_filtered_symbols() -> list[str]:
     return [row['symbol'] for row in rows]
 
 
-def calculate_td_sequential(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Calculate TD Sequential (神奇九转) counts for a DataFrame of price data.
-    """
-    if df.empty or len(df) < 13:
-        return df
-
-    df = df.copy()
-    # Use mid price (average of bid and ask close) for comparison
-    df['close'] = (df['bid_close'] + df['ask_close']) / 2
-    # We also need 'open' for the entry price. Let's use average open.
-    df['open'] = (df['bid_open'] + df['ask_open']) / 2
-
-    # TD Sequential Setup counts
-    td_buy_setup = np.zeros(len(df), dtype=int)
-    td_sell_setup = np.zeros(len(df), dtype=int)
-
-    buy_count = 0
-    sell_count = 0
-    
-    closes = df['close'].values
-    
-    for i in range(4, len(df)):
-        current_close = closes[i]
-        compare_close = closes[i - 4]
-
-        if current_close < compare_close:
-            buy_count += 1
-            sell_count = 0
-        elif current_close > compare_close:
-            sell_count += 1
-            buy_count = 0
-        else:
-            buy_count = 0
-            sell_count = 0
-
-        if buy_count > 9:
-            buy_count = 1
-        if sell_count > 9:
-            sell_count = 1
-
-        td_buy_setup[i] = buy_count
-        td_sell_setup[i] = sell_count
-
-    df['td_buy_setup'] = td_buy_setup
-    df['td_sell_setup'] = td_sell_setup
-
-    return df
-
-
 def analyze_symbol(symbol: str, days_back: int = 365*3) -> dict:
     """
     Analyze a single symbol for TD signals and their outcomes.
@@ -104,60 +60,44 @@ def analyze_symbol(symbol: str, days_back: int = 365*3) -> dict:
         'bullish_signals': 0,
         'bullish_wins': 0,
         'bearish_signals': 0,
-        'bearish_wins': 0
+        'bearish_wins': 0,
+        'bullish_grid_signals': np.zeros(len(HORIZONS), dtype=int),
+        'bullish_grid_wins': np.zeros((len(HORIZONS), len(BUFFERS)), dtype=int),
+        'bearish_grid_signals': np.zeros(len(HORIZONS), dtype=int),
+        'bearish_grid_wins': np.zeros((len(HORIZONS), len(BUFFERS)), dtype=int)
     }
 
-    try:
-        end_date = datetime.now(pytz.UTC)
-        start_date = end_date - timedelta(days=days_back)
+    end_date = datetime.now(pytz.UTC)
+    start_date = end_date - timedelta(days=days_back)
 
-        # 15 minutes interval
-        df = get_sticks(symbol, 15, start_date, end_date)
+    # 15 minutes interval
+    df = get_sticks(symbol, 15, start_date, end_date)
 
-        if df.empty:
-            return stats
+    if df.empty:
+        return stats
 
-        df = calculate_td_sequential(df)
+    df = calculate_td_sequential(df)
 
-        if 'td_buy_setup' not in df.columns:
-            return stats
+    if 'td_buy_setup' not in df.columns:
+        return stats
 
-        # Find signals
-        # Signal is when count == 9
-        
-        # Bullish Analysis
-        bullish_indices = np.where(df['td_buy_setup'] == 9)[0]
-        for idx in bullish_indices:
-            # Entry is next open (idx + 1)
-            # Exit is T+n (idx + 1 + TIME_HORIZON)
-            entry_idx = idx + 1
-            exit_idx = idx + 1 + TIME_HORIZON
-            
-            if exit_idx < len(df):
-                entry_open = df.iloc[entry_idx]['open']
-                exit_close = df.iloc[exit_idx]['close']
-                
-                stats['bullish_signals'] += 1
-                if exit_close > entry_open * (1 - BUFFER_PCT):
-                    stats['bullish_wins'] += 1
-
-        # Bearish Analysis
-        bearish_indices = np.where(df['td_sell_setup'] == 9)[0]
-        for idx in bearish_indices:
-            entry_idx = idx + 1
-            exit_idx = idx + 1 + TIME_HORIZON
-            
-            if exit_idx < len(df):
-                entry_open = df.iloc[entry_idx]['open']
-                exit_close = df.iloc[exit_idx]['close']
-                
-                stats['bearish_signals'] += 1
-                if exit_close < entry_open * (1 + BUFFER_PCT):
-                    stats['bearish_wins'] += 1
-
-    except Exception as e:
-        # print(f"Error processing {symbol}: {e}")
-        pass
+    # Signal is when count == 9
+    # Entry is next open (idx + 1), exit is the close at T+n (idx + 1 + horizon)
+    opens = df['open'].to_numpy()
+    closes = df['close'].to_numpy()
+    bullish_indices = np.flatnonzero(df['td_buy_setup'].to_numpy() == 9)
+    bearish_indices = np.flatnonzero(df['td_sell_setup'].to_numpy() == 9)
+
+    bull_signals, bull_wins = evaluate_signals(opens, closes, bullish_indices, HORIZONS, BUFFERS, bullish=True)
+    bear_signals, bear_wins = evaluate_signals(opens, closes, bearish_indices, HORIZONS, BUFFERS, bullish=False)
+    stats['bullish_grid_signals'], stats['bullish_grid_wins'] = bull_signals, bull_wins
+    stats['bearish_grid_signals'], stats['bearish_grid_wins'] = bear_signals, bear_wins
+
+    h, b = HORIZONS.index(TIME_HORIZON), BUFFERS.index(BUFFER_PCT)
+    stats['bullish_signals'] = int(bull_signals[h])
+    stats['bullish_wins'] = int(bull_wins[h, b])
+    stats['bearish_signals'] = int(bear_signals[h])
+    stats['bearish_wins'] = int(bear_wins[h, b])
 
     return stats
 
@@ -173,25 +113,25 @@ def main():
         'bullish_signals': 0,
         'bullish_wins': 0,
         'bearish_signals': 0,
-        'bearish_wins': 0
+        'bearish_wins': 0,
+        'bullish_grid_signals': np.zeros(len(HORIZONS), dtype=int),
+        'bullish_grid_wins': np.zeros((len(HORIZONS), len(BUFFERS)), dtype=int),
+        'bearish_grid_signals': np.zeros(len(HORIZONS), dtype=int),
+        'bearish_grid_wins': np.zeros((len(HORIZONS), len(BUFFERS)), dtype=int)
     }
     
     symbol_results = []
 
-    # Process subset for testing if list is huge, but user said "same selection", so we do all.
-    # However, for 15m data, this might be very slow.
-    # I will process all but maybe print progress more frequently.
-    
-    for i, symbol in enumerate(symbols):
-        if i % 10 == 0:
-            print(f"Processing {i}/{len(symbols)}: {symbol}...")
-            
-        stats = analyze_symbol(symbol)
-        
+    # 15m data is heavy, so symbols are scanned in parallel with frequent progress updates
+    scan = run_scan(symbols, analyze_symbol, progress_every=10)
+
+    for stats in scan.values():
         total_stats['bullish_signals'] += stats['bullish_signals']
         total_stats['bullish_wins'] += stats['bullish_wins']
         total_stats['bearish_signals'] += stats['bearish_signals']
         total_stats['bearish_wins'] += stats['bearish_wins']
+        for key in ('bullish_grid_signals', 'bullish_grid_wins', 'bearish_grid_signals', 'bearish_grid_wins'):
+            total_stats[key] += stats[key]
         
         if stats['bullish_signals'] > 0 or stats['bearish_signals'] > 0:
             symbol_results.append(stats)
@@ -223,6 +163,12 @@ def main():
     print(f"  Successful Outcomes: {bear_wins}")
     print(f"  Success Rate: {bear_rate:.2f}%")
     
+    # Win rates for every horizon (rows, bars after entry) and buffer (columns)
+    print("\nBullish Success Rate (%) by Horizon x Buffer:")
+    print(win_rate_frame(total_stats['bullish_grid_signals'], total_stats['bullish_grid_wins'], HORIZONS, BUFFERS).round(2).to_string())
+    print("\nBearish Success Rate (%) by Horizon x Buffer:")
+    print(win_rate_frame(total_stats['bearish_grid_signals'], total_stats['bearish_grid_wins'], HORIZONS, BUFFERS).round(2).to_string())
+    
     print("\n" + "="*60)
     
     # Top Performers (min 5 signals)
@@ -1,12 +1,21 @@
+from typing import List, Optional
+
+import numpy as np
 from pandas import DataFrame, Series
 
-from rl.TradingState import TradingState
+from rl.StateMatrix import StateMatrix
+from rl.TradingState import CLOSED_POSITION_DTYPE, ArrayTradingState, TradingState
+
+VECTOR_CLOSED_POSITION_DTYPE = np.dtype([('env', np.int64)] + CLOSED_POSITION_DTYPE.descr)
 
 
 class ForexEnvironment:
-    def __init__(self, input_size, all_sticks: DataFrame):
+    def __init__(self, input_size, all_sticks: DataFrame, window: int = 50):
         self.all_sticks = all_sticks
         self.input_size = input_size
+        self.states = StateMatrix(all_sticks, window)
+        assert self.states.state_size == input_size, \
+            f"Expected state of size {input_size}, but got {self.states.state_size}"
         self.current_step = 0
         self.state = TradingState(self.input_size, self.all_sticks.iloc[:self.input_size])
         self.past_positions = []
@@ -16,6 +25,10 @@ class ForexEnvironment:
         self.state = TradingState(self.input_size, self.all_sticks.iloc[:self.input_size])
         self.past_positions = []
 
+    def get_state(self, i) -> np.ndarray:
+        """Precomputed float32 state of stick i (see StateMatrix)."""
+        return self.states[i]
+
     def calculate_reward(self, action: int) -> float:
         if action == 0 or self.state.current_position['direction'] == 0:
             return 0.0
@@ -37,3 +50,173 @@ class ForexEnvironment:
             done = False
         return current_reward, done
 
+
+
+class ArrayForexEnvironment:
+    """
+    Gym-style ForexEnvironment over preloaded NumPy arrays.
+
+    Observations are rows of the precomputed StateMatrix and the trading state is an
+    ArrayTradingState, so a step only indexes Python float lists. An episode starts at the first
+    stick with a full state window; step(action) trades at the current stick and moves to the
+    next one, with the same rewards as ForexEnvironment.step.
+    """
+
+    def __init__(self, all_sticks: DataFrame, window: int = 50):
+        self.index = all_sticks.index
+        self.states = StateMatrix(all_sticks, window)
+        self.ask_close = all_sticks['ask_close'].to_numpy(dtype=np.float64).tolist()
+        self.bid_close = all_sticks['bid_close'].to_numpy(dtype=np.float64).tolist()
+        self.first_step = window
+        self.last_step = len(all_sticks) - 1
+        self.trading_state = ArrayTradingState()
+        self.current_step = self.first_step
+
+    @property
+    def observation_size(self) -> int:
+        return self.states.state_size
+
+    def reset(self, seed=None):
+        """Start a new episode; returns (observation, info)."""
+        self.current_step = self.first_step
+        self.trading_state.reset()
+        return self.states[self.current_step], {'step': self.current_step}
+
+    def step(self, action: int):
+        """Returns (observation, reward, terminated, truncated, info)."""
+        i = self.current_step
+        reward = self.trading_state.update(i, self.ask_close[i], self.bid_close[i], action)
+        self.current_step = i + 1
+        terminated = self.current_step >= self.last_step
+        return self.states[self.current_step], reward, terminated, False, {'step': self.current_step}
+
+    def positions_frame(self) -> DataFrame:
+        """Closed positions of the current episode with their open/close datetimes."""
+        positions = DataFrame(self.trading_state.past_positions)
+        positions.insert(1, 'open_datetime', self.index[positions['open_index'].to_numpy()])
+        positions.insert(2, 'close_datetime', self.index[positions['close_index'].to_numpy()])
+        return positions
+
+
+class VectorForexEnvironment:
+    """
+    n_envs independent ArrayForexEnvironment episodes stepped in lockstep with array operations.
+
+    Every symbol's stick frame is reduced to its bars with a full state window, and these are
+    concatenated into flat ask/bid/state arrays; environment e trades on frame e % len(frames).
+    Each environment has a pointer into the flat arrays and its open position in per-environment
+    arrays, so one step is a handful of NumPy operations whatever n_envs is. Rewards match
+    ArrayForexEnvironment.step for the same actions.
+
+    Finished episodes restart automatically, at the first bar of their frame or, with
+    random_start, at a random bar. step() returns the observations to act on next (after any
+    restart) and info['next_observation'], the true next state of every environment for the
+    replay transition.
+    """
+
+    def __init__(self, frames: List[DataFrame], n_envs: int, window: int = 50, random_start: bool = False,
+                 seed: Optional[int] = None):
+        frames = [frame for frame in frames if len(frame) > window + 1]
+        assert frames, f"Need at least one stick frame longer than {window + 1} bars"
+        self.n_envs = n_envs
+        self.window = window
+        self.random_start = random_start
+        self.rng = np.random.default_rng(seed)
+
+        self.indexes = [frame.index[window:] for frame in frames]
+        self.states = np.concatenate([StateMatrix(frame, window).states for frame in frames])
+        self.ask_close = np.concatenate([frame['ask_close'].to_numpy(dtype=np.float64)[window:] for frame in frames])
+        self.bid_close = np.concatenate([frame['bid_close'].to_numpy(dtype=np.float64)[window:] for frame in frames])
+        lengths = np.array([len(frame) - window for frame in frames], dtype=np.int64)
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+        env_frames = np.arange(n_envs) % len(frames)
+        self.env_frame = env_frames
+        self.segment_start = starts[env_frames]
+        # An episode ends once its pointer reaches the frame's last bar
+        self.segment_last = starts[env_frames] + lengths[env_frames] - 1
+
+        self.pos = np.empty(n_envs, dtype=np.int64)
+        self.direction = np.zeros(n_envs, dtype=np.int8)
+        self.open_price = np.zeros(n_envs, dtype=np.float64)
+        self.open_pos = np.full(n_envs, -1, dtype=np.int64)
+        self._closed = []
+
+    @property
+    def observation_size(self) -> int:
+        return self.states.shape[1]
+
+    def _starts(self, envs: np.ndarray) -> np.ndarray:
+        if not self.random_start:
+            return self.segment_start[envs]
+        return self.rng.integers(self.segment_start[envs], self.segment_last[envs])
+
+    def _restart(self, envs: np.ndarray):
+        self.pos[envs] = self._starts(envs)
+        self.direction[envs] = 0
+        self.open_price[envs] = 0.0
+        self.open_pos[envs] = -1
+
+    def reset(self, seed=None):
+        """Restart every environment; returns (observations, info)."""
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._restart(np.arange(self.n_envs))
+        self._closed = []
+        return self.states[self.pos], {'pos': self.pos.copy()}
+
+    def step(self, actions: np.ndarray):
+        """
+        Apply actions (0: sell, 1: hold, 2: buy), one per environment.
+
+        Returns:
+            (observations, rewards, terminated, truncated, info)
+        """
+        pos = self.pos
+        target = np.asarray(actions, dtype=np.int8) - 1
+        ask = self.ask_close[pos]
+        bid = self.bid_close[pos]
+
+        in_position = self.direction != 0
+        opening = ~in_position & (target != 0)
+        closing = in_position & (target != 0) & (target != self.direction)
+        current_price = np.where(target == 1, bid, ask)
+        running_profit = np.where(in_position, (current_price - self.open_price) * self.direction, 0.0)
+        rewards = np.where(closing & (running_profit > 0), running_profit * 10, running_profit)
+
+        if closing.any():
+            envs = np.flatnonzero(closing)
+            closed = np.empty(len(envs), dtype=VECTOR_CLOSED_POSITION_DTYPE)
+            closed['env'] = envs
+            closed['direction'] = self.direction[envs]
+            closed['open_index'] = self.open_pos[envs]
+            closed['close_index'] = pos[envs]
+            closed['open_price'] = self.open_price[envs]
+            closed['close_price'] = current_price[envs]
+            closed['running_profit'] = running_profit[envs]
+            self._closed.append(closed)
+
+        self.direction = np.where(opening, target, np.where(closing, 0, self.direction)).astype(np.int8)
+        self.open_price = np.where(opening, np.where(target == 1, ask, bid), np.where(closing, 0.0, self.open_price))
+        self.open_pos = np.where(opening, pos, np.where(closing, -1, self.open_pos))
+
+        self.pos = pos + 1
+        terminated = self.pos >= self.segment_last
+        next_observations = self.states[self.pos]
+        if terminated.any():
+            self._restart(np.flatnonzero(terminated))
+        observations = self.states[self.pos] if terminated.any() else next_observations
+        truncated = np.zeros(self.n_envs, dtype=bool)
+        return observations, rewards, terminated, truncated, {'next_observation': next_observations}
+
+    def positions_frame(self) -> DataFrame:
+        """Positions closed since reset(), with their environment and open/close datetimes."""
+        closed = np.concatenate(self._closed) if self._closed else np.empty(0, dtype=VECTOR_CLOSED_POSITION_DTYPE)
+        positions = DataFrame(closed)
+        frames = self.env_frame[closed['env']]
+        for column in ('open_index', 'close_index'):
+            # Flat array position -> bar index within the environment's frame
+            local = closed[column] - self.segment_start[closed['env']]
+            positions[column.replace('index', 'datetime')] = [self.indexes[f][i] for f, i in zip(frames, local)]
+            positions[column] = local + self.window
+        return positions
@@ -0,0 +1,57 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from pandas import DataFrame
+
+STATE_COLUMNS = ['ask_open', 'ask_high', 'ask_low', 'ask_close', 'volume', 'ema18', 'ema50', 'ema200']
+# Columns divided by the window's last ask_close; volume is left as is
+NORMALIZED_COLUMNS = ['ask_open', 'ask_high', 'ask_low', 'ask_close', 'ema18', 'ema50', 'ema200']
+
+
+class StateMatrix:
+    """
+    Every DQN state of a stick series, computed once.
+
+    The state of bar i is the window of the previous `window` sticks (STATE_COLUMNS, prices and
+    EMAs divided by the last close of the window), flattened row by row, followed by the time
+    (HHMM) and day of week (Sunday = 0) of bar i: 50 * 8 + 2 = 402 values for the default window.
+
+    Windows are read through a zero-copy sliding window view of the stick columns and written
+    into one float32 (bars - window) x state_size matrix in chunks; states are then rows of that
+    matrix, looked up by bar index.
+    """
+
+    def __init__(self, sticks: DataFrame, window: int = 50, chunk_size: int = 4096):
+        self.window = window
+        features = sticks[STATE_COLUMNS].to_numpy(dtype=np.float64)
+        # (bars - window + 1) x len(STATE_COLUMNS) x window, without copying
+        windows = sliding_window_view(features, window, axis=0)[:len(features) - window]
+
+        normalized = np.array([column in NORMALIZED_COLUMNS for column in STATE_COLUMNS])
+        index = sticks.index
+        time_int = index.hour * 100 + index.minute
+        day_of_week = (index.dayofweek + 1) % 7
+
+        n_values = window * len(STATE_COLUMNS)
+        self.states = np.empty((len(windows), n_values + 2), dtype=np.float32)
+        for start in range(0, len(windows), chunk_size):
+            chunk = windows[start:start + chunk_size]
+            last_close = chunk[:, STATE_COLUMNS.index('ask_close'), -1]
+            divisor = np.where(normalized[None, :], last_close[:, None], 1.0)
+            values = chunk / divisor[:, :, None]
+            self.states[start:start + len(chunk), :n_values] = values.transpose(0, 2, 1).reshape(len(chunk), n_values)
+        self.states[:, n_values] = time_int[window:]
+        self.states[:, n_values + 1] = day_of_week[window:]
+
+    @property
+    def state_size(self) -> int:
+        return self.states.shape[1]
+
+    def __len__(self):
+        return len(self.states)
+
+    def __getitem__(self, i) -> np.ndarray:
+        """State of bar i (i >= window), or a batch of states for an index array."""
+        if np.isscalar(i):
+            assert i >= self.window, f"Index out of range. Need at least {self.window} previous sticks."
+            return self.states[i - self.window]
+        return self.states[np.asarray(i) - self.window]
@@ -1,5 +1,6 @@
 from typing import Any
 
+import numpy as np
 from pandas import DataFrame, Series
 
 
@@ -75,3 +76,69 @@ class Position:
         running_profit = (current_price - self.open_price) * self.direction
         self.running_profit = running_profit
         return running_profit
+
+
+# Closed positions of ArrayTradingState, one record per round trip
+CLOSED_POSITION_DTYPE = np.dtype([
+    ('direction', np.int8),
+    ('open_index', np.int64),
+    ('close_index', np.int64),
+    ('open_price', np.float64),
+    ('close_price', np.float64),
+    ('running_profit', np.float64),
+])
+
+
+class ArrayTradingState:
+    """
+    TradingState over plain floats: the open position lives in __slots__ attributes and closed
+    positions are appended to a preallocated CLOSED_POSITION_DTYPE array, indexed by stick
+    position instead of datetime. Rewards and prices follow TradingState.update_on_step exactly.
+    """
+    __slots__ = ('direction', 'open_price', 'open_index', 'running_profit', 'closed', 'n_closed')
+
+    def __init__(self, capacity: int = 1024):
+        self.closed = np.empty(capacity, dtype=CLOSED_POSITION_DTYPE)
+        self.reset()
+
+    def reset(self):
+        self.direction = 0  # -1: sell, 0: nothing, 1: buy
+        self.open_price = 0.0
+        self.open_index = -1
+        self.running_profit = 0.0
+        self.n_closed = 0
+
+    @property
+    def past_positions(self) -> np.ndarray:
+        return self.closed[:self.n_closed]
+
+    def update(self, i: int, ask_close: float, bid_close: float, action: int) -> float:
+        """Apply action (0: sell, 1: hold, 2: buy) at stick i and return the step reward."""
+        _direction = action - 1
+        if self.direction == 0:
+            if _direction == 0:
+                return 0.0
+            # open position
+            self.direction = _direction
+            self.open_price = ask_close if _direction == 1 else bid_close
+            self.open_index = i
+            self.running_profit = 0.0
+            return 0.0
+
+        current_price = bid_close if _direction == 1 else ask_close
+        self.running_profit = (current_price - self.open_price) * self.direction
+        if _direction == 0 or _direction == self.direction:
+            return self.running_profit
+
+        # close position
+        if self.n_closed == len(self.closed):
+            self.closed = np.resize(self.closed, 2 * len(self.closed))
+        self.closed[self.n_closed] = (self.direction, self.open_index, i, self.open_price, current_price,
+                                      self.running_profit)
+        self.n_closed += 1
+        profit = self.running_profit
+        self.direction = 0
+        self.open_price = 0.0
+        self.open_index = -1
+        self.running_profit = 0.0
+        return profit * 10 if profit > 0 else profit
@@ -1,11 +1,9 @@
-import random
-from collections import namedtuple, deque
+from collections import namedtuple
 
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from pandas import Series
 
 
 class DQN(nn.Module):
@@ -24,43 +22,163 @@ class DQN(nn.Module):
         return x
 
 
-class ReplayMemory:
-    def __init__(self, capacity):
-        self.memory = deque(maxlen=capacity)
-        self.Transition = namedtuple('Transition', ('state', 'action', 'next_state', 'reward'))
+class SumTree:
+    """
+    Binary tree of sums over capacity leaf priorities, in one flat array (node k has children
+    2k + 1 and 2k + 2, leaves padded to a power of two). Batches of leaves are updated and
+    searched level by level with array operations.
+    """
 
-    def push(self, *args):
-        self.memory.append(self.Transition(*args))
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.n_leaves = 1 << max(capacity - 1, 0).bit_length()
+        self.depth = self.n_leaves.bit_length() - 1
+        self.nodes = np.zeros(2 * self.n_leaves - 1, dtype=np.float64)
 
-    def sample(self, batch_size):
-        return random.sample(self.memory, batch_size)
+    @property
+    def total(self) -> float:
+        return self.nodes[0]
 
-    def __len__(self):
-        return len(self.memory)
+    def leaves(self, indices) -> np.ndarray:
+        return self.nodes[np.asarray(indices) + self.n_leaves - 1]
 
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices, dtype=np.int64) + self.n_leaves - 1
+        self.nodes[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique((nodes - 1) // 2)
+            self.nodes[nodes] = self.nodes[2 * nodes + 1] + self.nodes[2 * nodes + 2]
 
-def train(model, memory, optimizer, batch_size, device):
-    if len(memory) < batch_size:
-        return
-    transitions = memory.sample(batch_size)
-    batch = memory.Transition(*zip(*transitions))
+    def find(self, values) -> np.ndarray:
+        """Leaf index whose cumulative priority range contains each value in [0, total)."""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.zeros(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes + 1
+            go_right = values >= self.nodes[left]
+            values = np.where(go_right, values - self.nodes[left], values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - (self.n_leaves - 1)
 
-    state_batch = torch.cat(batch.state).to(device)
-    action_batch = torch.cat(batch.action).to(device)
 
-    # Convert reward_batch to tensor before concatenating
-    reward_batch = [torch.tensor([reward], device=device, dtype=torch.float32) for reward in batch.reward]
-    reward_batch = torch.cat(reward_batch)
+Batch = namedtuple('Batch', ('state', 'action', 'next_state', 'reward', 'done', 'indices', 'weights'))
 
-    # Convert next_state_batch to tensor before concatenating
-    next_state_batch = [next_state.clone().detach() for next_state in batch.next_state]
-    next_state_batch = torch.cat(next_state_batch)
 
-    q_values = model(state_batch).gather(1, action_batch)
-    next_q_values = model(next_state_batch).max(1)[0].detach()
-    expected_q_values = reward_batch + 0.99 * next_q_values
+class ReplayMemory:
+    """
+    Ring buffer of transitions in preallocated tensors: state and next_state (capacity x state
+    size, allocated on the first push), action, reward and done. Batches are gathered by index
+    (uniformly, with replacement), or with prioritized=True in proportion to priority ** alpha
+    from a SumTree, with importance-sampling weights for beta.
+    """
+
+    def __init__(self, capacity, device=torch.device("cpu"), prioritized=False, alpha=0.6, beta=0.4, eps=1e-6):
+        self.capacity = capacity
+        self.device = device
+        self.alpha = alpha
+        self.beta = beta
+        self.eps = eps
+        self.tree = SumTree(capacity) if prioritized else None
+        self.max_priority = 1.0
+        self.position = 0
+        self.size = 0
+        self.states = None
+
+    def _allocate(self, state_size, dtype):
+        self.states = torch.empty((self.capacity, state_size), dtype=dtype, device=self.device)
+        self.next_states = torch.empty_like(self.states)
+        self.actions = torch.empty((self.capacity, 1), dtype=torch.long, device=self.device)
+        self.rewards = torch.empty(self.capacity, dtype=torch.float32, device=self.device)
+        self.dones = torch.zeros(self.capacity, dtype=torch.bool, device=self.device)
+
+    def push(self, state, action, next_state, reward, done=False):
+        """Store one transition; state and next_state are (1, state size) tensors, action (1, 1)."""
+        self.push_batch(state, action, next_state, [reward], [done])
+
+    def push_batch(self, states, actions, next_states, rewards, dones=None):
+        """Store len(states) transitions; rewards and dones are sequences, arrays or tensors."""
+        n = len(states)
+        if self.states is None:
+            self._allocate(states.shape[1], states.dtype)
+        indices = torch.arange(self.position, self.position + n) % self.capacity
+        self.states[indices] = states.to(self.device)
+        self.next_states[indices] = next_states.to(self.device)
+        self.actions[indices] = actions.reshape(n, 1).to(self.device)
+        self.rewards[indices] = torch.as_tensor(rewards, dtype=torch.float32).to(self.device)
+        self.dones[indices] = (torch.as_tensor(dones, dtype=torch.bool).to(self.device) if dones is not None
+                               else False)
+        if self.tree is not None:
+            self.tree.update(indices.numpy(), self.max_priority ** self.alpha)
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size) -> Batch:
+        if self.tree is None:
+            indices = torch.randint(0, self.size, (batch_size,))
+            weights = None
+        else:
+            # One value per equal slice of the total priority
+            bounds = (np.arange(batch_size) + np.random.rand(batch_size)) * (self.tree.total / batch_size)
+            leaves = np.minimum(self.tree.find(bounds), self.size - 1)
+            probabilities = self.tree.leaves(leaves) / self.tree.total
+            weights = (self.size * probabilities) ** -self.beta
+            weights = torch.as_tensor(weights / weights.max(), dtype=torch.float32, device=self.device)
+            indices = torch.from_numpy(leaves)
+        indices = indices.to(self.device)
+        return Batch(self.states[indices], self.actions[indices], self.next_states[indices],
+                     self.rewards[indices], self.dones[indices], indices, weights)
+
+    def update_priorities(self, indices, td_errors):
+        """Set the priorities of sampled transitions from their absolute TD errors."""
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(torch.as_tensor(indices).cpu().numpy(), priorities ** self.alpha)
 
-    loss = F.smooth_l1_loss(q_values, expected_q_values.unsqueeze(1))
+    def __len__(self):
+        return self.size
+
+    def state_dict(self) -> dict:
+        """Filled part of the buffers (as views, like Module.state_dict) plus ring and priority state."""
+        state = {'position': self.position, 'size': self.size, 'max_priority': self.max_priority}
+        if self.states is not None:
+            for name in ('states', 'next_states', 'actions', 'rewards', 'dones'):
+                state[name] = getattr(self, name)[:self.size]
+        if self.tree is not None:
+            state['priorities'] = self.tree.leaves(np.arange(self.size)).copy()
+        return state
+
+    def load_state_dict(self, state: dict):
+        self.position, self.size, self.max_priority = state['position'], state['size'], state['max_priority']
+        if 'states' in state:
+            self._allocate(state['states'].shape[1], state['states'].dtype)
+            for name in ('states', 'next_states', 'actions', 'rewards', 'dones'):
+                getattr(self, name)[:self.size] = state[name].to(self.device)
+        if self.tree is not None:
+            priorities = state.get('priorities')
+            if priorities is None:
+                priorities = np.full(self.size, self.max_priority ** self.alpha)
+            self.tree.update(np.arange(self.size), priorities)
+
+
+def train(model, memory, optimizer, batch_size, device, target_model=None):
+    """One DQN update on a sampled batch; next-state values come from target_model when given."""
+    if len(memory) < batch_size:
+        return
+    batch = memory.sample(batch_size)
+
+    q_values = model(batch.state.to(device)).gather(1, batch.action.to(device))
+    value_model = target_model if target_model is not None else model
+    with torch.no_grad():
+        next_q_values = value_model(batch.next_state.to(device)).max(1)[0]
+    not_done = (~batch.done).to(device, torch.float32)
+    expected_q_values = batch.reward.to(device) + 0.99 * next_q_values * not_done
+
+    if batch.weights is None:
+        loss = F.smooth_l1_loss(q_values, expected_q_values.unsqueeze(1))
+    else:
+        losses = F.smooth_l1_loss(q_values, expected_q_values.unsqueeze(1), reduction='none').squeeze(1)
+        loss = (losses * batch.weights.to(device)).mean()
+        memory.update_priorities(batch.indices, (q_values.detach().squeeze(1) - expected_q_values).cpu().numpy())
     optimizer.zero_grad()
     loss.backward()
     optimizer.step()
@@ -85,6 +203,25 @@ def select_action(state, model, device, n_actions, epsilon):
             return torch.tensor([[1]], device=device, dtype=torch.long)
 
 
+def select_actions(states, model, device, n_actions, epsilon, rng=np.random):
+    """
+    Batched select_action: one forward pass for a (n_envs, input_size) state batch.
+
+    Returns:
+        (n_envs, 1) long tensor of actions
+    """
+    with torch.no_grad():
+        prediction = model(states)
+    actions = torch.ones(len(prediction), device=device, dtype=torch.long)
+    actions[prediction[:, 0] > prediction[:, 2]] = 0
+    actions[prediction[:, 2] > prediction[:, 0]] = 2
+    if epsilon > 0:
+        explore = torch.from_numpy(rng.random(len(actions)) < epsilon).to(device)
+        random_actions = torch.from_numpy(rng.choice(np.arange(n_actions), size=len(actions), p=[0.2, 0.6, 0.2]))
+        actions = torch.where(explore, random_actions.to(device), actions)
+    return actions.unsqueeze(1)
+
+
 def get_time_and_day(stick_name):
     # Extract hour and minute, and convert to the desired 4-digit integer format
     time_int = int(stick_name.strftime('%H%M'))
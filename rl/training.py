@@ -0,0 +1,229 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import torch
+
+from rl.dqn import ReplayMemory, select_actions, train
+from rl.ForexEnvironment import VectorForexEnvironment
+
+
+def _detached(obj):
+    """Copy of a (nested) state dict with every tensor cloned, safe to save from another thread."""
+    if torch.is_tensor(obj):
+        return obj.detach().clone()
+    if isinstance(obj, dict):
+        return {key: _detached(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_detached(value) for value in obj)
+    return obj
+
+
+class Checkpointer:
+    """
+    Saves checkpoints with torch.save on a background thread.
+
+    save() snapshots the state on the calling thread and returns; the writer replaces path
+    atomically (write to a temporary file, then rename), so an interrupted save never leaves a
+    truncated checkpoint. A newer snapshot waiting in the queue supersedes an older one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pending = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run, name='checkpointer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            state = self._pending.get()
+            try:
+                tmp_path = f"{self.path}.tmp"
+                torch.save(state, tmp_path)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"checkpoint to {self.path} failed: {e}")
+            finally:
+                self._pending.task_done()
+
+    def save(self, state: dict):
+        snapshot = _detached(state)
+        try:
+            self._pending.get_nowait()
+            self._pending.task_done()
+        except queue.Empty:
+            pass
+        self._pending.put(snapshot)
+
+    def wait(self):
+        """Block until the last saved checkpoint is on disk."""
+        self._pending.join()
+
+    def load(self, device) -> Optional[dict]:
+        if not os.path.exists(self.path):
+            return None
+        return torch.load(self.path, map_location=device, weights_only=False)
+
+
+@dataclass
+class EpochMetrics:
+    epoch: int
+    epsilon: float
+    env_steps: int
+    train_steps: int
+    seconds: float
+    steps_per_sec: float
+    train_ms_per_step: float
+    target_syncs: int
+
+    def __str__(self):
+        return (f"epoch {self.epoch} finished. {self.seconds:.1f} seconds, {self.env_steps} env steps "
+                f"({self.steps_per_sec:,.0f}/s), {self.train_steps} train steps "
+                f"({self.train_ms_per_step:.2f} ms/step), {self.target_syncs} target syncs")
+
+
+@dataclass
+class TrainingRunner:
+    """
+    DQN training loop over a VectorForexEnvironment.
+
+    Every train_every transitions one batch is trained against target_model, which is synced
+    to model every target_sync_steps train steps. After every checkpoint_every epochs the
+    model, target model, optimizer, epsilon, counters and metrics are saved by a Checkpointer,
+    and resume() continues from such a checkpoint. Snapshotting the replay memory copies the
+    whole buffer, so it goes to its own file and only every replay_checkpoint_every checkpoints.
+    Each epoch reports env steps/sec and train ms/step.
+    """
+    model: torch.nn.Module
+    target_model: torch.nn.Module
+    optimizer: torch.optim.Optimizer
+    memory: ReplayMemory
+    env: VectorForexEnvironment
+    device: torch.device
+    steps_per_epoch: int
+    n_actions: int = 3
+    batch_size: int = 64
+    train_every: int = 10
+    target_sync_steps: int = 1000
+    start_epsilon: float = 0.0
+    end_epsilon: float = 0.0
+    epsilon_decay_rate: float = 0.99
+    checkpoint_path: str = "training_checkpoint.pt"
+    checkpoint_every: int = 1
+    save_replay: bool = True
+    replay_checkpoint_path: str = "training_replay.pt"
+    replay_checkpoint_every: int = 10
+
+    epoch: int = 0
+    epsilon: float = 0.0
+    total_train_steps: int = 0
+    metrics: List[EpochMetrics] = field(default_factory=list)
+    actions: Counter = field(default_factory=Counter)
+
+    def __post_init__(self):
+        self.checkpointer = Checkpointer(self.checkpoint_path)
+        self.replay_checkpointer = Checkpointer(self.replay_checkpoint_path)
+        self.checkpoints = 0
+
+    def resume(self) -> bool:
+        """Load the last checkpoint, if any; returns whether one was loaded."""
+        state = self.checkpointer.load(self.device)
+        if state is None:
+            return False
+        self.model.load_state_dict(state['model'])
+        self.target_model.load_state_dict(state['target_model'])
+        self.optimizer.load_state_dict(state['optimizer'])
+        # The replay memory is saved less often, so it may be a few epochs older than the model
+        replay = self.replay_checkpointer.load(self.device) if self.save_replay else None
+        if replay is not None:
+            self.memory.load_state_dict(replay['memory'])
+        self.epoch = state['epoch']
+        self.epsilon = state['epsilon']
+        self.total_train_steps = state['total_train_steps']
+        self.metrics = [EpochMetrics(**m) for m in state['metrics']]
+        print(f"resumed from {self.checkpoint_path} at epoch {self.epoch}, {len(self.memory)} transitions in memory")
+        return True
+
+    def next_epsilon(self) -> float:
+        if self.epoch == 0:
+            return self.start_epsilon
+        if self.epsilon < self.end_epsilon:
+            return self.end_epsilon
+        return self.epsilon * self.epsilon_decay_rate
+
+    def sync_target(self):
+        self.target_model.load_state_dict(self.model.state_dict())
+
+    def run_epoch(self) -> EpochMetrics:
+        self.epsilon = self.next_epsilon()
+        self.actions = Counter()
+        start_time = time.perf_counter()
+        train_seconds = 0.0
+        train_steps = 0
+        target_syncs = 0
+        pending_transitions = 0
+
+        observations, _ = self.env.reset()
+        states = torch.from_numpy(observations).to(self.device)
+        for _ in range(self.steps_per_epoch):
+            action_batch = select_actions(states, self.model, self.device, self.n_actions, self.epsilon)
+            actions = action_batch.squeeze(1).cpu().numpy()
+            self.actions.update(actions.tolist())
+            observations, rewards, terminated, truncated, info = self.env.step(actions)
+
+            next_states = torch.from_numpy(info['next_observation']).to(self.device)
+            self.memory.push_batch(states, action_batch, next_states, rewards, terminated)
+            if self.epsilon > 0:
+                pending_transitions += self.env.n_envs
+                while pending_transitions >= self.train_every:
+                    train_start = time.perf_counter()
+                    train(self.model, self.memory, self.optimizer, self.batch_size, self.device, self.target_model)
+                    train_seconds += time.perf_counter() - train_start
+                    train_steps += 1
+                    self.total_train_steps += 1
+                    pending_transitions -= self.train_every
+                    if self.total_train_steps % self.target_sync_steps == 0:
+                        self.sync_target()
+                        target_syncs += 1
+            states = torch.from_numpy(observations).to(self.device)
+
+        seconds = time.perf_counter() - start_time
+        env_steps = self.steps_per_epoch * self.env.n_envs
+        metrics = EpochMetrics(
+            epoch=self.epoch,
+            epsilon=self.epsilon,
+            env_steps=env_steps,
+            train_steps=train_steps,
+            seconds=seconds,
+            steps_per_sec=env_steps / seconds if seconds > 0 else float('nan'),
+            train_ms_per_step=train_seconds / train_steps * 1000 if train_steps else 0.0,
+            target_syncs=target_syncs,
+        )
+        self.metrics.append(metrics)
+        self.epoch += 1
+        if train_steps and self.epoch % self.checkpoint_every == 0:
+            self.save_checkpoint()
+        return metrics
+
+    def save_checkpoint(self):
+        state = {
+            'model': self.model.state_dict(),
+            'target_model': self.target_model.state_dict(),
+            'optimizer': self.optimizer.state_dict(),
+            'epoch': self.epoch,
+            'epsilon': self.epsilon,
+            'total_train_steps': self.total_train_steps,
+            'metrics': [vars(m) for m in self.metrics],
+        }
+        self.checkpointer.save(state)
+        if self.save_replay and self.checkpoints % self.replay_checkpoint_every == 0:
+            self.replay_checkpointer.save({'epoch': self.epoch, 'memory': self.memory.state_dict()})
+        self.checkpoints += 1
+
+    def close(self):
+        self.checkpointer.wait()
+        self.replay_checkpointer.wait()
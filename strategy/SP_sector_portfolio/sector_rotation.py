@@ -33,15 +33,18 @@ import numpy as np
 from datetime import datetime, timedelta
 import pytz
 import warnings
+from functools import partial
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 try:
-    from data.TimescaleDBSticksDao import get_sticks
+    from data.TimescaleDBSticksDao import get_sticks_many
 except ImportError:
     print("Could not import data.TimescaleDBSticksDao.")
     sys.exit(1)
 
+from strategy.optimizer import Optimizer, cached, param_grid, walk_forward_splits
+
 warnings.filterwarnings('ignore')
 
 # Configuration
@@ -64,9 +67,12 @@ def fetch_data(symbols, start_date):
     data = {}
     end_date = datetime.now(pytz.UTC)
     
+    # Daily bars are read through the local stick cache, so reruns only fetch new chunks
+    sticks = get_sticks_many(symbols, 1440, start_date, end_date, use_cache=True)
+    
     for symbol in symbols:
         try:
-            df = get_sticks(symbol, 1440, start_date, end_date)
+            df = sticks[symbol].copy()
             if not df.empty:
                 df['close'] = (df['bid_close'] + df['ask_close']) / 2
                 df = df[~df.index.duplicated(keep='last')]
@@ -81,13 +87,12 @@ def fetch_data(symbols, start_date):
     prices = prices.dropna(how='all')
     return prices
 
-def calculate_indicators(prices):
-    print("Calculating technical indicators...")
-    momentum = prices.pct_change(MOMENTUM_WINDOW)
-    sma200 = prices.rolling(window=SMA_WINDOW).mean()
+def calculate_indicators(prices, momentum_window=MOMENTUM_WINDOW, sma_window=SMA_WINDOW):
+    momentum = prices.pct_change(momentum_window)
+    sma200 = prices.rolling(window=sma_window).mean()
     return momentum, sma200
 
-def get_rebalance_targets(date, prices, momentum, sma200):
+def get_rebalance_targets(date, prices, momentum, sma200, top_n=TOP_N, universe=SECTORS, benchmark=BENCHMARK):
     """
     Determine target weights.
     """
@@ -95,27 +100,27 @@ def get_rebalance_targets(date, prices, momentum, sma200):
     day_sma = sma200.loc[date]
     day_prices = prices.loc[date]
     
-    spy_price = day_prices[BENCHMARK]
-    spy_sma_val = day_sma[BENCHMARK]
+    spy_price = day_prices[benchmark]
+    spy_sma_val = day_sma[benchmark]
     
     spy_trend = spy_price > spy_sma_val
     regime = 'BULL' if spy_trend else 'BEAR'
     
     # Rank Sectors
-    ranking = day_mom[SECTORS].dropna().sort_values(ascending=False)
-    candidates = ranking.head(TOP_N).index.tolist()
+    ranking = day_mom[list(universe)].dropna().sort_values(ascending=False)
+    candidates = ranking.head(top_n).index.tolist()
     
     target_weights = {}
     
     # 1. Core Allocation (50%)
     if regime == 'BULL':
-        target_weights[BENCHMARK] = 0.50
+        target_weights[benchmark] = 0.50
     else:
         # Bear Market: Core goes to Cash
         pass
         
-    # 2. Satellite Allocation (50% -> 25% each)
-    sat_weight = 0.25
+    # 2. Satellite Allocation (50% split across the top sectors)
+    sat_weight = 0.50 / top_n
     
     for sym in candidates:
         if regime == 'BULL':
@@ -131,69 +136,128 @@ def get_rebalance_targets(date, prices, momentum, sma200):
                 
     return target_weights, regime, ranking
 
-def backtest(prices, momentum, sma200):
-    print(f"Running backtest from {BACKTEST_START_DATE.date()}...")
+def target_weight_matrix(prices, momentum, sma200, top_n=TOP_N, universe=SECTORS, benchmark=BENCHMARK):
+    """
+    Target weights for every date at once, following the same rules as get_rebalance_targets.
+    
+    Args:
+        universe: Symbols ranked for the satellite; all of them must be columns of prices
+        benchmark: Core holding and trend filter symbol
     
-    sim_data = prices[prices.index >= BACKTEST_START_DATE].copy()
-    if sim_data.empty: return None
+    Returns:
+        float64 array (dates x prices.columns)
+    """
+    columns = list(prices.columns)
+    spy = columns.index(benchmark)
+    sectors = np.array([columns.index(sym) for sym in universe])
+    p = prices.to_numpy(dtype=np.float64)
+    sma = sma200.to_numpy(dtype=np.float64)
+    mom = momentum.to_numpy(dtype=np.float64)[:, sectors]
+    
+    bull = p[:, spy] > sma[:, spy]
+    
+    # Rank Sectors: top_n highest momentum per row, NaN momentum is never picked
+    ranked = ~np.isnan(mom)
+    order = np.argsort(np.where(ranked, -mom, np.inf), axis=1, kind='stable')[:, :top_n]
+    picked = np.take_along_axis(ranked, order, axis=1)
+    above_sma = np.take_along_axis(p[:, sectors] > sma[:, sectors], order, axis=1)
+    
+    weights = np.zeros(p.shape)
+    # Core: 50% SPY in a bull market, cash otherwise
+    weights[:, spy] = np.where(bull, 0.50, 0.0)
+    # Satellite: 50% across the top sectors; in a bear market only those above their own SMA
+    rows = np.arange(len(p))[:, None]
+    weights[rows, sectors[order]] += np.where(picked & (bull[:, None] | above_sma), 0.50 / top_n, 0.0)
+    return weights
 
-    cash = INITIAL_CAPITAL
-    holdings = {}
-    portfolio_values = []
-    current_month = None
-    
-    for date in sim_data.index:
-        # Valuation
-        daily_value = cash
-        for sym, qty in holdings.items():
-            if not np.isnan(sim_data.loc[date, sym]):
-                daily_value += qty * sim_data.loc[date, sym]
-        
-        portfolio_values.append({
-            'date': date,
-            'value': daily_value,
-            'cash': cash,
-            'invested': daily_value - cash
-        })
+def rebalance_mask(index):
+    """True on the first trading day of each month (and on the first row)."""
+    months = index.year * 12 + index.month
+    return np.r_[True, np.diff(months) != 0] if len(index) else np.zeros(0, dtype=bool)
 
-        # Rebalance
-        if current_month != date.month:
-            current_month = date.month
-            
-            target_weights, _, _ = get_rebalance_targets(date, prices, momentum, sma200)
-            
-            # Sell unwanted
-            current_holdings = list(holdings.keys())
-            for sym in current_holdings:
-                if sym not in target_weights:
-                    qty = holdings[sym]
-                    price = sim_data.loc[date, sym]
-                    proceeds = qty * price
-                    cash += proceeds
-                    del holdings[sym]
-            
-            # Rebalance/Buy
-            total_equity = cash
-            for sym, qty in holdings.items():
-                total_equity += qty * sim_data.loc[date, sym]
-            
-            for sym, weight in target_weights.items():
-                target_amt = total_equity * weight
-                price = sim_data.loc[date, sym]
-                if np.isnan(price): continue
-                
-                if sym in holdings:
-                    current_val = holdings[sym] * price
-                    diff = target_amt - current_val
-                    qty_diff = diff / price
-                    holdings[sym] += qty_diff
-                    cash -= diff
-                else:
-                    qty = target_amt / price
-                    holdings[sym] = qty
-                    cash -= target_amt
+def portfolio_values(prices, weights, rebalance, initial_capital=INITIAL_CAPITAL):
+    """
+    Value a portfolio that is reset to weights[t] at the close of every rebalance row.
+    
+    Between rebalances the holdings are fixed, so the value at row t is the value at the last
+    rebalance times 1 + sum(w * (p_t / p_rebalance - 1)); chaining those growth factors with a
+    cumulative product over rebalance rows gives the whole curve without a per-day loop.
+    Valuation on a rebalance row happens before trading, like the daily loop it replaces.
+    
+    Args:
+        prices: (dates x symbols) array
+        weights: (dates x symbols) target weights, only read on rebalance rows
+        rebalance: Boolean mask of rebalance rows; the first row must be one
+    
+    Returns:
+        (value, cash) arrays per row
+    """
+    rebalance_rows = np.flatnonzero(rebalance)
+    ref_prices = prices[rebalance_rows]
+    ref_weights = np.where(np.isnan(ref_prices), 0.0, weights[rebalance_rows])
+    
+    # Holdings valued on row t were set at rebalance segment[t] (-1: nothing bought yet)
+    segment = np.cumsum(rebalance) - 1 - rebalance
+    held = np.maximum(segment, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = prices / ref_prices[held] - 1
+    # A holding without a price is left out of the valuation
+    change = np.where(np.isnan(change), -1.0, change)
+    growth = 1 + np.einsum('ij,ij->i', ref_weights[held], change)
+    
+    equity_at_rebalance = initial_capital * np.cumprod(np.r_[1.0, growth[rebalance_rows[1:]]])
+    cash_at_rebalance = equity_at_rebalance * (1 - ref_weights.sum(axis=1))
+    
+    value = np.where(segment < 0, initial_capital, equity_at_rebalance[held] * growth)
+    cash = np.where(segment < 0, initial_capital, cash_at_rebalance[held])
+    return value, cash
+
+def backtest(prices, momentum, sma200, top_n=TOP_N, start_date=BACKTEST_START_DATE, end_date=None,
+             universe=SECTORS, benchmark=BENCHMARK):
+    rows = prices.index >= start_date
+    if end_date is not None:
+        rows &= prices.index < end_date
+    if not rows.any(): return None
+    
+    dates = prices.index[rows]
+    weights = target_weight_matrix(prices, momentum, sma200, top_n, universe, benchmark)[rows]
+    value, cash = portfolio_values(prices.to_numpy(dtype=np.float64)[rows], weights, rebalance_mask(dates))
+    
+    portfolio = pd.DataFrame({'value': value, 'cash': cash, 'invested': value - cash}, index=dates)
+    portfolio.index.name = 'date'
+    return portfolio
 
-    return pd.DataFrame(portfolio_values).set_index('date')
+def backtest_grid(prices, momentum_windows, top_ns, universes=None, start_date=BACKTEST_START_DATE, end_date=None,
+                  benchmark=BENCHMARK):
+    """
+    Backtest every (universe, momentum_window, top_n) combination on one price panel.
+    
+    The indicators are computed once per momentum window for the whole panel and shared by every
+    universe, so prices must hold the benchmark and the symbols of all universes.
+    
+    Args:
+        universes: {name: symbols} or a list of symbol lists (named by their joined symbols);
+            defaults to SECTORS
+    
+    Returns:
+        DataFrame of portfolio values, one column per (universe, momentum_window, top_n)
+    """
+    if universes is None:
+        universes = {'sectors': SECTORS}
+    elif not isinstance(universes, dict):
+        universes = {','.join(universe): universe for universe in universes}
+    
+    curves = {}
+    for momentum_window in momentum_windows:
+        momentum, sma200 = calculate_indicators(prices, momentum_window)
+        for name, universe in universes.items():
+            for top_n in top_ns:
+                portfolio = backtest(prices, momentum, sma200, top_n, start_date, end_date, universe, benchmark)
+                if portfolio is not None:
+                    curves[(name, momentum_window, top_n)] = portfolio['value']
+    grid = pd.DataFrame(curves)
+    grid.columns.names = ['universe', 'momentum_window', 'top_n']
+    return grid
 
 def calculate_max_drawdown(series):
     peak = series.cummax()
@@ -269,13 +333,60 @@ def evaluate_performance(portfolio, benchmark_prices):
         print(f"{year:<6} | {strat*100:6.2f}%    | {bench*100:6.2f}%    | {diff*100:6.2f}%")
     print("-" * 50)
 
+def evaluate_params(data, params, rows, symbols):
+    """
+    Optimizer objective: run the rotation with the given momentum_window / top_n on the panel rows
+    in `rows` (earlier rows only warm up the indicators).
+    """
+    prices = cached('prices', lambda: pd.DataFrame(data['prices'], columns=symbols,
+                                                   index=pd.to_datetime(data['dates'], utc=True)))
+    momentum_window = params.get('momentum_window', MOMENTUM_WINDOW)
+    momentum, sma200 = cached(('indicators', momentum_window), lambda: calculate_indicators(prices, momentum_window))
+    
+    start, stop, _ = rows.indices(len(prices))
+    end_date = prices.index[stop] if stop < len(prices) else None
+    portfolio = backtest(prices, momentum, sma200, params.get('top_n', TOP_N), prices.index[start], end_date)
+    if portfolio is None or len(portfolio) < 2:
+        return {'total_return': np.nan, 'cagr': np.nan, 'sharpe': np.nan, 'max_drawdown': np.nan}
+    
+    values = portfolio['value']
+    years = (values.index[-1] - values.index[0]).days / 365.25
+    cagr = (values.iloc[-1] / values.iloc[0]) ** (1 / years) - 1 if years > 0 else 0
+    vol = values.pct_change().std() * np.sqrt(252)
+    return {
+        'total_return': values.iloc[-1] / values.iloc[0] - 1,
+        'cagr': cagr,
+        'sharpe': (cagr - RISK_FREE_RATE) / vol if vol > 0 else 0,
+        'max_drawdown': calculate_max_drawdown(values),
+    }
+
+def optimize_main():
+    print("Walk-forward optimizing momentum window and number of sectors...")
+    prices = fetch_data(ALL_SYMBOLS, START_DATE)
+    if prices.empty: return
+    
+    data = {'prices': prices.to_numpy(dtype=np.float64), 'dates': prices.index.tz_convert(None).to_numpy()}
+    objective = partial(evaluate_params, symbols=list(prices.columns))
+    space = {'momentum_window': [21, 42, 63, 126], 'top_n': [1, 2, 3, 4]}
+    splits = walk_forward_splits(len(prices), train_rows=756, test_rows=252, warmup_rows=SMA_WINDOW)
+    
+    results = Optimizer(data, objective).walk_forward(param_grid(space), splits, metric='sharpe')
+    results['test_start_date'] = prices.index[results['test_start']].date
+    print(results.to_string(index=False))
+    
+    output_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'walk_forward_results.csv')
+    results.to_csv(output_file, index=False)
+    print(f"Walk-forward results saved to {output_file}")
+
 def main():
     print("Starting Core-Satellite (SPY + Top 2) Backtest...")
     
     prices = fetch_data(ALL_SYMBOLS, START_DATE)
     if prices.empty: return
 
+    print("Calculating technical indicators...")
     momentum, sma200 = calculate_indicators(prices)
+    print(f"Running backtest from {BACKTEST_START_DATE.date()}...")
     portfolio = backtest(prices, momentum, sma200)
     
     if portfolio is not None:
@@ -308,4 +419,7 @@ def main():
                 print(f"- {sym}: {weight*100:.1f}% Allocation")
 
 if __name__ == "__main__":
-    main()
+    if '--optimize' in sys.argv[1:]:
+        optimize_main()
+    else:
+        main()
@@ -22,373 +22,54 @@ Price Logic:
 - Exit: Uses ask price (buy back at ask)
 - If bid/ask is zero, uses the alternative price as fallback
 - Tracks which price type was used for transparency
+
+The engine (also used for bullish signals and whole report roots) lives in trendy_ema_backtest.py
 """
 
 import os
 import sys
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
+
 import pytz
-from typing import List, Dict, Tuple, Optional
 
 # Add the parent directory to the path so we can import from data module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data.TimescaleDBSticksDao import get_sticks
+from strategy import trendy_ema_backtest
+from strategy.trendy_ema_backtest import DEFAULT_REPORT_DATE, REPORT_ROOT, TrendyEMABacktest
+
+
+class BearishTrendyEMABacktest(TrendyEMABacktest):
+    def __init__(self, signals_folder: str, **kwargs):
+        super().__init__(signals_folder, 'bearish', **kwargs)
 
+    get_bearish_signals = TrendyEMABacktest.get_signals
+    simulate_short_trade = TrendyEMABacktest.simulate_trade
 
-class BearishTrendyEMABacktest:
-    def __init__(self, signals_folder: str):
-        self.signals_folder = signals_folder
-        self.start_date = datetime(2025, 6, 13, tzinfo=pytz.UTC)
-        self.end_date = self.start_date + timedelta(days=14)
-        self.take_profit_pct = 7.5   # 7.5% take profit (price drops 7.5%)
-        self.stop_loss_pct = 5.0     # 5% stop loss (price rises 5%)
-        self.results = []
-        
-    def extract_symbol_from_filename(self, filename: str) -> str:
-        """Extract symbol from filename like '100-AC.D.2800HK.DAILY.IP.jpg' -> 'AC.D.2800HK.DAILY.IP'"""
-        if not filename.startswith('100-'):
-            return None
-        
-        # Remove '100-' prefix and '.jpg' suffix
-        symbol = filename[4:]  # Remove '100-' prefix
-        if symbol.endswith('.jpg'):
-            symbol = symbol[:-4]  # Remove '.jpg' suffix
-        
-        return symbol
-    
-    def get_bearish_signals(self) -> List[str]:
-        """Get all symbols from files beginning with '100-'"""
-        symbols = []
-        
-        if not os.path.exists(self.signals_folder):
-            print(f"Error: Signals folder {self.signals_folder} does not exist")
-            return symbols
-        
-        files = os.listdir(self.signals_folder)
-        bearish_files = [f for f in files if f.startswith('100-') and f.endswith('.jpg')]
-        
-        print(f"Found {len(bearish_files)} bearish signal files")
-        
-        for filename in bearish_files:
-            symbol = self.extract_symbol_from_filename(filename)
-            if symbol:
-                symbols.append(symbol)
-        
-        return symbols
-    
-    def simulate_short_trade(self, symbol: str) -> Dict:
-        """Simulate a 14-day SHORT trade for a given symbol.
-        Entry: Sell at bid price (short position)
-        Exit: Buy back at ask price (cover position)
-        Profit when price goes DOWN, loss when price goes UP
-        If bid/ask is zero, uses the alternative price instead.
-        """
-        try:
-            # Get price data from start date to end date (1440 minutes = 1 day)
-            sticks_df = get_sticks(symbol, 1440, self.start_date, self.end_date)
-            
-            if sticks_df.empty:
-                return {
-                    'symbol': symbol,
-                    'status': 'NO_DATA',
-                    'entry_price': None,
-                    'exit_price': None,
-                    'pnl': None,
-                    'pnl_pct': None,
-                    'days_held': None,
-                    'error': 'No data available for the specified date range'
-                }
-            
-            # Entry: SHORT at bid price on the first available day
-            entry_row = sticks_df.iloc[0]
-            entry_price = entry_row['bid_close']  # Use bid_close for SHORT entry
-            entry_price_note = "bid"
-            
-            # If bid price is zero, use ask price instead
-            if entry_price == 0:
-                entry_price = entry_row['ask_close']
-                entry_price_note = "ask_fallback"
-                if entry_price == 0:
-                    return {
-                        'symbol': symbol,
-                        'status': 'ERROR',
-                        'entry_price': None,
-                        'exit_price': None,
-                        'pnl': None,
-                        'pnl_pct': None,
-                        'days_held': None,
-                        'error': 'Both bid and ask prices are zero at entry'
-                    }
-            
-            entry_date = sticks_df.index[0]
-            
-            # Calculate position size for $1000 investment
-            position_size = 1000.0 / entry_price
-            
-            # Check daily for take profit/stop loss conditions
-            exit_row = None
-            exit_date = None
-            exit_reason = "time_limit"
-            
-            # Loop through each day to check for early exit conditions
-            for i in range(1, len(sticks_df)):
-                current_row = sticks_df.iloc[i]
-                current_date = sticks_df.index[i]
-                
-                # Get current price (use ask for SHORT cover simulation)
-                current_price = current_row['ask_close']
-                if current_price == 0:
-                    current_price = current_row['bid_close']
-                
-                # Skip if current price is still zero
-                if current_price == 0:
-                    continue
-                
-                # Calculate current P&L percentage for SHORT position
-                # For SHORT: profit when price goes DOWN, loss when price goes UP
-                current_pnl_pct = ((entry_price - current_price) / entry_price) * 100
-                
-                # Check take profit condition (price dropped enough)
-                if current_pnl_pct >= self.take_profit_pct:
-                    exit_row = current_row
-                    exit_date = current_date
-                    exit_reason = "take_profit"
-                    break
-                
-                # Check stop loss condition (price rose too much)
-                if current_pnl_pct <= -self.stop_loss_pct:
-                    exit_row = current_row
-                    exit_date = current_date
-                    exit_reason = "stop_loss"
-                    break
-            
-            # If no early exit, use the last available day (time limit)
-            if exit_row is None:
-                if len(sticks_df) >= 14:
-                    exit_row = sticks_df.iloc[13]  # 14th day (0-indexed)
-                    exit_date = sticks_df.index[13]
-                else:
-                    # Use the last available day if less than 14 days of data
-                    exit_row = sticks_df.iloc[-1]
-                    exit_date = sticks_df.index[-1]
-                exit_reason = "time_limit"
-            
-            # Final exit price calculation - cover SHORT at ask price
-            exit_price = exit_row['ask_close']  # Use ask_close for SHORT cover
-            exit_price_note = "ask"
-            
-            # If ask price is zero, use bid price instead
-            if exit_price == 0:
-                exit_price = exit_row['bid_close']
-                exit_price_note = "bid_fallback"
-                if exit_price == 0:
-                    return {
-                        'symbol': symbol,
-                        'status': 'ERROR',
-                        'entry_price': None,
-                        'exit_price': None,
-                        'pnl': None,
-                        'pnl_pct': None,
-                        'days_held': None,
-                        'error': 'Both ask and bid prices are zero at exit'
-                    }
-            
-            # Calculate P&L based on normalized $1000 SHORT position
-            # For SHORT: P&L = (entry_price - exit_price) * position_size
-            # Profit when entry_price > exit_price (price went down)
-            pnl = (entry_price - exit_price) * position_size
-            pnl_pct = (pnl / 1000.0) * 100  # P&L percentage based on $1000 investment
-            
-            days_held = (exit_date - entry_date).days
-            
-            return {
-                'symbol': symbol,
-                'status': 'SUCCESS',
-                'entry_date': entry_date,
-                'exit_date': exit_date,
-                'entry_price': entry_price,
-                'exit_price': exit_price,
-                'entry_price_type': entry_price_note,
-                'exit_price_type': exit_price_note,
-                'position_size': position_size,
-                'pnl': pnl,
-                'pnl_pct': pnl_pct,
-                'days_held': days_held,
-                'exit_reason': exit_reason,
-                'error': None
-            }
-            
-        except Exception as e:
-            return {
-                'symbol': symbol,
-                'status': 'ERROR',
-                'entry_price': None,
-                'exit_price': None,
-                'pnl': None,
-                'pnl_pct': None,
-                'days_held': None,
-                'error': str(e)
-            }
-    
-    def run_backtest(self) -> pd.DataFrame:
-        """Run the backtest on all bearish signals with normalized $1000 position sizes and risk management"""
-        print(f"Starting BEARISH backtest for period: {self.start_date.date()} to {self.end_date.date()}")
-        print(f"Using normalized $1000 SHORT position size per trade")
-        print(f"Risk management: Take profit {self.take_profit_pct}%, Stop loss {self.stop_loss_pct}%")
-        
-        symbols = self.get_bearish_signals()
-        print(f"Processing {len(symbols)} symbols...")
-        
-        results = []
-        successful_trades = 0
-        
-        for i, symbol in enumerate(symbols):
-            if i % 10 == 0:
-                print(f"Processing symbol {i+1}/{len(symbols)}: {symbol}")
-            
-            result = self.simulate_short_trade(symbol)
-            results.append(result)
-            
-            if result['status'] == 'SUCCESS':
-                successful_trades += 1
-            elif i < 5:  # Show first 5 errors for debugging
-                print(f"  Error for {symbol}: {result['error']}")
-        
-        print(f"\nBacktest completed!")
-        print(f"Total symbols processed: {len(symbols)}")
-        print(f"Successful trades: {successful_trades}")
-        print(f"Failed trades: {len(symbols) - successful_trades}")
-        
-        self.results = results
-        return pd.DataFrame(results)
-    
-    def analyze_results(self, results_df: pd.DataFrame) -> Dict:
-        """Analyze backtest results and provide summary statistics"""
-        successful_trades = results_df[results_df['status'] == 'SUCCESS']
-        
-        if successful_trades.empty:
-            return {
-                'total_trades': len(results_df),
-                'successful_trades': 0,
-                'failed_trades': len(results_df),
-                'winning_trades': 0,
-                'losing_trades': 0,
-                'win_rate': 0,
-                'avg_pnl': 0,
-                'avg_pnl_pct': 0,
-                'total_pnl': 0,
-                'best_trade': None,
-                'worst_trade': None,
-                'median_pnl_pct': 0,
-                'std_pnl_pct': 0
-            }
-        
-        winning_trades = successful_trades[successful_trades['pnl'] > 0]
-        losing_trades = successful_trades[successful_trades['pnl'] < 0]
-        
-        analysis = {
-            'total_trades': len(results_df),
-            'successful_trades': len(successful_trades),
-            'failed_trades': len(results_df) - len(successful_trades),
-            'winning_trades': len(winning_trades),
-            'losing_trades': len(losing_trades),
-            'win_rate': len(winning_trades) / len(successful_trades) * 100 if len(successful_trades) > 0 else 0,
-            'avg_pnl': successful_trades['pnl'].mean(),
-            'avg_pnl_pct': successful_trades['pnl_pct'].mean(),
-            'total_pnl': successful_trades['pnl'].sum(),
-            'best_trade': successful_trades.loc[successful_trades['pnl'].idxmax()] if not successful_trades.empty else None,
-            'worst_trade': successful_trades.loc[successful_trades['pnl'].idxmin()] if not successful_trades.empty else None,
-            'median_pnl_pct': successful_trades['pnl_pct'].median(),
-            'std_pnl_pct': successful_trades['pnl_pct'].std()
-        }
-        
-        return analysis
+
+def backtest_report_dates(report_dates, report_root: str = REPORT_ROOT, **kwargs):
+    """Backtest the bearishTrendyEMA signals of several report dates; results carry a 'signal_date' column."""
+    return trendy_ema_backtest.backtest_report_dates(report_dates, 'bearish', report_root, **kwargs)
 
 
 def main():
-    # Path to the bearish signals folder
-    signals_folder = "/Users/benny/git/happy-machine-report/2025-06-13/usBatch/bearishTrendyEMA"
-    
-    # Create backtest instance
-    backtest = BearishTrendyEMABacktest(signals_folder)
-    
+    # Report dates (YYYY-MM-DD) may be given on the command line, default is the 2025-06-13 report
+    report_dates = [datetime.strptime(arg, '%Y-%m-%d').replace(tzinfo=pytz.UTC) for arg in sys.argv[1:]]
+
     # Run backtest
-    results_df = backtest.run_backtest()
-    
-    # Analyze results
-    analysis = backtest.analyze_results(results_df)
-    
-    # Print summary
-    print("\n" + "="*60)
-    print("BEARISH BACKTEST RESULTS SUMMARY")
-    print("(Normalized to $1000 SHORT position size per trade)")
-    print("(Risk Management: 7.5% Take Profit, 5% Stop Loss)")
-    print("="*60)
-    print(f"Total trades: {analysis['total_trades']}")
-    print(f"Successful trades: {analysis['successful_trades']}")
-    print(f"Failed trades: {analysis['failed_trades']}")
-    print(f"Winning trades: {analysis['winning_trades']}")
-    print(f"Losing trades: {analysis['losing_trades']}")
-    print(f"Win rate: {analysis['win_rate']:.2f}%")
-    print(f"Average P&L: ${analysis['avg_pnl']:.2f}")
-    print(f"Average P&L %: {analysis['avg_pnl_pct']:.2f}%")
-    print(f"Median P&L %: {analysis['median_pnl_pct']:.2f}%")
-    print(f"Std Dev P&L %: {analysis['std_pnl_pct']:.2f}%")
-    print(f"Total P&L: ${analysis['total_pnl']:.2f}")
-    
-    if analysis['best_trade'] is not None:
-        print(f"\nBest trade:")
-        print(f"  Symbol: {analysis['best_trade']['symbol']}")
-        print(f"  P&L: ${analysis['best_trade']['pnl']:.2f} ({analysis['best_trade']['pnl_pct']:.2f}%)")
-        
-    if analysis['worst_trade'] is not None:
-        print(f"\nWorst trade:")
-        print(f"  Symbol: {analysis['worst_trade']['symbol']}")
-        print(f"  P&L: ${analysis['worst_trade']['pnl']:.2f} ({analysis['worst_trade']['pnl_pct']:.2f}%)")
-    
+    if report_dates:
+        results_df = backtest_report_dates(report_dates)
+    else:
+        backtest = BearishTrendyEMABacktest(os.path.join(REPORT_ROOT, DEFAULT_REPORT_DATE.strftime('%Y-%m-%d'), 'usBatch', 'bearishTrendyEMA'))
+        results_df = backtest.run_backtest()
+
+    trendy_ema_backtest.print_report(results_df, 'bearish')
+
     # Save detailed results to CSV
     output_file = "strategy/bearish_trendy_ema_backtest_results.csv"
     results_df.to_csv(output_file, index=False)
     print(f"\nDetailed results saved to: {output_file}")
-    
-    # Show sample of successful trades
-    successful_trades = results_df[results_df['status'] == 'SUCCESS']
-    if not successful_trades.empty:
-        print(f"\nSample of successful SHORT trades:")
-        print(successful_trades[['symbol', 'entry_price', 'exit_price', 'pnl', 'pnl_pct', 'days_held', 'exit_reason']].head(10).to_string(index=False))
-        
-        # Show fallback price usage statistics
-        entry_fallbacks = successful_trades[successful_trades['entry_price_type'] == 'ask_fallback']
-        exit_fallbacks = successful_trades[successful_trades['exit_price_type'] == 'bid_fallback']
-        print(f"\nPrice fallback usage:")
-        print(f"Entry price fallbacks (used ask instead of bid): {len(entry_fallbacks)}")
-        print(f"Exit price fallbacks (used bid instead of ask): {len(exit_fallbacks)}")
-        if len(entry_fallbacks) > 0:
-            print(f"Entry fallback symbols: {entry_fallbacks['symbol'].tolist()}")
-        if len(exit_fallbacks) > 0:
-            print(f"Exit fallback symbols: {exit_fallbacks['symbol'].tolist()}")
-        
-        # Show exit reason statistics
-        take_profit_trades = successful_trades[successful_trades['exit_reason'] == 'take_profit']
-        stop_loss_trades = successful_trades[successful_trades['exit_reason'] == 'stop_loss']
-        time_limit_trades = successful_trades[successful_trades['exit_reason'] == 'time_limit']
-        print(f"\nExit reason statistics:")
-        print(f"Take profit exits (7.5%): {len(take_profit_trades)} ({len(take_profit_trades)/len(successful_trades)*100:.1f}%)")
-        print(f"Stop loss exits (5%): {len(stop_loss_trades)} ({len(stop_loss_trades)/len(successful_trades)*100:.1f}%)")
-        print(f"Time limit exits (14 days): {len(time_limit_trades)} ({len(time_limit_trades)/len(successful_trades)*100:.1f}%)")
-        if len(take_profit_trades) > 0:
-            print(f"Average days to take profit: {take_profit_trades['days_held'].mean():.1f}")
-        if len(stop_loss_trades) > 0:
-            print(f"Average days to stop loss: {stop_loss_trades['days_held'].mean():.1f}")
-    
-    # Show failed trades
-    failed_trades = results_df[results_df['status'] != 'SUCCESS']
-    if not failed_trades.empty:
-        print(f"\nFailed trades ({len(failed_trades)} total):")
-        print(failed_trades[['symbol', 'status', 'error']].head(10).to_string(index=False))
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
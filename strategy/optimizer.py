@@ -0,0 +1,224 @@
+"""
+Parameter sweep and walk-forward optimizer for the strategy backtests.
+
+Price data is loaded once by the caller as (date x symbol) panels and copied into shared memory;
+worker processes attach to it read-only, so every parameter set is evaluated without refetching
+or pickling the data. An objective is a module-level function
+
+    evaluate(data: Dict[str, np.ndarray], params: dict, rows: slice) -> dict of metrics
+
+that trades only on panel rows in `rows` (earlier rows are there for indicator warm-up). Results
+that do not depend on every swept parameter can be memoized per worker process with cached();
+in thread mode (use_processes=False) all threads share one cache.
+"""
+
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+Objective = Callable[[Dict[str, np.ndarray], dict, slice], Dict[str, float]]
+
+# Per-process state: attached shared arrays and memoized indicator results
+_DATA: Dict[str, np.ndarray] = {}
+_SHARED_BLOCKS: List[shared_memory.SharedMemory] = []
+_CACHE: Dict[Any, Any] = {}
+_CACHE_LOCK = threading.Lock()
+_KEY_LOCKS: Dict[Any, threading.Lock] = {}
+
+
+def align_panel(series_by_symbol: Dict[str, pd.Series]) -> Tuple[pd.DatetimeIndex, List[str], np.ndarray]:
+    """
+    Align per-symbol Series on the union of their dates without filling gaps.
+
+    Returns:
+        (dates, symbols, values) with values a float64 (dates x symbols) array, NaN where a symbol has no bar
+    """
+    frame = pd.DataFrame({
+        symbol: series[~series.index.duplicated(keep='last')]
+        for symbol, series in series_by_symbol.items() if len(series)
+    }).sort_index()
+    return frame.index, list(frame.columns), frame.to_numpy(dtype=np.float64)
+
+
+class SharedArrays:
+    """NumPy arrays copied into named shared memory blocks; use as a context manager to unlink them."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(spec: Dict[str, tuple]) -> Dict[str, np.ndarray]:
+    data = {}
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _SHARED_BLOCKS.append(block)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        data[name] = array
+    return data
+
+
+def _init_worker(spec: Dict[str, tuple]):
+    _DATA.clear()
+    _CACHE.clear()
+    _DATA.update(_attach(spec))
+
+
+def _run_task(evaluate: Objective, params: dict, rows: slice) -> Dict[str, float]:
+    return evaluate(_DATA, params, rows)
+
+
+def cached(key, compute: Callable[[], Any]):
+    """
+    Memoize compute() in the current worker process under key (e.g. ('ema', column, span)).
+
+    In thread mode every thread shares the cache; concurrent misses for the same key wait for
+    one compute() instead of each running it.
+    """
+    try:
+        return _CACHE[key]
+    except KeyError:
+        pass
+    with _CACHE_LOCK:
+        key_lock = _KEY_LOCKS.setdefault(key, threading.Lock())
+    with key_lock:
+        if key not in _CACHE:
+            _CACHE[key] = compute()
+    with _CACHE_LOCK:
+        _KEY_LOCKS.pop(key, None)
+    return _CACHE[key]
+
+
+def param_grid(space: Dict[str, list]) -> List[dict]:
+    """Every combination of the values in space, e.g. {'period': [7, 10], 'multiplier': [2, 3]}."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_params(space: Dict[str, list], n: int, seed: Optional[int] = None) -> List[dict]:
+    """n distinct parameter sets drawn uniformly from the grid defined by space."""
+    grid = param_grid(space)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(grid), size=min(n, len(grid)), replace=False)
+    return [grid[i] for i in sorted(picks)]
+
+
+def walk_forward_splits(n_rows: int, train_rows: int, test_rows: int, step: Optional[int] = None,
+                        warmup_rows: int = 0) -> List[Tuple[slice, slice]]:
+    """
+    Rolling (train, test) row windows: train on [start, start + train_rows), test on the
+    following test_rows rows, then move forward by step (default: test_rows).
+    """
+    step = step or test_rows
+    splits = []
+    start = warmup_rows
+    while start + train_rows + test_rows <= n_rows:
+        train_end = start + train_rows
+        splits.append((slice(start, train_end), slice(train_end, train_end + test_rows)))
+        start += step
+    return splits
+
+
+@dataclass
+class Optimizer:
+    """
+    Evaluate an objective for many parameter sets over shared price panels.
+
+    Args:
+        data: Named (date x symbol) panels, e.g. {'high': ..., 'low': ..., 'close': ...}
+        evaluate: Module-level objective (it is pickled to the workers)
+        max_workers: Pool size (default: os.cpu_count())
+        use_processes: Evaluate in worker processes attached to shared memory, or in threads
+    """
+    data: Dict[str, np.ndarray]
+    evaluate: Objective
+    max_workers: Optional[int] = None
+    use_processes: bool = True
+
+    @contextmanager
+    def _executor(self):
+        max_workers = self.max_workers or os.cpu_count() or 1
+        if not self.use_processes:
+            if _DATA.keys() != self.data.keys() or any(_DATA[k] is not v for k, v in self.data.items()):
+                _DATA.clear()
+                _CACHE.clear()
+                _DATA.update(self.data)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                yield executor
+            return
+
+        with SharedArrays(self.data) as shared:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(shared.spec,)) as executor:
+                yield executor
+
+    def _map(self, executor, tasks: List[Tuple[dict, slice]]) -> List[Dict[str, float]]:
+        futures = [executor.submit(_run_task, self.evaluate, params, rows) for params, rows in tasks]
+        return [future.result() for future in futures]
+
+    def sweep(self, params_list: List[dict], rows: slice = slice(None)) -> pd.DataFrame:
+        """Evaluate every parameter set on rows; one result row per parameter set."""
+        with self._executor() as executor:
+            metrics = self._map(executor, [(params, rows) for params in params_list])
+        return pd.DataFrame([{**params, **result} for params, result in zip(params_list, metrics)])
+
+    def walk_forward(self, params_list: List[dict], splits: List[Tuple[slice, slice]],
+                     metric: str, maximize: bool = True) -> pd.DataFrame:
+        """
+        For each split pick the parameter set with the best train metric and evaluate it out of
+        sample on the test rows.
+
+        Returns:
+            One row per split with the chosen parameters, train_<metric> and the test metrics
+        """
+        with self._executor() as executor:
+            tasks = [(params, train) for train, _ in splits for params in params_list]
+            train_metrics = self._map(executor, tasks)
+
+            chosen = []
+            for i in range(len(splits)):
+                scores = np.array([m.get(metric, np.nan) for m in
+                                   train_metrics[i * len(params_list):(i + 1) * len(params_list)]], dtype=np.float64)
+                scores = np.where(np.isnan(scores), -np.inf if maximize else np.inf, scores)
+                chosen.append(int(np.argmax(scores) if maximize else np.argmin(scores)))
+
+            test_metrics = self._map(executor, [(params_list[best], test) for best, (_, test) in zip(chosen, splits)])
+
+        rows = []
+        for i, ((train, test), best, result) in enumerate(zip(splits, chosen, test_metrics)):
+            rows.append({
+                'split': i,
+                'train_start': train.start, 'train_stop': train.stop,
+                'test_start': test.start, 'test_stop': test.stop,
+                **params_list[best],
+                f'train_{metric}': train_metrics[i * len(params_list) + best].get(metric),
+                **result,
+            })
+        return pd.DataFrame(rows)
@@ -0,0 +1,252 @@
+"""
+Event-driven portfolio engine shared by the strategy backtests.
+
+Candidate trades (symbol, entry/exit date and price) are replayed through a sorted queue of entry
+and exit events, so only days on which something happens are visited. Cash and invested capital
+are updated incrementally on each event, and the equity curve comes back as arrays with one point
+per event day. On a given day exits are settled before entries are sized.
+
+mark_to_market() then values the resulting positions daily against a (date x symbol) float32
+close panel, giving equity, exposure and drawdown without looping over positions per day.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+CASH_TOLERANCE = 1e-9  # Relative to equity
+
+# sizer(trade, equity, cash) -> number of shares to buy (<= 0 skips the trade)
+Sizer = Callable[[dict, float, float], float]
+
+
+POSITION_COLUMNS = ['symbol', 'entry_date', 'exit_date', 'shares', 'cost_basis']
+
+
+@dataclass
+class PortfolioResult:
+    trades: pd.DataFrame
+    open_positions: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=POSITION_COLUMNS))
+    dates: np.ndarray = field(default_factory=lambda: np.array([], dtype='datetime64[ns]'))
+    equity: np.ndarray = field(default_factory=lambda: np.array([], dtype=np.float64))
+    cash: np.ndarray = field(default_factory=lambda: np.array([], dtype=np.float64))
+
+    def equity_frame(self) -> pd.DataFrame:
+        """Equity curve as a DataFrame with 'date', 'equity' and 'cash' columns."""
+        return pd.DataFrame({'date': self.dates, 'equity': self.equity, 'cash': self.cash})
+
+
+def _trade_days(dates) -> np.ndarray:
+    """Calendar day of each timestamp (wall time in its own timezone) as datetime64[D]."""
+    index = pd.DatetimeIndex(dates)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize().to_numpy().astype('datetime64[D]')
+
+
+def risk_sizer(risk_pct: float = 0.01, max_position_pct: float = 0.20) -> Sizer:
+    """
+    Volatility adjusted sizing: risk risk_pct of equity over the trade's 'initial_stop_dist',
+    capped at max_position_pct of equity per position.
+    """
+    def size(trade: dict, equity: float, cash: float) -> float:
+        stop_dist = trade['initial_stop_dist']
+        if stop_dist <= 0:
+            return 0.0
+        shares_by_risk = risk_pct * equity / stop_dist
+        shares_by_cap = max_position_pct * equity / trade['entry_price']
+        return min(shares_by_risk, shares_by_cap)
+    return size
+
+
+def simulate_portfolio(trades: List[dict], sizer: Sizer, initial_balance: float = 1000,
+                       end_date=None) -> PortfolioResult:
+    """
+    Replay candidate trades through a cash-constrained portfolio.
+
+    Args:
+        trades: Dicts with at least symbol, entry_date, exit_date, entry_price, exit_price and
+            reason, plus whatever the sizer reads
+        sizer: Returns the shares to buy for a trade given current equity and cash
+        initial_balance: Starting cash
+        end_date: Last day of the simulation; exits after it stay open (default: last event)
+
+    Returns:
+        PortfolioResult with the closed trades, the positions still open at end_date and the
+        event equity curve, where open positions are valued at cost (see mark_to_market)
+    """
+    if not trades:
+        return PortfolioResult(trades=pd.DataFrame())
+
+    trades = sorted(trades, key=lambda t: t['entry_date'])
+    entry_days = _trade_days([t['entry_date'] for t in trades])
+    exit_days = _trade_days([t['exit_date'] for t in trades])
+    last_day = _trade_days([end_date])[0] if end_date is not None else max(entry_days.max(), exit_days.max())
+
+    cash = float(initial_balance)
+    invested = 0.0
+    # (exit day, -entry sequence, shares, cost): same-day exits settle newest position first
+    open_positions = []
+    closed_trades = []
+    curve_days, curve_equity, curve_cash = [], [], []
+
+    def record(day):
+        if curve_days and curve_days[-1] == day:
+            curve_equity[-1] = cash + invested
+            curve_cash[-1] = cash
+        else:
+            curve_days.append(day)
+            curve_equity.append(cash + invested)
+            curve_cash.append(cash)
+
+    def settle_until(day):
+        nonlocal cash, invested
+        while open_positions and open_positions[0][0] <= day:
+            exit_day, neg_seq, shares, cost = heapq.heappop(open_positions)
+            trade = trades[-neg_seq]
+            exit_value = shares * trade['exit_price']
+            cash += exit_value
+            invested -= cost
+            closed_trades.append({
+                'symbol': trade['symbol'],
+                'entry_date': trade['entry_date'],
+                'exit_date': trade['exit_date'],
+                'entry_price': trade['entry_price'],
+                'exit_price': trade['exit_price'],
+                'shares': shares,
+                'cost_basis': cost,
+                'pnl': exit_value - cost,
+                'pnl_pct': (exit_value - cost) / cost * 100,
+                'reason': trade['reason']
+            })
+            record(exit_day)
+
+    record(entry_days[0])
+    for seq, trade in enumerate(trades):
+        day = entry_days[seq]
+        if day > last_day:
+            break
+        settle_until(day)
+
+        equity = cash + invested
+        shares = sizer(trade, equity, cash)
+        cost = shares * trade['entry_price']
+        # Positions sized as an exact fraction of equity can tie with the remaining cash; the running
+        # totals carry rounding error, so ties are resolved with a relative tolerance
+        if shares > 0 and cash - cost >= -CASH_TOLERANCE * equity:
+            cost = min(cost, cash)
+            cash -= cost
+            invested += cost
+            heapq.heappush(open_positions, (exit_days[seq], -seq, shares, cost))
+        record(day)
+
+    settle_until(last_day)
+    record(last_day)
+
+    still_open = [
+        {'symbol': trades[-neg_seq]['symbol'], 'entry_date': trades[-neg_seq]['entry_date'],
+         'exit_date': trades[-neg_seq]['exit_date'], 'shares': shares, 'cost_basis': cost}
+        for _, neg_seq, shares, cost in sorted(open_positions, key=lambda p: -p[1])
+    ]
+
+    return PortfolioResult(
+        trades=pd.DataFrame(closed_trades),
+        open_positions=pd.DataFrame(still_open, columns=POSITION_COLUMNS),
+        dates=np.array(curve_days, dtype='datetime64[D]').astype('datetime64[ns]'),
+        equity=np.array(curve_equity, dtype=np.float64),
+        cash=np.array(curve_cash, dtype=np.float64),
+    )
+
+
+@dataclass
+class ClosePanel:
+    dates: np.ndarray  # datetime64[D], sorted
+    symbols: List[str]
+    closes: np.ndarray  # float32 (dates x symbols), forward filled, 0 before a symbol's first bar
+
+    def column(self, symbol: str) -> int:
+        return self._columns[symbol]
+
+    def __post_init__(self):
+        self._columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+
+def close_panel(closes: Dict[str, pd.Series]) -> ClosePanel:
+    """
+    Align per-symbol daily close series into one (date x symbol) float32 panel. Days before a
+    symbol's first bar are 0 rather than NaN (nothing can be held there), so the panel can be
+    valued without cleaning it first.
+
+    Args:
+        closes: Symbol -> close Series indexed by bar datetime
+    """
+    closes = {symbol: series for symbol, series in closes.items() if len(series)}
+    if not closes:
+        return ClosePanel(np.array([], dtype='datetime64[D]'), [], np.empty((0, 0), dtype=np.float32))
+
+    frame = pd.DataFrame({
+        symbol: pd.Series(series.to_numpy(dtype=np.float32), index=_trade_days(series.index))
+        for symbol, series in closes.items()
+    })
+    frame = frame[~frame.index.duplicated(keep='last')].sort_index().ffill().fillna(0)
+    return ClosePanel(
+        dates=frame.index.to_numpy().astype('datetime64[D]'),
+        symbols=list(frame.columns),
+        closes=np.ascontiguousarray(frame.to_numpy(dtype=np.float32)),
+    )
+
+
+def mark_to_market(result: PortfolioResult, panel: ClosePanel) -> pd.DataFrame:
+    """
+    Daily mark-to-market equity curve of a simulated portfolio.
+
+    Shares held per (day, symbol) are built from +shares/-shares deltas at entry and exit rows and
+    a cumulative sum down the panel; positions are valued at each day's close, cash comes from the
+    event curve as of that day's close.
+
+    Returns:
+        DataFrame with 'date', 'cash', 'market_value', 'equity', 'exposure' (market value / equity)
+        and 'drawdown' (equity / running peak - 1) for every panel day in the simulated range
+    """
+    columns = ['date', 'cash', 'market_value', 'equity', 'exposure', 'drawdown']
+    if len(result.dates) == 0 or len(panel.dates) == 0:
+        return pd.DataFrame(columns=columns)
+
+    event_days = result.dates.astype('datetime64[D]')
+    lo = np.searchsorted(panel.dates, event_days[0], side='left')
+    hi = np.searchsorted(panel.dates, event_days[-1], side='right')
+    dates = panel.dates[lo:hi]
+    closes = panel.closes[lo:hi]
+
+    positions = pd.concat([result.trades.reindex(columns=POSITION_COLUMNS), result.open_positions],
+                          ignore_index=True)
+    holdings = np.zeros((len(dates) + 1, len(panel.symbols)), dtype=np.float64)
+    if len(positions):
+        cols = np.array([panel.column(symbol) for symbol in positions['symbol']], dtype=np.int64)
+        shares = positions['shares'].to_numpy(dtype=np.float64)
+        entry_rows = np.searchsorted(dates, _trade_days(positions['entry_date']), side='left')
+        exit_rows = np.searchsorted(dates, _trade_days(positions['exit_date']), side='left')
+        is_open = np.arange(len(positions)) >= len(result.trades)
+        exit_rows[is_open] = len(dates)
+        np.add.at(holdings, (entry_rows, cols), shares)
+        np.add.at(holdings, (exit_rows, cols), -shares)
+    holdings = np.cumsum(holdings[:-1], axis=0)
+
+    market_value = np.einsum('ij,ij->i', holdings, closes, dtype=np.float64)
+    cash = result.cash[np.searchsorted(event_days, dates, side='right') - 1]
+    equity = cash + market_value
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exposure = np.where(equity != 0, market_value / equity, np.nan)
+        drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    return pd.DataFrame({
+        'date': dates.astype('datetime64[ns]'),
+        'cash': cash,
+        'market_value': market_value,
+        'equity': equity,
+        'exposure': exposure,
+        'drawdown': drawdown,
+    })
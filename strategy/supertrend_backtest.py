@@ -13,138 +13,223 @@ import pytz
 # Add the parent directory to the path so we can import from data module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data.TimescaleDBSticksDao import get_sticks
+from data.TimescaleDBSticksDao import get_sticks, get_sticks_many
+from indicators._numba import njit
+from indicators.kernels import adx, ema, rsi, supertrend
+from strategy.optimizer import Optimizer, align_panel, cached, param_grid, walk_forward_splits
+from strategy.portfolio_engine import close_panel, mark_to_market, risk_sizer, simulate_portfolio
+
+FETCH_BATCH_SIZE = 100  # Symbols per get_sticks_many query
+WARMUP_DAYS = 200  # Minimum daily bars required before simulating a symbol
 
 def calculate_supertrend(df: pd.DataFrame, period=10, multiplier=3) -> pd.DataFrame:
     """
     Calculates Supertrend indicator and returns a dataframe with 'supertrend' and 'supertrend_direction' columns.
     """
     sticks = df.copy()
-    high = sticks['ask_high'].values
-    low = sticks['ask_low'].values
-    close = sticks['ask_close'].values
-    
-    # Calculate ATR
-    m = len(close)
-    tr = np.zeros(m)
-    # TR[0] is just high - low
-    tr[0] = high[0] - low[0]
-    
-    for i in range(1, m):
-        hl = high[i] - low[i]
-        hc = abs(high[i] - close[i - 1])
-        lc = abs(low[i] - close[i - 1])
-        tr[i] = max(hl, hc, lc)
-        
-    # Calculate ATR using EWMA
-    atr_series = pd.Series(tr).ewm(alpha=1/period, adjust=False).mean()
-    atr = atr_series.values
-    
-    # Calculate Basic Upper and Lower Bands
-    hl2 = (high + low) / 2
-    basic_upper = hl2 + (multiplier * atr)
-    basic_lower = hl2 - (multiplier * atr)
-    
-    final_upper = np.zeros(m)
-    final_lower = np.zeros(m)
-    supertrend = np.zeros(m)
-    
-    # Initialize first values
-    final_upper[0] = basic_upper[0]
-    final_lower[0] = basic_lower[0]
-    supertrend[0] = final_upper[0]
-    
-    for i in range(1, m):
-        # Final Upper Band
-        if basic_upper[i] < final_upper[i-1] or close[i-1] > final_upper[i-1]:
-            final_upper[i] = basic_upper[i]
-        else:
-            final_upper[i] = final_upper[i-1]
-            
-        # Final Lower Band
-        if basic_lower[i] > final_lower[i-1] or close[i-1] < final_lower[i-1]:
-            final_lower[i] = basic_lower[i]
-        else:
-            final_lower[i] = final_lower[i-1]
-            
-        # Supertrend
-        if supertrend[i-1] == final_upper[i-1]:
-            if close[i] <= final_upper[i]:
-                supertrend[i] = final_upper[i]
-            else:
-                supertrend[i] = final_lower[i]
-        else:
-            if close[i] >= final_lower[i]:
-                supertrend[i] = final_lower[i]
-            else:
-                supertrend[i] = final_upper[i]
-                
-    sticks['supertrend'] = supertrend
+    line, direction = supertrend(sticks['ask_high'].values, sticks['ask_low'].values, sticks['ask_close'].values,
+                                 period, multiplier)
+    sticks['supertrend'] = line
     # 1 for Bullish (Price > Supertrend), -1 for Bearish (Price < Supertrend)
-    sticks['supertrend_direction'] = np.where(close > supertrend, 1, -1)
+    sticks['supertrend_direction'] = direction
     
     return sticks
 
 def add_ema(df: pd.DataFrame, span=200) -> pd.DataFrame:
-    df['ema200'] = df['ask_close'].ewm(span=span, adjust=False).mean()
+    df['ema200'] = ema(df['ask_close'].values, span)
     return df
 
 def calculate_rsi(df: pd.DataFrame, period=14) -> pd.DataFrame:
-    delta = df['ask_close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    
-    rs = gain / loss
-    df['rsi'] = 100 - (100 / (1+rs))
+    df['rsi'] = rsi(df['ask_close'].values, period)
     return df
 
 def calculate_adx(df: pd.DataFrame, period=14) -> pd.DataFrame:
     """Calculate Average Directional Index (ADX)"""
-    high = df['ask_high']
-    low = df['ask_low']
-    close = df['ask_close']
+    df['adx'], df['atr'] = adx(df['ask_high'].values, df['ask_low'].values, df['ask_close'].values, period)
+    return df
+
+# Exit reason codes stored in TRADE_DTYPE['reason']
+EXIT_REASONS = ('Stop Loss', 'Supertrend Bearish', 'End of Backtest')
+
+TRADE_DTYPE = np.dtype([
+    ('entry_idx', np.int64),
+    ('exit_idx', np.int64),
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),
+    ('pnl', np.float64),
+    ('pnl_pct', np.float64),
+    ('reason', np.int8),
+    ('initial_stop_dist', np.float64),
+])
+
+@njit(cache=True)
+def _trade_kernel(price, atr, adx, direction, prev_direction, ema200, rsi, start_idx, stop_atr,
+                  entry_idx, exit_idx, stop_dist, reason):
+    n = len(price)
+    count = 0
+    in_position = False
+    entry_i = 0
+    stop_loss = 0.0
+    
+    for i in range(start_idx, n):
+        p = price[i]
+        if p <= 0 or np.isnan(p) or np.isnan(atr[i]) or np.isnan(adx[i]):
+            continue
+        
+        # Signals
+        supertrend_bullish = prev_direction[i] == -1 and direction[i] == 1
+        supertrend_bearish = prev_direction[i] == 1 and direction[i] == -1
+        
+        if not in_position:
+            # Entry Condition: Supertrend Flip + EMA Trend + RSI not overbought + Strong Trend (ADX)
+            if supertrend_bullish and p > ema200[i] and rsi[i] < 70 and adx[i] > 25:
+                in_position = True
+                entry_i = i
+                stop_dist[count] = stop_atr * atr[i]
+                stop_loss = p - stop_dist[count]
+        else:
+            # Trailing stop only ever moves up
+            new_stop_candidate = p - (stop_atr * atr[i])
+            if new_stop_candidate > stop_loss:
+                stop_loss = new_stop_candidate
+            
+            hit_stop_loss = p <= stop_loss
+            if supertrend_bearish or hit_stop_loss:
+                entry_idx[count] = entry_i
+                exit_idx[count] = i
+                reason[count] = 0 if hit_stop_loss else 1
+                count += 1
+                in_position = False
     
-    plus_dm = high.diff()
-    minus_dm = low.diff()
-    plus_dm[plus_dm < 0] = 0
-    minus_dm[minus_dm > 0] = 0
+    if in_position:
+        entry_idx[count] = entry_i
+        exit_idx[count] = n - 1
+        reason[count] = 2
+        count += 1
+    return count
+
+def simulate_trades(price, atr, adx, direction, ema200, rsi, start_idx: int, stop_atr: float = 3.0) -> np.ndarray:
+    """
+    Run the entry / trailing-stop / exit state machine over indicator arrays from start_idx on.
     
-    tr1 = pd.DataFrame(high - low)
-    tr2 = pd.DataFrame(abs(high - close.shift(1)))
-    tr3 = pd.DataFrame(abs(low - close.shift(1)))
-    frames = [tr1, tr2, tr3]
-    tr = pd.concat(frames, axis=1, join='inner').max(axis=1)
-    atr = tr.rolling(period).mean()
+    Returns:
+        Structured array of TRADE_DTYPE; 'reason' indexes EXIT_REASONS
+    """
+    price = np.asarray(price, dtype=np.float64)
+    n = len(price)
+    # Bar i compares against bar i - 1, which wraps to the last bar for i == 0 like df.iloc[-1]
+    direction = np.asarray(direction, dtype=np.int64)
+    prev_direction = np.roll(direction, 1)
     
-    plus_di = 100 * (plus_dm.ewm(alpha=1/period).mean() / atr)
-    minus_di = 100 * (abs(minus_dm).ewm(alpha=1/period).mean() / atr)
-    dx = (abs(plus_di - minus_di) / abs(plus_di + minus_di)) * 100
-    adx = ((dx.shift(1) * (period - 1)) + dx) / period
-    adx_smooth = adx.ewm(alpha=1/period).mean()
+    entry_idx = np.zeros(n + 1, dtype=np.int64)
+    exit_idx = np.zeros(n + 1, dtype=np.int64)
+    stop_dist = np.zeros(n + 1, dtype=np.float64)
+    reason = np.zeros(n + 1, dtype=np.int8)
+    count = _trade_kernel(price, np.asarray(atr, dtype=np.float64), np.asarray(adx, dtype=np.float64),
+                          direction, prev_direction, np.asarray(ema200, dtype=np.float64),
+                          np.asarray(rsi, dtype=np.float64), start_idx, float(stop_atr), entry_idx, exit_idx, stop_dist, reason)
     
-    df['adx'] = adx_smooth
-    df['atr'] = atr
-    return df
+    trades = np.zeros(count, dtype=TRADE_DTYPE)
+    trades['entry_idx'] = entry_idx[:count]
+    trades['exit_idx'] = exit_idx[:count]
+    trades['entry_price'] = price[trades['entry_idx']]
+    trades['exit_price'] = price[trades['exit_idx']]
+    trades['pnl'] = trades['exit_price'] - trades['entry_price']
+    trades['pnl_pct'] = (trades['pnl'] / trades['entry_price']) * 100
+    trades['reason'] = reason[:count]
+    trades['initial_stop_dist'] = stop_dist[:count]
+    return trades
+
+PANEL_COLUMNS = {'high': 'ask_high', 'low': 'ask_low', 'close': 'ask_close', 'volume': 'volume'}
+
+def load_price_panels(symbols: list, start_date: datetime, end_date: datetime):
+    """
+    Fetch daily sticks once and align them into (date x symbol) panels for the optimizer.
+    
+    Returns:
+        (dates, symbols, panels) with panels keyed by PANEL_COLUMNS, NaN where a symbol has no bar
+    """
+    series = {column: {} for column in PANEL_COLUMNS}
+    for batch_start in range(0, len(symbols), FETCH_BATCH_SIZE):
+        batch = symbols[batch_start:batch_start + FETCH_BATCH_SIZE]
+        sticks = get_sticks_many(batch, 1440, start_date, end_date, use_cache=True)
+        for symbol in batch:
+            df = sticks[symbol]
+            if df.empty or len(df) < WARMUP_DAYS or df['volume'].mean() < 10000:
+                continue
+            for column, source in PANEL_COLUMNS.items():
+                series[column][symbol] = df[source]
+    
+    panels = {}
+    dates, panel_symbols = None, []
+    for column in PANEL_COLUMNS:
+        dates, panel_symbols, panels[column] = align_panel(series[column])
+    return dates, panel_symbols, panels
+
+def _symbol_indicators(data: dict, col: int):
+    """Bars of one panel column and the indicators that do not depend on swept parameters."""
+    rows = np.flatnonzero(~np.isnan(data['close'][:, col]))
+    high, low, close = data['high'][rows, col], data['low'][rows, col], data['close'][rows, col]
+    adx_values, atr = adx(high, low, close, 14)
+    return rows, high, low, close, ema(close, 200), rsi(close, 14), adx_values, atr
+
+def evaluate_params(data: dict, params: dict, rows: slice) -> dict:
+    """
+    Optimizer objective: trade every panel column with the given Supertrend parameters, entering
+    only on rows inside the window and closing open trades at its last row.
+    """
+    start, stop, _ = rows.indices(data['close'].shape[0])
+    period = params.get('period', 10)
+    multiplier = params.get('multiplier', 3)
+    
+    pnl_pct = []
+    for col in range(data['close'].shape[1]):
+        bars, high, low, close, ema200, rsi_values, adx_values, atr = cached(
+            ('indicators', col), lambda: _symbol_indicators(data, col))
+        lo, hi = np.searchsorted(bars, [start, stop])
+        if hi - lo == 0:
+            continue
+        _, direction = cached(('supertrend', col, period, multiplier),
+                              lambda: supertrend(high, low, close, period, multiplier))
+        trades = simulate_trades(close[:hi], atr[:hi], adx_values[:hi], direction[:hi], ema200[:hi],
+                                 rsi_values[:hi], lo, params.get('stop_atr', 3.0))
+        pnl_pct.append(trades['pnl_pct'])
+    
+    pnl_pct = np.concatenate(pnl_pct) if pnl_pct else np.array([])
+    if len(pnl_pct) == 0:
+        return {'trades': 0, 'win_rate': np.nan, 'avg_pnl_pct': np.nan, 'total_pnl_pct': 0.0}
+    return {
+        'trades': len(pnl_pct),
+        'win_rate': (pnl_pct > 0).mean() * 100,
+        'avg_pnl_pct': pnl_pct.mean(),
+        'total_pnl_pct': pnl_pct.sum(),
+    }
 
 class SupertrendBacktest:
-    def __init__(self, symbols: list, start_date: datetime, end_date: datetime):
+    def __init__(self, symbols: list, start_date: datetime, end_date: datetime,
+                 period: int = 10, multiplier: float = 3, stop_atr: float = 3.0):
         self.symbols = symbols
         self.start_date = start_date
         self.end_date = end_date
+        self.period = period
+        self.multiplier = multiplier
+        self.stop_atr = stop_atr
         self.results = []
         # Removed fixed stop_loss_pct, using ATR based
         
-    def simulate_symbol(self, symbol: str) -> list:
+    def fetch_start(self) -> datetime:
+        # Fetch extra history so the 200 EMA is warmed up by start_date
+        return self.start_date - timedelta(days=WARMUP_DAYS * 2)
+
+    def simulate_symbol(self, symbol: str, df: pd.DataFrame = None) -> list:
         try:
-            warmup_days = 200
-            fetch_start = self.start_date - timedelta(days=warmup_days * 2) 
-            
-            df = get_sticks(symbol, 1440, fetch_start, self.end_date)
+            if df is None:
+                df = get_sticks(symbol, 1440, self.fetch_start(), self.end_date, use_cache=True)
             
             if df.empty or 'ask_high' not in df.columns or 'volume' not in df.columns:
                 return []
                 
-            if len(df) < warmup_days:
+            if len(df) < WARMUP_DAYS:
                 return []
             
             # Simple Volume Filter: Average volume > 10,000
@@ -152,97 +237,35 @@ class SupertrendBacktest:
                 return []
             
             # Add Indicators
-            df = calculate_supertrend(df, period=10, multiplier=3)
+            df = calculate_supertrend(df, period=self.period, multiplier=self.multiplier)
             df = add_ema(df, span=200)
             df = calculate_rsi(df, period=14)
             df = calculate_adx(df, period=14)
             
-            # Filter for the requested simulation period
-            sim_df = df[df.index >= self.start_date]
-            
-            if sim_df.empty:
+            # Start simulating at the first bar inside the requested period
+            start_idx = df.index.searchsorted(self.start_date)
+            if start_idx >= len(df):
                 return []
-                
-            trades = []
-            position = None
-            
-            start_idx = df.index.get_loc(sim_df.index[0])
             
-            for i in range(start_idx, len(df)):
-                curr_date = df.index[i]
-                curr_row = df.iloc[i]
-                prev_row = df.iloc[i-1]
-                
-                price = curr_row['ask_close']
-                atr = curr_row['atr']
-                adx = curr_row['adx']
-                
-                if price <= 0 or np.isnan(price) or np.isnan(atr) or np.isnan(adx): continue
-                
-                # Signals
-                supertrend_bullish = (prev_row['supertrend_direction'] == -1) and (curr_row['supertrend_direction'] == 1)
-                supertrend_bearish = (prev_row['supertrend_direction'] == 1) and (curr_row['supertrend_direction'] == -1)
-                
-                is_uptrend = price > curr_row['ema200']
-                rsi_not_overbought = curr_row['rsi'] < 70
-                strong_trend = adx > 25
-                
-                if position is None:
-                    # Entry Condition: Supertrend Flip + EMA Trend + RSI not overbought + Strong Trend (ADX)
-                    if supertrend_bullish and is_uptrend and rsi_not_overbought and strong_trend:
-                        initial_stop_dist = 3 * atr
-                        position = {
-                            'symbol': symbol,
-                            'entry_date': curr_date,
-                            'entry_price': price,
-                            'stop_loss': price - initial_stop_dist,
-                            'initial_stop_dist': initial_stop_dist
-                        }
-                else:
-                    # Update Trailing Stop
-                    # Logic: If price moves up, move SL up. SL never moves down.
-                    new_stop_candidate = price - (3 * atr)
-                    if new_stop_candidate > position['stop_loss']:
-                        position['stop_loss'] = new_stop_candidate
-                    
-                    # Exit Conditions
-                    hit_stop_loss = price <= position['stop_loss']
-                    
-                    if supertrend_bearish or hit_stop_loss:
-                        exit_reason = 'Stop Loss' if hit_stop_loss else 'Supertrend Bearish'
-                        pnl = price - position['entry_price']
-                        pnl_pct = (pnl / position['entry_price']) * 100
-                        
-                        trades.append({
-                            'symbol': symbol,
-                            'entry_date': position['entry_date'],
-                            'exit_date': curr_date,
-                            'entry_price': position['entry_price'],
-                            'exit_price': price,
-                            'pnl': pnl,
-                            'pnl_pct': pnl_pct,
-                            'reason': exit_reason,
-                            'initial_stop_dist': position['initial_stop_dist']
-                        })
-                        position = None
+            trades = simulate_trades(
+                df['ask_close'].values, df['atr'].values, df['adx'].values,
+                df['supertrend_direction'].values, df['ema200'].values, df['rsi'].values, start_idx, self.stop_atr
+            )
             
-            if position is not None:
-                 price = df.iloc[-1]['ask_close']
-                 pnl = price - position['entry_price']
-                 pnl_pct = (pnl / position['entry_price']) * 100
-                 trades.append({
+            return [
+                {
                     'symbol': symbol,
-                    'entry_date': position['entry_date'],
-                    'exit_date': df.index[-1],
-                    'entry_price': position['entry_price'],
-                    'exit_price': price,
-                    'pnl': pnl,
-                    'pnl_pct': pnl_pct,
-                    'reason': 'End of Backtest',
-                    'initial_stop_dist': position['initial_stop_dist']
-                })
-
-            return trades
+                    'entry_date': df.index[trade['entry_idx']],
+                    'exit_date': df.index[trade['exit_idx']],
+                    'entry_price': trade['entry_price'],
+                    'exit_price': trade['exit_price'],
+                    'pnl': trade['pnl'],
+                    'pnl_pct': trade['pnl_pct'],
+                    'reason': EXIT_REASONS[trade['reason']],
+                    'initial_stop_dist': trade['initial_stop_dist']
+                }
+                for trade in trades
+            ]
             
         except Exception as e:
             # Only print if it's not a common "empty data" error
@@ -253,102 +276,33 @@ class SupertrendBacktest:
     def run_portfolio_simulation(self, initial_balance=1000):
         print(f"Collecting potential trades for {len(self.symbols)} symbols...")
         all_potential_trades = []
-        for idx, symbol in enumerate(self.symbols):
-            if idx % 50 == 0:
-                print(f"Scanning symbol {idx}/{len(self.symbols)}...")
-            trades = self.simulate_symbol(symbol)
-            all_potential_trades.extend(trades)
+        closes = {}
+        for batch_start in range(0, len(self.symbols), FETCH_BATCH_SIZE):
+            print(f"Scanning symbol {batch_start}/{len(self.symbols)}...")
+            batch = self.symbols[batch_start:batch_start + FETCH_BATCH_SIZE]
+            sticks = get_sticks_many(batch, 1440, self.fetch_start(), self.end_date, use_cache=True)
+            for symbol in batch:
+                trades = self.simulate_symbol(symbol, sticks[symbol])
+                all_potential_trades.extend(trades)
+                if trades:
+                    closes[symbol] = sticks[symbol]['ask_close']
             
         # Sort by entry date
         all_potential_trades.sort(key=lambda x: x['entry_date'])
         
         print(f"Found {len(all_potential_trades)} potential trades. Starting portfolio simulation...")
         
-        cash = initial_balance
-        open_positions = [] # List of dicts
-        closed_trades = []
-        equity_curve = []
-        
-        # Get the full date range for the simulation
         if not all_potential_trades:
             print("No trades found.")
             return pd.DataFrame()
-
-        start_date = all_potential_trades[0]['entry_date']
-        end_date = self.end_date
         
-        current_date = start_date
-        trade_idx = 0
+        # Volatility Adjusted Position Sizing: risk 1% of equity, cap positions at 20% of equity
+        portfolio = simulate_portfolio(all_potential_trades, risk_sizer(0.01, 0.20),
+                                       initial_balance=initial_balance, end_date=self.end_date)
         
-        while current_date <= end_date:
-            # 1. Process Exits (Market Close)
-            for i in range(len(open_positions) - 1, -1, -1):
-                pos = open_positions[i]
-                if pos['exit_date'].date() <= current_date.date():
-                    shares = pos['shares']
-                    exit_value = shares * pos['exit_price']
-                    cash += exit_value
-                    
-                    closed_trades.append({
-                        'symbol': pos['symbol'],
-                        'entry_date': pos['entry_date'],
-                        'exit_date': pos['exit_date'],
-                        'entry_price': pos['entry_price'],
-                        'exit_price': pos['exit_price'],
-                        'shares': shares,
-                        'pnl': exit_value - pos['cost_basis'],
-                        'pnl_pct': (exit_value - pos['cost_basis']) / pos['cost_basis'] * 100,
-                        'reason': pos['reason']
-                    })
-                    
-                    open_positions.pop(i)
-            
-            # 2. Process Entries (Market Open/During Day)
-            while trade_idx < len(all_potential_trades):
-                trade = all_potential_trades[trade_idx]
-                if trade['entry_date'].date() > current_date.date():
-                    break
-                
-                if trade['entry_date'].date() == current_date.date():
-                    current_equity = cash + sum(p['cost_basis'] for p in open_positions)
-                    
-                    # Volatility Adjusted Position Sizing
-                    # Risk = 1% of Equity
-                    risk_amount = 0.01 * current_equity
-                    stop_dist = trade['initial_stop_dist']
-                    
-                    if stop_dist > 0:
-                        shares_by_risk = risk_amount / stop_dist
-                        
-                        # Cap max position size to 20% of equity
-                        max_position_value = 0.20 * current_equity
-                        shares_by_cap = max_position_value / trade['entry_price']
-                        
-                        shares = min(shares_by_risk, shares_by_cap)
-                        cost = shares * trade['entry_price']
-                        
-                        if cash >= cost and shares > 0:
-                            cash -= cost
-                            open_positions.append({
-                                'symbol': trade['symbol'],
-                                'entry_date': trade['entry_date'],
-                                'exit_date': trade['exit_date'],
-                                'entry_price': trade['entry_price'],
-                                'exit_price': trade['exit_price'],
-                                'shares': shares,
-                                'cost_basis': cost,
-                                'reason': trade['reason']
-                            })
-                
-                trade_idx += 1
-            
-            current_equity = cash + sum(p['cost_basis'] for p in open_positions)
-            equity_curve.append({'date': current_date, 'equity': current_equity})
-            
-            current_date += timedelta(days=1)
-            
-        self.results = pd.DataFrame(closed_trades)
-        self.equity_curve = pd.DataFrame(equity_curve)
+        self.results = portfolio.trades
+        # Daily mark-to-market equity, exposure and drawdown against the close panel of traded symbols
+        self.equity_curve = mark_to_market(portfolio, close_panel(closes))
         return self.results
 
     def run(self):
@@ -379,6 +333,8 @@ def main():
         print(f"Final Balance:   ${final_equity:.2f}")
         print(f"Total Return:    {((final_equity - 1000) / 1000 * 100):.2f}%")
         print(f"Total Trades:    {len(results)}")
+        print(f"Max Drawdown:    {bt.equity_curve['drawdown'].min() * 100:.2f}%")
+        print(f"Avg Exposure:    {bt.equity_curve['exposure'].mean() * 100:.2f}%")
         
         win_trades = results[results['pnl'] > 0]
         print(f"Win Rate:        {(len(win_trades) / len(results) * 100):.2f}%")
@@ -409,5 +365,27 @@ def main():
     else:
         print("No trades executed.")
 
+def optimize_main():
+    """Walk-forward the Supertrend period / multiplier / stop over the same symbol universe."""
+    stocks_df = pd.read_csv('hot_stock/us_high_volume_stocks.csv')
+    symbols = stocks_df['symbol'].head(200).tolist()
+    
+    end_date = datetime.now(pytz.UTC)
+    start_date = end_date - timedelta(days=365 * 6)
+    dates, symbols, panels = load_price_panels(symbols, start_date, end_date)
+    print(f"Loaded {len(symbols)} symbols x {len(dates)} days")
+    
+    space = {'period': [7, 10, 14, 20], 'multiplier': [2, 2.5, 3, 4], 'stop_atr': [2, 3, 4]}
+    splits = walk_forward_splits(len(dates), train_rows=504, test_rows=126, warmup_rows=WARMUP_DAYS)
+    results = Optimizer(panels, evaluate_params).walk_forward(param_grid(space), splits, metric='total_pnl_pct')
+    results['test_start_date'] = dates[results['test_start']]
+    
+    print(results.to_string(index=False))
+    results.to_csv('strategy/supertrend_walk_forward.csv', index=False)
+    print("Walk-forward results saved to strategy/supertrend_walk_forward.csv")
+
 if __name__ == "__main__":
-    main()
+    if '--optimize' in sys.argv[1:]:
+        optimize_main()
+    else:
+        main()
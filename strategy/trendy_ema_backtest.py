@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Backtest engine for TrendyEMA signals, long (bullish) or short (bearish)
+
+Signals are the "<score>-<symbol>.jpg" files that happy-machine-report writes to
+<report root>/<YYYY-MM-DD>/usBatch/bullishTrendyEMA and .../bearishTrendyEMA. A trade is opened
+at the close of the report date and managed with a take profit, a stop loss and a maximum
+holding period (see trendy_ema_signals.simulate_signal_trades).
+
+backtest_report_root() finds every dated signal folder under a report root, fetches each
+(symbol, report date) window once through a shared SignalWindowCache, and backtests the dates
+in parallel, so months of reports are measured in one run. With --optimize the take profit, stop
+loss and holding period are walk-forward optimized over the report dates instead.
+
+Usage: python strategy/trendy_ema_backtest.py [--optimize] [report_root] [bullish|bearish ...]
+"""
+
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pytz
+
+# Add the parent directory to the path so we can import from data module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.TimescaleDBSticksDao import get_sticks
+from data.scan_runner import run_scan
+from strategy.optimizer import Optimizer, cached, param_grid, walk_forward_splits
+from strategy.trendy_ema_signals import (failed_trade, fetch_signal_windows, signal_arrays, signal_exits,
+                                         simulate_signal_trades)
+
+REPORT_ROOT = "/Users/benny/git/happy-machine-report"
+DEFAULT_REPORT_DATE = datetime(2025, 6, 13, tzinfo=pytz.UTC)
+
+DIRECTIONS = {
+    'bullish': {
+        'folder': 'bullishTrendyEMA',
+        # Any number prefix, e.g. "70-SYMBOL.jpg" or "100-SYMBOL.jpg"
+        'file_pattern': r'^\d+-(.*)\.jpg$',
+        'label': '',
+        'position': '',
+    },
+    'bearish': {
+        'folder': 'bearishTrendyEMA',
+        # Only files beginning with "100-"
+        'file_pattern': r'^100-(.*)\.jpg$',
+        'label': 'BEARISH ',
+        'position': 'SHORT ',
+    },
+}
+
+
+class SignalWindowCache:
+    """
+    Sticks of (symbol, start date, end date) holding windows shared by every backtest of a run,
+    so a symbol signalled by several folders of the same date is fetched once.
+    """
+
+    def __init__(self):
+        self._windows: Dict[Tuple[str, datetime, datetime], pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, symbols: List[str], start_date: datetime, end_date: datetime) -> Dict[str, pd.DataFrame]:
+        with self._lock:
+            missing = [symbol for symbol in dict.fromkeys(symbols)
+                       if (symbol, start_date, end_date) not in self._windows]
+        if missing:
+            fetched = fetch_signal_windows(missing, start_date, end_date)
+            with self._lock:
+                for symbol in missing:
+                    self._windows.setdefault((symbol, start_date, end_date), fetched[symbol])
+        with self._lock:
+            return {symbol: self._windows[(symbol, start_date, end_date)] for symbol in symbols}
+
+
+class TrendyEMABacktest:
+    def __init__(self, signals_folder: str, direction: str = 'bullish', take_profit_pct: float = 7.5,
+                 stop_loss_pct: float = 5.0, max_holding_days: int = 14,
+                 start_date: datetime = DEFAULT_REPORT_DATE, cache: Optional[SignalWindowCache] = None,
+                 verbose: bool = True):
+        self.signals_folder = signals_folder
+        self.direction = direction
+        self.bullish = direction == 'bullish'
+        self.start_date = start_date
+        self.end_date = self.start_date + timedelta(days=max_holding_days)
+        self.max_holding_days = max_holding_days
+        self.take_profit_pct = take_profit_pct   # 7.5% take profit by default
+        self.stop_loss_pct = stop_loss_pct       # 5% stop loss by default
+        self.cache = cache
+        self.verbose = verbose
+        self.results = []
+
+    def _print(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def extract_symbol_from_filename(self, filename: str) -> Optional[str]:
+        """Extract symbol from filename like '100-AC.D.2800HK.DAILY.IP.jpg' -> 'AC.D.2800HK.DAILY.IP'"""
+        match = re.match(DIRECTIONS[self.direction]['file_pattern'], filename)
+
+        # Return None if the name does not match or the symbol is empty (e.g., "70-.jpg")
+        if not match or not match.group(1):
+            return None
+        return match.group(1)
+
+    def get_signals(self) -> List[str]:
+        """Get all symbols from the signal files of this direction"""
+        symbols = []
+
+        if not os.path.exists(self.signals_folder):
+            print(f"Error: Signals folder {self.signals_folder} does not exist")
+            return symbols
+
+        files = os.listdir(self.signals_folder)
+        signal_files = [f for f in files if re.match(DIRECTIONS[self.direction]['file_pattern'], f)]
+
+        self._print(f"Found {len(signal_files)} {self.direction} signal files")
+
+        for filename in signal_files:
+            symbol = self.extract_symbol_from_filename(filename)
+            if symbol:
+                symbols.append(symbol)
+
+        return symbols
+
+    def simulate_trade(self, symbol: str) -> Dict:
+        """Simulate a 14-day trade (long or SHORT by direction) for a given symbol."""
+        try:
+            # Get price data from start date to end date (1440 minutes = 1 day)
+            sticks_df = get_sticks(symbol, 1440, self.start_date, self.end_date)
+            return self.simulate_trades({symbol: sticks_df}, [symbol])[0]
+        except Exception as e:
+            return failed_trade(symbol, 'ERROR', str(e))
+
+    def simulate_trades(self, sticks: Dict[str, pd.DataFrame], symbols: List[str]) -> List[Dict]:
+        """Evaluate the trades of all symbols at once (see simulate_signal_trades)"""
+        return simulate_signal_trades(sticks, symbols, bullish=self.bullish, take_profit_pct=self.take_profit_pct,
+                                      stop_loss_pct=self.stop_loss_pct, max_holding_days=self.max_holding_days)
+
+    def fetch_windows(self, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+        if self.cache is not None:
+            return self.cache.get_many(symbols, self.start_date, self.end_date)
+        return fetch_signal_windows(symbols, self.start_date, self.end_date)
+
+    def run_backtest(self, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Run the backtest on all signals with normalized $1000 position sizes and risk management.
+        symbols skips re-reading the signals folder when the caller already has get_signals().
+        """
+        label = DIRECTIONS[self.direction]['label']
+        position = DIRECTIONS[self.direction]['position']
+        self._print(f"Starting {label}backtest for period: {self.start_date.date()} to {self.end_date.date()}")
+        self._print(f"Using normalized $1000 {position}position size per trade")
+        self._print(f"Risk management: Take profit {self.take_profit_pct}%, Stop loss {self.stop_loss_pct}%")
+
+        if symbols is None:
+            symbols = self.get_signals()
+        self._print(f"Processing {len(symbols)} symbols...")
+
+        # One batched query for every signal's holding window
+        try:
+            results = self.simulate_trades(self.fetch_windows(symbols), symbols)
+        except Exception as e:
+            results = [failed_trade(symbol, 'ERROR', str(e)) for symbol in symbols]
+
+        successful_trades = 0
+        for i, (symbol, result) in enumerate(zip(symbols, results)):
+            if result['status'] == 'SUCCESS':
+                successful_trades += 1
+            elif i < 5:  # Show first 5 errors for debugging
+                self._print(f"  Error for {symbol}: {result['error']}")
+
+        self._print(f"\nBacktest completed!")
+        self._print(f"Total symbols processed: {len(symbols)}")
+        self._print(f"Successful trades: {successful_trades}")
+        self._print(f"Failed trades: {len(symbols) - successful_trades}")
+
+        self.results = results
+        return pd.DataFrame(results)
+
+    def analyze_results(self, results_df: pd.DataFrame) -> Dict:
+        """Analyze backtest results and provide summary statistics"""
+        return analyze_results(results_df)
+
+
+def analyze_results(results_df: pd.DataFrame) -> Dict:
+    """Analyze backtest results and provide summary statistics"""
+    successful_trades = results_df[results_df['status'] == 'SUCCESS'] if not results_df.empty else results_df
+
+    if successful_trades.empty:
+        return {
+            'total_trades': len(results_df),
+            'successful_trades': 0,
+            'failed_trades': len(results_df),
+            'winning_trades': 0,
+            'losing_trades': 0,
+            'win_rate': 0,
+            'avg_pnl': 0,
+            'avg_pnl_pct': 0,
+            'total_pnl': 0,
+            'best_trade': None,
+            'worst_trade': None,
+            'median_pnl_pct': 0,
+            'std_pnl_pct': 0
+        }
+
+    winning_trades = successful_trades[successful_trades['pnl'] > 0]
+    losing_trades = successful_trades[successful_trades['pnl'] < 0]
+
+    analysis = {
+        'total_trades': len(results_df),
+        'successful_trades': len(successful_trades),
+        'failed_trades': len(results_df) - len(successful_trades),
+        'winning_trades': len(winning_trades),
+        'losing_trades': len(losing_trades),
+        'win_rate': len(winning_trades) / len(successful_trades) * 100 if len(successful_trades) > 0 else 0,
+        'avg_pnl': successful_trades['pnl'].mean(),
+        'avg_pnl_pct': successful_trades['pnl_pct'].mean(),
+        'total_pnl': successful_trades['pnl'].sum(),
+        'best_trade': successful_trades.loc[successful_trades['pnl'].idxmax()] if not successful_trades.empty else None,
+        'worst_trade': successful_trades.loc[successful_trades['pnl'].idxmin()] if not successful_trades.empty else None,
+        'median_pnl_pct': successful_trades['pnl_pct'].median(),
+        'std_pnl_pct': successful_trades['pnl_pct'].std()
+    }
+
+    return analysis
+
+
+def find_report_folders(report_root: str = REPORT_ROOT, directions=tuple(DIRECTIONS)) -> List[Tuple[datetime, str, str]]:
+    """
+    Every dated signal folder under report_root.
+
+    Returns:
+        (report date, direction, folder) tuples sorted by date
+    """
+    folders = []
+    if not os.path.isdir(report_root):
+        print(f"Error: Report root {report_root} does not exist")
+        return folders
+
+    for name in sorted(os.listdir(report_root)):
+        try:
+            report_date = datetime.strptime(name, '%Y-%m-%d').replace(tzinfo=pytz.UTC)
+        except ValueError:
+            continue
+        for direction in directions:
+            folder = os.path.join(report_root, name, 'usBatch', DIRECTIONS[direction]['folder'])
+            if os.path.isdir(folder):
+                folders.append((report_date, direction, folder))
+    return folders
+
+
+def _backtest_date(report_date: datetime, folders: List[Tuple[str, str]], cache: SignalWindowCache, kwargs: dict) -> pd.DataFrame:
+    frames = []
+    backtests = [TrendyEMABacktest(folder, direction, start_date=report_date, cache=cache, verbose=False, **kwargs)
+                 for direction, folder in folders]
+    signals = [backtest.get_signals() for backtest in backtests]
+    # Fetch the union of this date's signals in one query before splitting by direction
+    cache.get_many([symbol for symbols in signals for symbol in symbols],
+                   backtests[0].start_date, backtests[0].end_date)
+    for backtest, symbols in zip(backtests, signals):
+        results_df = backtest.run_backtest(symbols)
+        if not results_df.empty:
+            frames.append(results_df.assign(signal_date=report_date.date(), direction=backtest.direction))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def backtest_report_folders(folders: List[Tuple[datetime, str, str]], max_workers: Optional[int] = None,
+                            **kwargs) -> pd.DataFrame:
+    """
+    Backtest (report date, direction, folder) signal folders, one date per worker thread.
+
+    Args:
+        folders: As returned by find_report_folders
+        max_workers: Dates backtested concurrently
+        kwargs: TrendyEMABacktest risk parameters (take_profit_pct, stop_loss_pct, max_holding_days)
+
+    Returns:
+        All results with 'signal_date' and 'direction' columns, ordered by date
+    """
+    by_date: Dict[datetime, List[Tuple[str, str]]] = {}
+    for report_date, direction, folder in folders:
+        by_date.setdefault(report_date, []).append((direction, folder))
+
+    cache = SignalWindowCache()
+    scan = run_scan(list(by_date), lambda report_date: _backtest_date(report_date, by_date[report_date], cache, kwargs),
+                    max_workers=max_workers, use_processes=False, progress_every=10, label="Backtested report dates")
+    for report_date, error in scan.errors.items():
+        print(f"Error backtesting {report_date.date()}: {error}")
+
+    frames = [frame for frame in scan.values() if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def backtest_report_root(report_root: str = REPORT_ROOT, directions=tuple(DIRECTIONS), **kwargs) -> pd.DataFrame:
+    """Backtest every dated bullishTrendyEMA/bearishTrendyEMA folder under report_root."""
+    folders = find_report_folders(report_root, directions)
+    print(f"Found {len(folders)} signal folders in {len({report_date for report_date, _, _ in folders})} report dates")
+    return backtest_report_folders(folders, **kwargs)
+
+
+def backtest_report_dates(report_dates: List[datetime], direction: str = 'bullish', report_root: str = REPORT_ROOT,
+                          **kwargs) -> pd.DataFrame:
+    """Backtest the signals of one direction for the given report dates."""
+    folders = [(report_date, direction,
+                os.path.join(report_root, report_date.strftime('%Y-%m-%d'), 'usBatch', DIRECTIONS[direction]['folder']))
+               for report_date in report_dates]
+    return backtest_report_folders(folders, **kwargs)
+
+
+def load_signal_panel(folders: List[Tuple[datetime, str, str]], max_holding_days: int):
+    """
+    Fetch the holding windows of every signal once, long enough for max_holding_days, as
+    optimizer arrays (see signal_arrays) with one row per signal, ordered by report date.
+
+    Returns:
+        (report_dates, date_rows, data): the sorted report dates, the first data row of each date
+        (plus the row count at the end), and the arrays
+    """
+    by_date: Dict[datetime, List[Dict[str, np.ndarray]]] = {}
+    for report_date, direction, folder in sorted(folders, key=lambda f: f[0]):
+        backtest = TrendyEMABacktest(folder, direction, start_date=report_date, max_holding_days=max_holding_days,
+                                     verbose=False)
+        symbols = backtest.get_signals()
+        if symbols:
+            sticks = fetch_signal_windows(symbols, backtest.start_date, backtest.end_date)
+            by_date.setdefault(report_date, []).append(signal_arrays(sticks, symbols, backtest.bullish, report_date))
+
+    parts = [part for parts in by_date.values() for part in parts]
+    width = max((part['exit'].shape[1] for part in parts), default=1)
+    data = {}
+    for name in ('entry', 'side'):
+        data[name] = np.concatenate([part[name] for part in parts]) if parts else np.empty(0)
+    for name in ('exit', 'day_offset'):
+        data[name] = np.concatenate([
+            np.pad(part[name], ((0, 0), (0, width - part[name].shape[1])), constant_values=np.nan) for part in parts
+        ]) if parts else np.empty((0, width))
+    date_rows = np.cumsum([0] + [sum(len(part['entry']) for part in parts) for parts in by_date.values()])
+    return list(by_date), date_rows, data
+
+
+def _holding_window(data: dict, max_holding_days: int):
+    """Exit prices restricted to the first max_holding_days calendar days, and the bars left per signal."""
+    within = data['day_offset'] <= max_holding_days
+    return np.where(within, data['exit'], np.nan), within.sum(axis=1)
+
+
+def evaluate_params(data: dict, params: dict, rows: slice) -> dict:
+    """
+    Optimizer objective: the signals in rows (see load_signal_panel) traded with the given
+    take_profit_pct, stop_loss_pct and max_holding_days, like simulate_signal_trades.
+    """
+    max_holding_days = params.get('max_holding_days', 14)
+    exit_prices, lengths = cached(('window', max_holding_days), lambda: _holding_window(data, max_holding_days))
+    entry, side, exit_prices, lengths = data['entry'][rows], data['side'][rows], exit_prices[rows], lengths[rows]
+
+    exit_idx, _ = signal_exits(entry, exit_prices, lengths, side, params.get('take_profit_pct', 7.5),
+                               params.get('stop_loss_pct', 5.0), max_holding_days)
+    exit_price = exit_prices[np.arange(len(entry)), exit_idx]
+    traded = (entry != 0) & (lengths > 0) & (exit_price != 0) & ~np.isnan(exit_price)
+    pnl_pct = side[traded] * (exit_price[traded] - entry[traded]) / entry[traded] * 100
+
+    if len(pnl_pct) == 0:
+        return {'trades': 0, 'win_rate': np.nan, 'avg_pnl_pct': np.nan, 'total_pnl_pct': 0.0}
+    return {
+        'trades': len(pnl_pct),
+        'win_rate': (pnl_pct > 0).mean() * 100,
+        'avg_pnl_pct': pnl_pct.mean(),
+        'total_pnl_pct': pnl_pct.sum(),
+    }
+
+
+def optimize_main(report_root: str = REPORT_ROOT, directions=tuple(DIRECTIONS), train_dates: int = 60,
+                  test_dates: int = 20):
+    """Walk-forward the take profit, stop loss and holding period over the dated report folders."""
+    space = {'take_profit_pct': [5.0, 7.5, 10.0, 15.0], 'stop_loss_pct': [3.0, 5.0, 7.5], 'max_holding_days': [7, 14, 21]}
+    folders = find_report_folders(report_root, directions)
+    report_dates, date_rows, data = load_signal_panel(folders, max(space['max_holding_days']))
+    print(f"Loaded {len(data['entry'])} signals from {len(report_dates)} report dates")
+
+    # Splits are made over report dates, so a date's signals are never split between train and test
+    splits = [(slice(date_rows[train.start], date_rows[train.stop]), slice(date_rows[test.start], date_rows[test.stop]))
+              for train, test in walk_forward_splits(len(report_dates), train_dates, test_dates)]
+    if not splits:
+        print(f"Need at least {train_dates + test_dates} report dates for one walk-forward split")
+        return
+    results = Optimizer(data, evaluate_params).walk_forward(param_grid(space), splits, metric='total_pnl_pct')
+    results['test_start_date'] = [report_dates[int(np.searchsorted(date_rows, row, side='right')) - 1].date()
+                                  for row in results['test_start']]
+
+    print(results.to_string(index=False))
+    output_file = "strategy/trendy_ema_walk_forward.csv"
+    results.to_csv(output_file, index=False)
+    print(f"Walk-forward results saved to {output_file}")
+
+
+def print_report(results_df: pd.DataFrame, direction: str, take_profit_pct: float = 7.5,
+                 stop_loss_pct: float = 5.0, max_holding_days: int = 14):
+    """Print the summary, fallback usage, exit reasons and failures of a backtest run"""
+    analysis = analyze_results(results_df)
+    label = DIRECTIONS[direction]['label']
+    position = DIRECTIONS[direction]['position']
+    entry_fallback, exit_fallback = ('bid', 'ask') if direction == 'bullish' else ('ask', 'bid')
+
+    print("\n" + "="*60)
+    print(f"{label}BACKTEST RESULTS SUMMARY")
+    print(f"(Normalized to $1000 {position}position size per trade)")
+    print(f"(Risk Management: {take_profit_pct:g}% Take Profit, {stop_loss_pct:g}% Stop Loss)")
+    print("="*60)
+    print(f"Total trades: {analysis['total_trades']}")
+    print(f"Successful trades: {analysis['successful_trades']}")
+    print(f"Failed trades: {analysis['failed_trades']}")
+    print(f"Winning trades: {analysis['winning_trades']}")
+    print(f"Losing trades: {analysis['losing_trades']}")
+    print(f"Win rate: {analysis['win_rate']:.2f}%")
+    print(f"Average P&L: ${analysis['avg_pnl']:.2f}")
+    print(f"Average P&L %: {analysis['avg_pnl_pct']:.2f}%")
+    print(f"Median P&L %: {analysis['median_pnl_pct']:.2f}%")
+    print(f"Std Dev P&L %: {analysis['std_pnl_pct']:.2f}%")
+    print(f"Total P&L: ${analysis['total_pnl']:.2f}")
+
+    if analysis['best_trade'] is not None:
+        print(f"\nBest trade:")
+        print(f"  Symbol: {analysis['best_trade']['symbol']}")
+        print(f"  P&L: ${analysis['best_trade']['pnl']:.2f} ({analysis['best_trade']['pnl_pct']:.2f}%)")
+
+    if analysis['worst_trade'] is not None:
+        print(f"\nWorst trade:")
+        print(f"  Symbol: {analysis['worst_trade']['symbol']}")
+        print(f"  P&L: ${analysis['worst_trade']['pnl']:.2f} ({analysis['worst_trade']['pnl_pct']:.2f}%)")
+
+    if results_df.empty:
+        return
+
+    # Show sample of successful trades
+    successful_trades = results_df[results_df['status'] == 'SUCCESS']
+    if not successful_trades.empty:
+        print(f"\nSample of successful {position}trades:")
+        print(successful_trades[['symbol', 'entry_price', 'exit_price', 'pnl', 'pnl_pct', 'days_held', 'exit_reason']].head(10).to_string(index=False))
+
+        # Show fallback price usage statistics
+        entry_fallbacks = successful_trades[successful_trades['entry_price_type'] == f'{entry_fallback}_fallback']
+        exit_fallbacks = successful_trades[successful_trades['exit_price_type'] == f'{exit_fallback}_fallback']
+        print(f"\nPrice fallback usage:")
+        print(f"Entry price fallbacks (used {entry_fallback} instead of {exit_fallback}): {len(entry_fallbacks)}")
+        print(f"Exit price fallbacks (used {exit_fallback} instead of {entry_fallback}): {len(exit_fallbacks)}")
+        if len(entry_fallbacks) > 0:
+            print(f"Entry fallback symbols: {entry_fallbacks['symbol'].tolist()}")
+        if len(exit_fallbacks) > 0:
+            print(f"Exit fallback symbols: {exit_fallbacks['symbol'].tolist()}")
+
+        # Show exit reason statistics
+        take_profit_trades = successful_trades[successful_trades['exit_reason'] == 'take_profit']
+        stop_loss_trades = successful_trades[successful_trades['exit_reason'] == 'stop_loss']
+        time_limit_trades = successful_trades[successful_trades['exit_reason'] == 'time_limit']
+        print(f"\nExit reason statistics:")
+        print(f"Take profit exits ({take_profit_pct:g}%): {len(take_profit_trades)} ({len(take_profit_trades)/len(successful_trades)*100:.1f}%)")
+        print(f"Stop loss exits ({stop_loss_pct:g}%): {len(stop_loss_trades)} ({len(stop_loss_trades)/len(successful_trades)*100:.1f}%)")
+        print(f"Time limit exits ({max_holding_days} days): {len(time_limit_trades)} ({len(time_limit_trades)/len(successful_trades)*100:.1f}%)")
+        if len(take_profit_trades) > 0:
+            print(f"Average days to take profit: {take_profit_trades['days_held'].mean():.1f}")
+        if len(stop_loss_trades) > 0:
+            print(f"Average days to stop loss: {stop_loss_trades['days_held'].mean():.1f}")
+
+    # Show failed trades
+    failed_trades = results_df[results_df['status'] != 'SUCCESS']
+    if not failed_trades.empty:
+        print(f"\nFailed trades ({len(failed_trades)} total):")
+        print(failed_trades[['symbol', 'status', 'error']].head(10).to_string(index=False))
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--optimize']
+    directions = [arg for arg in args if arg in DIRECTIONS] or list(DIRECTIONS)
+    report_root = next((arg for arg in args if arg not in DIRECTIONS), REPORT_ROOT)
+    if '--optimize' in sys.argv[1:]:
+        optimize_main(report_root, directions)
+        return
+
+    results_df = backtest_report_root(report_root, directions)
+    if results_df.empty:
+        print("No signals found.")
+        return
+
+    for direction in directions:
+        print_report(results_df[results_df['direction'] == direction], direction)
+
+        # Signal quality per report date
+        successful = results_df[(results_df['direction'] == direction) & (results_df['status'] == 'SUCCESS')]
+        if not successful.empty:
+            per_date = successful.groupby('signal_date').agg(trades=('pnl_pct', 'size'),
+                                                             win_rate=('pnl', lambda pnl: (pnl > 0).mean() * 100),
+                                                             avg_pnl_pct=('pnl_pct', 'mean'))
+            print(f"\n{direction.capitalize()} signals by report date:")
+            print(per_date.to_string())
+
+    output_file = "strategy/trendy_ema_backtest_results.csv"
+    results_df.to_csv(output_file, index=False)
+    print(f"\nDetailed results saved to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Shared trade evaluation for the Bullish/Bearish TrendyEMA signal backtests.
+
+All signals of one report date are fetched with a single get_sticks_many query, padded into
+(signals x bars) arrays, and their take-profit / stop-loss exits found with one vectorized
+first-crossing search instead of walking each symbol's rows.
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from data.TimescaleDBSticksDao import get_sticks_many
+
+POSITION_VALUE = 1000.0  # Every trade is normalized to a $1000 position
+
+# (primary column, fallback column, primary note, fallback note) per side of a trade
+BULLISH_PRICES = {
+    'entry': ('ask_close', 'bid_close', 'ask', 'bid_fallback'),
+    'exit': ('bid_close', 'ask_close', 'bid', 'ask_fallback'),
+}
+BEARISH_PRICES = {
+    'entry': ('bid_close', 'ask_close', 'bid', 'ask_fallback'),
+    'exit': ('ask_close', 'bid_close', 'ask', 'bid_fallback'),
+}
+
+
+def failed_trade(symbol: str, status: str, error: str) -> Dict:
+    return {
+        'symbol': symbol,
+        'status': status,
+        'entry_price': None,
+        'exit_price': None,
+        'pnl': None,
+        'pnl_pct': None,
+        'days_held': None,
+        'error': error
+    }
+
+
+def fetch_signal_windows(symbols: List[str], start_date: datetime, end_date: datetime) -> Dict[str, pd.DataFrame]:
+    """Daily sticks of every signal symbol between start_date and end_date in one query."""
+    return get_sticks_many(list(dict.fromkeys(symbols)), 1440, start_date, end_date)
+
+
+def _padded(frames: List[pd.DataFrame], column: str, width: int) -> np.ndarray:
+    values = np.full((len(frames), width), np.nan)
+    for row, df in enumerate(frames):
+        values[row, :len(df)] = df[column].to_numpy(dtype=np.float64)
+    return values
+
+
+def _with_fallback(frames: List[pd.DataFrame], columns: tuple, width: int):
+    """Prices from the primary column, replaced by the fallback column where the primary is zero."""
+    primary = _padded(frames, columns[0], width)
+    fallback = _padded(frames, columns[1], width)
+    used_fallback = primary == 0
+    return np.where(used_fallback, fallback, primary), used_fallback
+
+
+def signal_exits(entry: np.ndarray, exit_prices: np.ndarray, lengths: np.ndarray, side,
+                 take_profit_pct: float, stop_loss_pct: float, max_holding_days: int):
+    """
+    Exit bar of every signal: the first bar after entry whose P&L reaches the take profit
+    (checked first) or the stop loss, else bar max_holding_days (or the last of lengths bars).
+
+    Args:
+        entry: Entry price per signal
+        exit_prices: (signals x bars) exit prices, NaN past a signal's last bar
+        side: 1.0 (long) / -1.0 (short), for all signals or one per signal
+
+    Returns:
+        (exit_idx, reasons) arrays per signal
+    """
+    side = np.asarray(side, dtype=np.float64).reshape(-1, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pnl_pct = side * (exit_prices - entry[:, None]) / entry[:, None] * 100
+    checked = (exit_prices != 0) & ~np.isnan(exit_prices)
+    checked[:, 0] = False
+    take_profit = checked & (pnl_pct >= take_profit_pct)
+    stop_loss = checked & (pnl_pct <= -stop_loss_pct)
+
+    # First crossing of either threshold, else the time limit bar
+    crossed = take_profit | stop_loss
+    first_cross = np.argmax(crossed, axis=1)
+    has_cross = crossed.any(axis=1)
+    rows = np.arange(len(entry))
+    exit_idx = np.where(has_cross, first_cross, np.maximum(np.minimum(lengths, max_holding_days) - 1, 0))
+    reasons = np.where(~has_cross, 'time_limit',
+                       np.where(take_profit[rows, first_cross], 'take_profit', 'stop_loss'))
+    return exit_idx, reasons
+
+
+def signal_arrays(sticks: Dict[str, pd.DataFrame], symbols: List[str], bullish: bool,
+                  start_date: datetime) -> Dict[str, np.ndarray]:
+    """
+    Signals with data as arrays for the optimizer: 'entry' price per signal, 'exit' prices and
+    'day_offset' (days since start_date) per (signal x bar), NaN past a signal's last bar, and
+    'side' per signal. Prices use the same fallbacks as simulate_signal_trades.
+    """
+    prices = BULLISH_PRICES if bullish else BEARISH_PRICES
+    frames = [sticks[symbol] for symbol in dict.fromkeys(symbols) if symbol in sticks and not sticks[symbol].empty]
+    width = max((len(df) for df in frames), default=1)
+    entry_prices, _ = _with_fallback(frames, prices['entry'], width)
+    exit_prices, _ = _with_fallback(frames, prices['exit'], width)
+    day_offset = np.full((len(frames), width), np.nan)
+    for row, df in enumerate(frames):
+        day_offset[row, :len(df)] = ((df.index - start_date) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+    return {
+        'entry': entry_prices[:, 0],
+        'exit': exit_prices,
+        'day_offset': day_offset,
+        'side': np.full(len(frames), 1.0 if bullish else -1.0),
+    }
+
+
+def simulate_signal_trades(sticks: Dict[str, pd.DataFrame], symbols: List[str], bullish: bool,
+                           take_profit_pct: float = 7.5, stop_loss_pct: float = 5.0,
+                           max_holding_days: int = 14) -> List[Dict]:
+    """
+    Simulate one normalized trade per signal symbol, entered at the close of the first bar.
+
+    A long enters at the ask and exits at the bid, a short enters at the bid and covers at the
+    ask; a zero price falls back to the other side. The trade exits on the first later bar whose
+    P&L reaches the take profit (checked first) or the stop loss, otherwise on bar
+    max_holding_days (or the last bar when fewer are available).
+
+    Returns:
+        One result dict per symbol, in the order of symbols
+    """
+    prices = BULLISH_PRICES if bullish else BEARISH_PRICES
+    side = 1.0 if bullish else -1.0
+    traded = [symbol for symbol in dict.fromkeys(symbols) if symbol in sticks and not sticks[symbol].empty]
+    frames = [sticks[symbol] for symbol in traded]
+    lengths = np.array([len(df) for df in frames], dtype=np.int64)
+    width = int(lengths.max()) if len(frames) else 1
+
+    entry_prices, entry_fallback = _with_fallback(frames, prices['entry'], width)
+    exit_prices, exit_fallback = _with_fallback(frames, prices['exit'], width)
+    entry = entry_prices[:, 0]
+
+    exit_idx, reasons = signal_exits(entry, exit_prices, lengths, side, take_profit_pct, stop_loss_pct,
+                                     max_holding_days)
+
+    trades = {}
+    for row, symbol in enumerate(traded):
+        if entry[row] == 0:
+            trades[symbol] = failed_trade(symbol, 'ERROR', 'Both ask and bid prices are zero at entry'
+                                          if bullish else 'Both bid and ask prices are zero at entry')
+            continue
+        exit_price = exit_prices[row, exit_idx[row]]
+        if exit_price == 0:
+            trades[symbol] = failed_trade(symbol, 'ERROR', 'Both bid and ask prices are zero at exit'
+                                          if bullish else 'Both ask and bid prices are zero at exit')
+            continue
+
+        entry_price = entry[row]
+        position_size = POSITION_VALUE / entry_price
+        pnl = side * (exit_price - entry_price) * position_size
+        entry_date = frames[row].index[0]
+        exit_date = frames[row].index[exit_idx[row]]
+        trades[symbol] = {
+            'symbol': symbol,
+            'status': 'SUCCESS',
+            'entry_date': entry_date,
+            'exit_date': exit_date,
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+            'entry_price_type': prices['entry'][3 if entry_fallback[row, 0] else 2],
+            'exit_price_type': prices['exit'][3 if exit_fallback[row, exit_idx[row]] else 2],
+            'position_size': position_size,
+            'pnl': pnl,
+            'pnl_pct': (pnl / POSITION_VALUE) * 100,
+            'days_held': (exit_date - entry_date).days,
+            'exit_reason': str(reasons[row]),
+            'error': None
+        }
+
+    return [trades.get(symbol) or failed_trade(symbol, 'NO_DATA', 'No data available for the specified date range')
+            for symbol in symbols]